@@ -12,6 +12,10 @@ from core.models import DocumentAccess, RoleChoices, get_trashbin_cutoff
 ACTION_FOR_METHOD_TO_PERMISSION = {
     "versions_detail": {"DELETE": "versions_destroy", "GET": "versions_retrieve"},
     "children": {"GET": "children_list", "POST": "children_create"},
+    "content_bin": {"GET": "content"},
+    "content_updates": {"POST": "partial_update"},
+    "ai_translate_document": {"POST": "ai_translate"},
+    "ai_translate_document_status": {"GET": "ai_translate"},
 }
 
 
@@ -5,12 +5,13 @@ import mimetypes
 from base64 import b64decode
 
 from django.conf import settings
-from django.db.models import Q
+from django.db.models import Manager, Q
 from django.utils.functional import lazy
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
 import magic
+import pycrdt
 from rest_framework import serializers
 
 from core import choices, enums, models, utils, validators
@@ -82,6 +83,23 @@ class TemplateAccessSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class DocumentListSerializer(serializers.ListSerializer):
+    """
+    Prefetch in bulk, for all the documents of a list, the ancestors link definitions and
+    the number of accesses so that serializing each document does not trigger queries.
+    """
+
+    def to_representation(self, data):
+        """Prefetch data shared by all documents before serializing them one by one."""
+        documents = list(data.all() if isinstance(data, Manager) else data)
+
+        if self.context.get("paths_links_mapping") is None:
+            models.Document.prefetch_ancestors_link_definitions(documents)
+        models.Document.prefetch_nb_accesses(documents)
+
+        return super().to_representation(documents)
+
+
 class ListDocumentSerializer(serializers.ModelSerializer):
     """Serialize documents with limited fields for display in lists."""
 
@@ -94,6 +112,7 @@ class ListDocumentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.Document
+        list_serializer_class = DocumentListSerializer
         fields = [
             "id",
             "abilities",
@@ -238,13 +257,24 @@ class DocumentSerializer(ListDocumentSerializer):
         ]
 
     def get_fields(self):
-        """Dynamically make `id` read-only on PUT requests but writable on POST requests."""
+        """
+        Dynamically make `id` read-only on PUT requests but writable on POST requests,
+        and leave out the content if the client asked for it.
+        """
         fields = super().get_fields()
 
         request = self.context.get("request")
         if request and request.method == "POST":
             fields["id"].read_only = False
 
+        # Let clients fetch the content from the binary content endpoint instead
+        if (
+            request
+            and request.method == "GET"
+            and request.query_params.get("omit_content") == "true"
+        ):
+            fields.pop("content")
+
         return fields
 
     def validate_id(self, value):
@@ -282,7 +312,7 @@ class DocumentSerializer(ListDocumentSerializer):
     def save(self, **kwargs):
         """
         Process the content field to extract attachment keys and update the document's
-        "attachments" field for access control.
+        "attachments" field for access control, and record the author of the content.
         """
         content = self.validated_data.get("content", "")
         extracted_attachments = set(utils.extract_attachments(content))
@@ -324,6 +354,11 @@ class DocumentSerializer(ListDocumentSerializer):
                 existing_attachments | readable_attachments
             )
 
+        # Attribute the version written for the new content to the editing user
+        request = self.context.get("request")
+        if self.instance and content and request and request.user.is_authenticated:
+            kwargs.setdefault("content_author", request.user)
+
         return super().save(**kwargs)
 
 
@@ -610,6 +645,43 @@ class DocumentDuplicationSerializer(serializers.Serializer):
 # Suppress the warning about not implementing `create` and `update` methods
 # since we don't use a model and only rely on the serializer for validation
 # pylint: disable=abstract-method
+class DocumentConnectionsSerializer(serializers.Serializer):
+    """Validate the connections to a document pushed by the collaboration server."""
+
+    count = serializers.IntegerField(min_value=0)
+    session_keys = serializers.ListField(
+        child=serializers.CharField(), required=False, default=list
+    )
+
+
+class DocumentContentUpdateSerializer(serializers.Serializer):
+    """Validate an incremental Yjs update to append to the content of a document."""
+
+    content = serializers.CharField(required=True)
+    websocket = serializers.BooleanField(required=False)
+
+    def validate_content(self, value):
+        """Ensure the update is a base64 encoded Yjs update of a reasonable size."""
+        try:
+            decoded = b64decode(value, validate=True)
+        except binascii.Error as err:
+            raise serializers.ValidationError("Invalid base64 content.") from err
+
+        max_size = 10 * 1024 * 1024  # 10MB
+        if len(decoded) > max_size:
+            raise serializers.ValidationError(
+                f"Update too large. Maximum size is {max_size // (1024 * 1024)} MB."
+            )
+
+        # An invalid update stored in the log would break reading the content
+        try:
+            pycrdt.get_state(decoded)
+        except ValueError as err:
+            raise serializers.ValidationError("Invalid Yjs update.") from err
+
+        return value
+
+
 class FileUploadSerializer(serializers.Serializer):
     """Receive file upload requests."""
 
@@ -839,6 +911,7 @@ class AITransformSerializer(serializers.Serializer):
 
     action = serializers.ChoiceField(choices=AI_ACTIONS, required=True)
     text = serializers.CharField(required=True)
+    stream = serializers.BooleanField(required=False, default=False)
 
     def validate_text(self, value):
         """Ensure the text field is not empty and within size limits."""
@@ -863,6 +936,7 @@ class AITranslateSerializer(serializers.Serializer):
         choices=tuple(enums.ALL_LANGUAGES.items()), required=True
     )
     text = serializers.CharField(required=True)
+    stream = serializers.BooleanField(required=False, default=False)
 
     def validate_text(self, value):
         """Ensure the text field is not empty and within size limits."""
@@ -880,6 +954,15 @@ class AITranslateSerializer(serializers.Serializer):
         return value
 
 
+class AITranslateDocumentSerializer(serializers.Serializer):
+    """Serializer for AI translate requests of whole documents."""
+
+    language = serializers.ChoiceField(
+        choices=tuple(enums.ALL_LANGUAGES.items()), required=True
+    )
+    duplicate = serializers.BooleanField(required=False, default=False)
+
+
 class MoveDocumentSerializer(serializers.Serializer):
     """
     Serializer for validating input data to move a document within the tree structure.
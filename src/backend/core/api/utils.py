@@ -1,5 +1,10 @@
 """Util to generate S3 authorization headers for object storage access control"""
 
+import hashlib
+import json
+import logging
+import secrets
+import threading
 import time
 from abc import ABC, abstractmethod
 
@@ -10,6 +15,8 @@ from django.core.files.storage import default_storage
 import botocore
 from rest_framework.throttling import BaseThrottle
 
+logger = logging.getLogger(__name__)
+
 
 def nest_tree(flat_list, steplen):
     """
@@ -40,6 +47,12 @@ def nest_tree(flat_list, steplen):
     return roots[0] if roots else None
 
 
+def compute_etag(*parts):
+    """Return a strong ETag computed from the hash of the given parts."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest:s}"'
+
+
 def filter_root_paths(paths, skip_sorting=False):
     """
     Filters root paths from a list of paths representing a tree structure.
@@ -91,14 +104,67 @@ def generate_s3_authorization_headers(key):
     return request
 
 
+def iter_server_sent_events(chunks):
+    """
+    Relay the pieces of an AI answer as server-sent events: a "message" event per piece
+    followed by a "done" event, or an "error" event if the answer failed midway.
+    """
+    try:
+        for chunk in chunks:
+            yield f"data: {json.dumps({'answer': chunk})}\n\n"
+    except Exception:  # pylint: disable=broad-exception-caught
+        # The response has started, the error can only be reported in the stream
+        logger.exception("AI answer failed while streaming")
+        yield "event: error\ndata: {}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
+
+
+# Count the requests of the last minute, hour and day in a sorted set of request
+# timestamps and log the request, as many times as it costs, if it is allowed,
+# atomically. Only allowed requests are logged so the size of the set is bounded by the
+# daily rate, whatever the traffic.
+AI_THROTTLE_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[6])
+redis.call("ZREMRANGEBYSCORE", key, "-inf", now - 86400)
+local day = redis.call("ZCARD", key)
+local hour = redis.call("ZCOUNT", key, "(" .. (now - 3600), "+inf")
+local minute = redis.call("ZCOUNT", key, "(" .. (now - 60), "+inf")
+local allowed = 0
+if minute + cost <= tonumber(ARGV[2]) and hour + cost <= tonumber(ARGV[3])
+    and day + cost <= tonumber(ARGV[4]) then
+    for i = 1, cost do
+        redis.call("ZADD", key, now, ARGV[5] .. ":" .. i)
+    end
+    redis.call("EXPIRE", key, 86400)
+    allowed = 1
+end
+return {minute, hour, day, allowed}
+"""
+
+
+def get_redis_client():
+    """Return a client of the shared cache if it is backed by Redis, None otherwise."""
+    try:
+        get_client = cache.client.get_client
+    except AttributeError:
+        return None
+    return get_client(write=True)
+
+
 class AIBaseRateThrottle(BaseThrottle, ABC):
     """Base throttle class for AI-related rate limiting with backoff."""
 
+    _local_lock = threading.Lock()
+
     def __init__(self, rates):
         """Initialize instance attributes with configurable rates."""
         super().__init__()
         self.rates = rates
         self.cache_key = None
+        self.cost = 1
         self.recent_requests_minute = 0
         self.recent_requests_hour = 0
         self.recent_requests_day = 0
@@ -113,36 +179,88 @@ class AIBaseRateThrottle(BaseThrottle, ABC):
         if not self.cache_key:
             return True  # Allow if no cache key is generated
 
+        self.cost = self.get_cost(request, view)
+
         now = time.time()
-        history = cache.get(self.cache_key, [])
-        # Keep requests within the last 24 hours
-        history = [req for req in history if req > now - 86400]
-
-        # Calculate recent requests
-        self.recent_requests_minute = len([req for req in history if req > now - 60])
-        self.recent_requests_hour = len([req for req in history if req > now - 3600])
-        self.recent_requests_day = len(history)
-
-        # Check rate limits
-        if self.recent_requests_minute >= self.rates["minute"]:
-            return False
-        if self.recent_requests_hour >= self.rates["hour"]:
-            return False
-        if self.recent_requests_day >= self.rates["day"]:
-            return False
-
-        # Log the request
-        history.append(now)
-        cache.set(self.cache_key, history, timeout=86400)
-        return True
+        redis_client = get_redis_client()
+        if redis_client is None:
+            return self._allow_request_local(now)
+        return self._allow_request_redis(redis_client, now)
+
+    @staticmethod
+    def get_cost(request, view):
+        """
+        Return the number of requests to the AI API that a request makes, each counted
+        against the rate limits. Views making several of them define "get_ai_cost".
+        """
+        get_ai_cost = getattr(view, "get_ai_cost", None)
+        return 1 if get_ai_cost is None else get_ai_cost(request)
+
+    def _allow_request_redis(self, client, now):
+        """
+        Check the rate limits and log the request in a single round trip to Redis,
+        atomically so that concurrent requests of all processes are counted.
+        """
+        # The key holds a sorted set, distinct from the lists stored by earlier versions
+        key = cache.make_key(f"{self.cache_key:s}:requests")
+        # Requests logged at the same time must be distinct members of the set
+        member = f"{now!r}:{secrets.token_hex(4):s}"
+        script = client.register_script(AI_THROTTLE_SCRIPT)
+        minute, hour, day, allowed = script(
+            keys=[key],
+            args=[
+                now,
+                self.rates["minute"],
+                self.rates["hour"],
+                self.rates["day"],
+                member,
+                self.cost,
+            ],
+        )
+        self.recent_requests_minute = minute
+        self.recent_requests_hour = hour
+        self.recent_requests_day = day
+        return bool(allowed)
+
+    def _allow_request_local(self, now):
+        """
+        Check the rate limits against the history of requests stored in a cache that is
+        local to the process, e.g. in development.
+        """
+        with self._local_lock:
+            history = cache.get(self.cache_key, [])
+            # Keep requests within the last 24 hours
+            history = [req for req in history if req > now - 86400]
+
+            # Calculate recent requests
+            self.recent_requests_minute = len(
+                [req for req in history if req > now - 60]
+            )
+            self.recent_requests_hour = len(
+                [req for req in history if req > now - 3600]
+            )
+            self.recent_requests_day = len(history)
+
+            # Check rate limits
+            if self.recent_requests_minute + self.cost > self.rates["minute"]:
+                return False
+            if self.recent_requests_hour + self.cost > self.rates["hour"]:
+                return False
+            if self.recent_requests_day + self.cost > self.rates["day"]:
+                return False
+
+            # Log the request
+            history.extend([now] * self.cost)
+            cache.set(self.cache_key, history, timeout=86400)
+            return True
 
     def wait(self):
         """Implement a backoff strategy by increasing wait time based on limits hit."""
-        if self.recent_requests_day >= self.rates["day"]:
+        if self.recent_requests_day + self.cost > self.rates["day"]:
             return 86400
-        if self.recent_requests_hour >= self.rates["hour"]:
+        if self.recent_requests_hour + self.cost > self.rates["hour"]:
             return 3600
-        if self.recent_requests_minute >= self.rates["minute"]:
+        if self.recent_requests_minute + self.cost > self.rates["minute"]:
             return 60
         return None
 
@@ -4,6 +4,7 @@
 import base64
 import json
 import logging
+import re
 import uuid
 from collections import defaultdict
 from urllib.parse import unquote, urlencode, urlparse
@@ -18,10 +19,17 @@ from django.core.validators import URLValidator
 from django.db import connection, transaction
 from django.db import models as db
 from django.db.models.expressions import RawSQL
-from django.db.models.functions import Left, Length
-from django.http import Http404, StreamingHttpResponse
+from django.db.models.functions import Coalesce
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
 from django.utils.functional import cached_property
+from django.utils.http import parse_etags
 from django.utils.text import capfirst, slugify
 from django.utils.translation import gettext_lazy as _
 
@@ -36,7 +44,8 @@ from rest_framework import response as drf_response
 from rest_framework.permissions import AllowAny
 
 from core import authentication, choices, enums, models
-from core.services.ai_services import AIService
+from core.caches import get_prefix_versions
+from core.services.ai_services import AIService, load_text_nodes
 from core.services.collaboration_services import CollaborationService
 from core.services.converter_services import (
     ServiceUnavailableError as YProviderServiceUnavailableError,
@@ -47,8 +56,14 @@ from core.services.converter_services import (
 from core.services.converter_services import (
     YdocConverter,
 )
+from core.services.http_client import PROXY_SESSION, get_session
+from core.tasks.ai import (
+    get_translation_job,
+    translate_document,
+    update_translation_job,
+)
 from core.tasks.mail import send_ask_for_access_mail
-from core.utils import extract_attachments, filter_descendants
+from core.utils import extract_attachments, iter_base64_decoded
 
 from . import permissions, serializers, utils
 from .filters import DocumentFilter, ListDocumentFilter, UserSearchFilter
@@ -147,6 +162,44 @@ class Pagination(drf.pagination.PageNumberPagination):
     page_size_query_param = "page_size"
 
 
+class CursorPagination(drf.pagination.CursorPagination):
+    """
+    Keyset pagination following the ordering of the queryset, with the primary key as
+    tie-breaker. Unlike page numbers, it does not count results nor scan skipped rows.
+    """
+
+    max_page_size = 200
+    page_size_query_param = "page_size"
+    unique_ordering_fields = {"id", "path", "pk"}
+    # Cursors can't encode the position of null values, these fields are ordered by
+    # an alias replacing null values by an empty string
+    nullable_ordering_fields = {"title"}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Annotate the aliases of the nullable fields the queryset is ordered by."""
+        ordering_fields = {field.lstrip("-") for field in queryset.query.order_by}
+        queryset = queryset.annotate(
+            **{
+                f"{field:s}_ordering": Coalesce(field, db.Value(""))
+                for field in self.nullable_ordering_fields & ordering_fields
+            }
+        )
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def get_ordering(self, request, queryset, view):
+        """Follow the ordering of the queryset and make it unique."""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering  # noqa: SLF001
+        ordering = tuple(
+            f"{field:s}_ordering"
+            if field.lstrip("-") in self.nullable_ordering_fields
+            else field
+            for field in ordering
+        )
+        if not self.unique_ordering_fields & {field.lstrip("-") for field in ordering}:
+            ordering = (*ordering, "id")
+        return ordering
+
+
 class UserViewSet(
     drf.mixins.UpdateModelMixin, viewsets.GenericViewSet, drf.mixins.ListModelMixin
 ):
@@ -353,6 +406,14 @@ class DocumentViewSet(
     1. **is_favorite**: Indicates whether the document is marked as favorite by the current user.
     2. **user_roles**: Roles the current user has on the document or its ancestors.
 
+    ### Pagination:
+        List, children, descendants, favorite and trashbin views are paginated by page
+        number. Add `pagination=cursor` to switch to keyset pagination, which does not
+        count results and follows the "next" and "previous" cursors returned.
+
+        Example:
+        - GET /api/v1.0/documents/?pagination=cursor&page_size=50
+
     ### Notes:
     - Only the highest ancestor in a document hierarchy is shown in list views.
     - Implements soft delete logic to retain document tree structures.
@@ -362,6 +423,13 @@ class DocumentViewSet(
     ordering = ["-updated_at"]
     ordering_fields = ["created_at", "updated_at", "title"]
     pagination_class = Pagination
+    cursor_pagination_actions = [
+        "children",
+        "descendants",
+        "favorite_list",
+        "list",
+        "trashbin",
+    ]
     permission_classes = [
         permissions.DocumentPermission,
     ]
@@ -374,6 +442,36 @@ class DocumentViewSet(
     list_serializer_class = serializers.ListDocumentSerializer
     trashbin_serializer_class = serializers.ListDocumentSerializer
     tree_serializer_class = serializers.ListDocumentSerializer
+    # Values of documents that ETags are computed from, along with cache versions
+    etag_fields = [
+        "id",
+        "path",
+        "updated_at",
+        "title",
+        "content_hash",
+        "content_updates_count",
+        "link_reach",
+        "link_role",
+        "deleted_at",
+        "ancestors_deleted_at",
+        "has_deleted_children",
+        "numchild",
+        "is_favorite",
+        "user_roles",
+    ]
+
+    @property
+    def paginator(self):
+        """
+        Switch list actions to keyset pagination when the client opts in with the
+        `pagination=cursor` query parameter.
+        """
+        if (
+            self.action in self.cursor_pagination_actions
+            and self.request.query_params.get("pagination") == "cursor"
+        ):
+            self.pagination_class = CursorPagination
+        return super().paginator
 
     def get_queryset(self):
         """Get queryset performing all annotation and filtering on the document tree structure."""
@@ -450,15 +548,10 @@ class DocumentViewSet(
         for field in ["is_creator_me", "title"]:
             queryset = filterset.filters[field].filter(queryset, filter_data[field])
 
-        queryset = queryset.annotate_user_roles(user)
-
         # Among the results, we may have documents that are ancestors/descendants
         # of each other. In this case we want to keep only the highest ancestors.
-        root_paths = utils.filter_root_paths(
-            queryset.order_by("path").values_list("path", flat=True),
-            skip_sorting=True,
-        )
-        queryset = queryset.filter(path__in=root_paths)
+        queryset = queryset.filter_highest_ancestors()
+        queryset = queryset.annotate_user_roles(user)
 
         # Annotate favorite status and filter if applicable as late as possible
         queryset = queryset.annotate_is_favorite(user)
@@ -480,7 +573,6 @@ class DocumentViewSet(
         """
         user = self.request.user
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
 
         # The `create` query generates 5 db queries which are much less efficient than an
         # `exists` query. The user will visit the document many times after the first visit
@@ -491,7 +583,14 @@ class DocumentViewSet(
         ):
             models.LinkTrace.objects.create(document=instance, user=request.user)
 
-        return drf.response.Response(serializer.data)
+        etag = self.get_documents_etag(
+            [self.get_etag_values(instance)], request.query_params.get("omit_content")
+        )
+        if self._is_not_modified(request, etag):
+            return self.get_not_modified_response(etag)
+
+        serializer = self.get_serializer(instance)
+        return self.set_etag(drf.response.Response(serializer.data), etag)
 
     @transaction.atomic
     def perform_create(self, serializer):
@@ -522,7 +621,7 @@ class DocumentViewSet(
     def _can_user_edit_document(self, document_id, set_cache=False):
         """Check if the user can edit the document."""
         try:
-            count, exists = CollaborationService().get_document_connection_info(
+            count, exists = CollaborationService().get_cached_document_connection_info(
                 document_id,
                 self.request.session.session_key,
             )
@@ -579,6 +678,35 @@ class DocumentViewSet(
             "You are not allowed to edit this document."
         )
 
+    @drf.decorators.action(
+        detail=True,
+        methods=["post"],
+        url_path="content-updates",
+    )
+    def content_updates(self, request, *args, **kwargs):
+        """
+        Append an incremental Yjs update to the content of the document instead of
+        replacing the whole content, following the same collaboration rules as updates.
+        """
+        document = self.get_object()
+
+        serializer = serializers.DocumentContentUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if not (
+            serializer.validated_data.get("websocket", False)
+            or not settings.COLLABORATION_WS_NOT_CONNECTED_READY_ONLY
+            or self._can_user_edit_document(document.id, set_cache=True)
+        ):
+            raise drf.exceptions.PermissionDenied(
+                "You are not allowed to edit this document."
+            )
+
+        document.append_content_update(
+            base64.b64decode(serializer.validated_data["content"])
+        )
+        return drf.response.Response(status=status.HTTP_201_CREATED)
+
     @drf.decorators.action(
         detail=True,
         methods=["get"],
@@ -596,6 +724,31 @@ class DocumentViewSet(
 
         return drf.response.Response({"can_edit": can_edit})
 
+    @drf.decorators.action(
+        authentication_classes=[authentication.ServerToServerAuthentication],
+        detail=True,
+        methods=["post"],
+        permission_classes=[],
+    )
+    def connections(self, request, pk=None):
+        """
+        Receive the connections to a document pushed by the collaboration server when
+        they change, so that "can-edit" checks don't need to call it.
+        """
+        try:
+            room = str(uuid.UUID(pk))
+        except ValueError as err:
+            raise Http404 from err
+
+        serializer = serializers.DocumentConnectionsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        CollaborationService.set_document_connections(
+            room,
+            serializer.validated_data["count"],
+            serializer.validated_data["session_keys"],
+        )
+        return drf.response.Response(status=status.HTTP_204_NO_CONTENT)
+
     @drf.decorators.action(
         detail=False,
         methods=["get"],
@@ -628,24 +781,15 @@ class DocumentViewSet(
         if not request.user.is_authenticated:
             return self.get_response_for_queryset(self.queryset.none())
 
-        access_documents_paths = (
-            models.DocumentAccess.objects.select_related("document")
-            .filter(
-                db.Q(user=self.request.user) | db.Q(team__in=self.request.user.teams),
-                role=models.RoleChoices.OWNER,
-            )
-            .values_list("document__path", flat=True)
-        )
-
-        children_clause = db.Q()
-        for path in access_documents_paths:
-            children_clause |= db.Q(path__startswith=path)
+        access_documents_paths = models.DocumentAccess.objects.filter(
+            db.Q(user=self.request.user) | db.Q(team__in=self.request.user.teams),
+            role=models.RoleChoices.OWNER,
+        ).values_list("document_path", flat=True)
 
         queryset = self.queryset.filter(
-            children_clause,
             deleted_at__isnull=False,
             deleted_at__gte=models.get_trashbin_cutoff(),
-        )
+        ).descendants_of_any(access_documents_paths)
         queryset = queryset.annotate_user_roles(self.request.user)
 
         return self.get_response_for_queryset(queryset)
@@ -823,17 +967,34 @@ class DocumentViewSet(
 
         queryset = filterset.qs
 
+        # The ETag is computed from the page being served, which is fetched anyway
+        page = self.paginate_queryset(queryset)
+        documents = list(queryset) if page is None else page
+        etag = self.get_documents_etag(
+            map(self.get_etag_values, documents),
+            request.get_full_path(),
+            *(() if page is None else self.get_pagination_etag_parts()),
+        )
+        if self._is_not_modified(request, etag):
+            return self.get_not_modified_response(etag)
+
         # Pass ancestors' links paths mapping to the serializer as a context variable
         # in order to allow saving time while computing abilities on the instance
         paths_links_mapping = document.compute_ancestors_links_paths_mapping()
 
-        return self.get_response_for_queryset(
-            queryset,
+        serializer = self.get_serializer(
+            documents,
+            many=True,
             context={
                 "request": request,
                 "paths_links_mapping": paths_links_mapping,
             },
         )
+        if page is None:
+            response = drf.response.Response(serializer.data)
+        else:
+            response = self.get_paginated_response(serializer.data)
+        return self.set_etag(response, etag)
 
     @drf.decorators.action(
         detail=True,
@@ -870,7 +1031,9 @@ class DocumentViewSet(
         try:
             current_document = (
                 self.queryset.select_related(None)
-                .only("depth", "path", "ancestors_deleted_at")
+                .only(
+                    "depth", "path", "ancestors_deleted_at", "link_reach", "link_role"
+                )
                 .get(pk=pk)
             )
         except models.Document.DoesNotExist as excpt:
@@ -910,23 +1073,24 @@ class DocumentViewSet(
                     if request.user.is_authenticated
                     else drf.exceptions.NotAuthenticated()
                 )
-        paths_links_mapping = {}
-        ancestors_links = []
-        children_clause = db.Q()
-        for ancestor in ancestors:
-            # Compute cache for ancestors links to avoid many queries while computing
-            # abilities for his documents in the tree!
-            ancestors_links.append(
-                {"link_reach": ancestor.link_reach, "link_role": ancestor.link_role}
+        # Compute cache for ancestors links to avoid many queries while computing
+        # abilities for his documents in the tree!
+        if is_deleted:
+            paths_links_mapping = {
+                current_document.path: [current_document.link_definition]
+            }
+        else:
+            paths_links_mapping = (
+                current_document.compute_ancestors_links_paths_mapping()
             )
-            paths_links_mapping[ancestor.path] = ancestors_links.copy()
 
-            if ancestor.depth < highest_readable.depth:
+        children_clause = db.Q()
+        for path in paths_links_mapping:
+            depth = len(path) // current_document.steplen
+            if depth < highest_readable.depth:
                 continue
 
-            children_clause |= db.Q(
-                path__startswith=ancestor.path, depth=ancestor.depth + 1
-            )
+            children_clause |= db.Q(path__startswith=path, depth=depth + 1)
 
         children = self.queryset.filter(children_clause, deleted_at__isnull=True)
 
@@ -940,19 +1104,26 @@ class DocumentViewSet(
         queryset = queryset.annotate_user_roles(user)
         queryset = queryset.annotate_is_favorite(user)
 
+        # The ETag is computed from the documents, which are all served anyway
+        documents = list(queryset)
+        etag = self.get_documents_etag(map(self.get_etag_values, documents))
+        if self._is_not_modified(request, etag):
+            return self.get_not_modified_response(etag)
+
         # Pass ancestors' links paths mapping to the serializer as a context variable
         # in order to allow saving time while computing abilities on the instance
         serializer = self.get_serializer(
-            queryset,
+            documents,
             many=True,
             context={
                 "request": request,
                 "paths_links_mapping": paths_links_mapping,
             },
         )
-        return drf.response.Response(
+        response = drf.response.Response(
             utils.nest_tree(serializer.data, self.queryset.model.steplen)
         )
+        return self.set_etag(response, etag)
 
     @drf.decorators.action(
         detail=True,
@@ -1082,7 +1253,7 @@ class DocumentViewSet(
         # document. Filter to get the minimum access date for the logged-in user
         access_queryset = models.DocumentAccess.objects.filter(
             db.Q(user=user) | db.Q(team__in=user.teams),
-            document__path=Left(db.Value(document.path), Length("document__path")),
+            document_path__in=document.ancestors_and_self_paths,
         ).aggregate(min_date=db.Min("created_at"))
 
         # Handle the case where the user has no accesses
@@ -1092,13 +1263,24 @@ class DocumentViewSet(
                 "Only users with specific access can see version history"
             )
 
+        # A new version is written each time the content changes
+        etag = utils.compute_etag(
+            document.content_hash,
+            document.updated_at,
+            document.get_versions_cache_version(),
+            min_datetime,
+            sorted(serializer.validated_data.items()),
+        )
+        if self._is_not_modified(request, etag):
+            return self.get_not_modified_response(etag)
+
         versions_data = document.get_versions_slice(
             from_version_id=serializer.validated_data.get("version_id"),
             min_datetime=min_datetime,
             page_size=serializer.validated_data.get("page_size"),
         )
 
-        return drf.response.Response(versions_data)
+        return self.set_etag(drf.response.Response(versions_data), etag)
 
     @drf.decorators.action(
         detail=True,
@@ -1110,23 +1292,28 @@ class DocumentViewSet(
         """Custom action to retrieve a specific version of a document"""
         document = self.get_object()
 
-        try:
-            response = document.get_content_response(version_id=version_id)
-        except (FileNotFoundError, ClientError) as err:
-            raise Http404 from err
-
         # Don't let users access versions that were created before they were given access
         # to the document
         user = request.user
-        min_datetime = min(
-            access.created_at
-            for access in models.DocumentAccess.objects.filter(
-                db.Q(user=user) | db.Q(team__in=user.teams),
-                document__path=Left(db.Value(document.path), Length("document__path")),
-            )
-        )
+        min_datetime = models.DocumentAccess.objects.filter(
+            db.Q(user=user) | db.Q(team__in=user.teams),
+            document_path__in=document.ancestors_and_self_paths,
+        ).aggregate(min_date=db.Min("created_at"))["min_date"]
+
+        if not min_datetime:
+            raise Http404
+
+        # Versions written before versions were indexed in database are only found in
+        # object storage
+        version = document.versions.filter(version_id=version_id).first()
+        response = None
+        if version is None:
+            response = self._get_version_content_response(document, version_id)
+            last_modified = response["LastModified"]
+        else:
+            last_modified = version.last_modified
 
-        if response["LastModified"] < min_datetime:
+        if last_modified < min_datetime:
             raise Http404
 
         if request.method == "DELETE":
@@ -1135,14 +1322,25 @@ class DocumentViewSet(
                 status=response["ResponseMetadata"]["HTTPStatusCode"]
             )
 
+        if response is None:
+            response = self._get_version_content_response(document, version_id)
+
         return drf.response.Response(
             {
                 "content": response["Body"].read().decode("utf-8"),
-                "last_modified": response["LastModified"],
+                "last_modified": last_modified,
                 "id": version_id,
             }
         )
 
+    @staticmethod
+    def _get_version_content_response(document, version_id):
+        """Get a version of a document from object storage or raise a 404."""
+        try:
+            return document.get_content_response(version_id=version_id)
+        except (FileNotFoundError, ClientError) as err:
+            raise Http404 from err
+
     @drf.decorators.action(detail=True, methods=["put"], url_path="link-configuration")
     def link_configuration(self, request, *args, **kwargs):
         """Update link configuration with specific rights (cf get_abilities)."""
@@ -1155,10 +1353,10 @@ class DocumentViewSet(
         )
         serializer.is_valid(raise_exception=True)
 
-        serializer.save()
-
-        # Notify collaboration server about the link updated
-        CollaborationService().reset_connections(str(document.id))
+        with transaction.atomic():
+            serializer.save()
+            # Notify collaboration server about the link updated
+            models.CollaborationNotification.reset_connections(str(document.id))
 
         return drf.response.Response(serializer.data, status=drf.status.HTTP_200_OK)
 
@@ -1289,6 +1487,7 @@ class DocumentViewSet(
         # Make the attachment readable by document readers
         document.attachments.append(key)
         document.save()
+        models.DocumentAttachment.objects.create(key=key)
 
         malware_detection.analyse_file(key, document_id=document.id)
 
@@ -1341,6 +1540,44 @@ class DocumentViewSet(
             logger.debug("Failed to extract parameters from subrequest URL: %s", exc)
             raise drf.exceptions.PermissionDenied() from exc
 
+    def _media_auth_check_permission(self, user, key):
+        """
+        Raise a permission error unless the attachment is ready and included in a
+        document that the user can read per se or via one of its ancestors.
+        """
+        # The documents including the attachment are found via the GIN index on
+        # attachments. Then we look for a document readable per se among them and
+        # their ancestors.
+        attachments_documents = (
+            self.queryset.select_related(None)
+            .filter(attachments__contains=[key])
+            .only("path")
+        )
+        paths = {
+            path
+            for document in attachments_documents
+            for path in document.ancestors_and_self_paths
+        }
+
+        if (
+            not paths
+            or not self.queryset.select_related(None)
+            .filter(path__in=paths)
+            .readable_per_se(user)
+            .exists()
+        ):
+            logger.debug("User '%s' lacks permission for attachment", user)
+            raise drf.exceptions.PermissionDenied()
+
+        # Check if the attachment is ready
+        try:
+            status = models.DocumentAttachment.get_status(key)
+        except ClientError as err:
+            raise drf.exceptions.PermissionDenied() from err
+
+        if status != enums.DocumentAttachmentStatus.READY:
+            raise drf.exceptions.PermissionDenied()
+
     @drf.decorators.action(detail=False, methods=["get"], url_path="media-auth")
     def media_auth(self, request, *args, **kwargs):
         """
@@ -1360,45 +1597,11 @@ class DocumentViewSet(
         user = request.user
         key = f"{url_params['pk']:s}/{url_params['attachment']:s}"
 
-        # Look for a document to which the user has access and that includes this attachment
-        # We must look into all descendants of any document to which the user has access per se
-        readable_per_se_paths = (
-            self.queryset.readable_per_se(user)
-            .order_by("path")
-            .values_list("path", flat=True)
-        )
-
-        attachments_documents = (
-            self.queryset.select_related(None)
-            .filter(attachments__contains=[key])
-            .only("path")
-            .order_by("path")
-        )
-        readable_attachments_paths = filter_descendants(
-            [doc.path for doc in attachments_documents],
-            readable_per_se_paths,
-            skip_sorting=True,
-        )
-
-        if not readable_attachments_paths:
-            logger.debug("User '%s' lacks permission for attachment", user)
-            raise drf.exceptions.PermissionDenied()
-
-        # Check if the attachment is ready
-        s3_client = default_storage.connection.meta.client
-        bucket_name = default_storage.bucket_name
-        try:
-            head_resp = s3_client.head_object(Bucket=bucket_name, Key=key)
-        except ClientError as err:
-            raise drf.exceptions.PermissionDenied() from err
-        metadata = head_resp.get("Metadata", {})
-        # In order to be compatible with existing upload without `status` metadata,
-        # we consider them as ready.
-        if (
-            metadata.get("status", enums.DocumentAttachmentStatus.READY)
-            != enums.DocumentAttachmentStatus.READY
-        ):
-            raise drf.exceptions.PermissionDenied()
+        # Authorizations are cached for a short time as a page usually loads many media
+        authorization_cache_key = f"media_auth_{user.pk or 'anonymous'!s}_{key:s}"
+        if not cache.get(authorization_cache_key):
+            self._media_auth_check_permission(user, key)
+            cache.set(authorization_cache_key, True, settings.MEDIA_AUTH_CACHE_TIMEOUT)
 
         # Generate S3 authorization headers using the extracted URL parameters
         request = utils.generate_s3_authorization_headers(key)
@@ -1426,22 +1629,19 @@ class DocumentViewSet(
             )
 
         # Check if the attachment is ready
-        s3_client = default_storage.connection.meta.client
-        bucket_name = default_storage.bucket_name
         try:
-            head_resp = s3_client.head_object(Bucket=bucket_name, Key=key)
+            attachment_status = models.DocumentAttachment.get_status(key)
         except ClientError as err:
             logger.error("Client Error fetching file %s metadata: %s", key, err)
             return drf.response.Response(
                 {"detail": "Media not found"},
                 status=drf.status.HTTP_404_NOT_FOUND,
             )
-        metadata = head_resp.get("Metadata", {})
 
         body = {
-            "status": metadata.get("status", enums.DocumentAttachmentStatus.PROCESSING),
+            "status": attachment_status,
         }
-        if metadata.get("status") == enums.DocumentAttachmentStatus.READY:
+        if attachment_status == enums.DocumentAttachmentStatus.READY:
             body = {
                 "status": enums.DocumentAttachmentStatus.READY,
                 "file": f"{settings.MEDIA_URL:s}{key:s}",
@@ -1462,7 +1662,8 @@ class DocumentViewSet(
         with expected data:
         - text: str
         - action: str [prompt, correct, rephrase, summarize]
-        Return JSON response with the processed text.
+        - stream: bool (optional)
+        Return JSON response with the processed text, or stream it as server-sent events.
         """
         # Check permissions first
         self.get_object()
@@ -1473,6 +1674,11 @@ class DocumentViewSet(
         text = serializer.validated_data["text"]
         action = serializer.validated_data["action"]
 
+        if serializer.validated_data["stream"]:
+            return self._get_ai_stream_response(
+                AIService().transform_stream(text, action)
+            )
+
         response = AIService().transform(text, action)
 
         return drf.response.Response(response, status=drf.status.HTTP_200_OK)
@@ -1490,7 +1696,9 @@ class DocumentViewSet(
         with expected data:
         - text: str
         - language: str [settings.LANGUAGES]
-        Return JSON response with the translated text.
+        - stream: bool (optional)
+        Return JSON response with the translated text, or stream it as server-sent
+        events.
         """
         # Check permissions first
         self.get_object()
@@ -1501,10 +1709,128 @@ class DocumentViewSet(
         text = serializer.validated_data["text"]
         language = serializer.validated_data["language"]
 
+        if serializer.validated_data["stream"]:
+            return self._get_ai_stream_response(
+                AIService().translate_stream(text, language)
+            )
+
         response = AIService().translate(text, language)
 
         return drf.response.Response(response, status=drf.status.HTTP_200_OK)
 
+    def get_ai_cost(self, request):
+        """
+        Return the number of requests to the AI API made by a request, which AI throttles
+        count: translating a document sends a request per block of text.
+        """
+        if self.action != "ai_translate_document":
+            return 1
+
+        try:
+            _doc, text_nodes = load_text_nodes(self.get_object().content)
+        except ValueError:
+            text_nodes = []
+
+        # Jobs failing before calling the AI API count as a single request
+        if not 0 < len(text_nodes) <= settings.AI_TRANSLATE_DOCUMENT_MAX_BLOCKS:
+            return 1
+        return len(text_nodes)
+
+    @drf.decorators.action(
+        detail=True,
+        methods=["post"],
+        name="Translate a whole document with AI",
+        url_path="ai-translate-document",
+        permission_classes=[
+            permissions.IsAuthenticated,
+            permissions.DocumentPermission,
+        ],
+        throttle_classes=[utils.AIDocumentRateThrottle, utils.AIUserRateThrottle],
+    )
+    def ai_translate_document(self, request, *args, **kwargs):
+        """
+        POST /api/v1.0/documents/<resource_id>/ai-translate-document
+        with expected data:
+        - language: str [settings.LANGUAGES]
+        - duplicate: bool (optional)
+        Start translating the document in the background, block by block, and return
+        the id of the job to poll for its progress. If "duplicate" is set, the
+        translation is saved as a new document. Each block is counted against the AI
+        rate limits.
+        """
+        document = self.get_object()
+
+        serializer = serializers.AITranslateDocumentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Fail early if AI is not configured
+        AIService()
+
+        job_id = str(uuid.uuid4())
+        update_translation_job(
+            job_id,
+            status="pending",
+            progress=0,
+            total=None,
+            document_id=str(document.id),
+            user_id=str(request.user.id),
+        )
+        translate_document.delay(
+            job_id,
+            str(document.id),
+            str(request.user.id),
+            serializer.validated_data["language"],
+            duplicate=serializer.validated_data["duplicate"],
+        )
+
+        return drf.response.Response(
+            {"id": job_id}, status=drf.status.HTTP_202_ACCEPTED
+        )
+
+    @drf.decorators.action(
+        detail=True,
+        methods=["get"],
+        url_path="ai-translate-document/(?P<job_id>[0-9a-z-]+)",
+        permission_classes=[
+            permissions.IsAuthenticated,
+            permissions.DocumentPermission,
+        ],
+    )
+    def ai_translate_document_status(self, request, job_id, *args, **kwargs):
+        """
+        GET /api/v1.0/documents/<resource_id>/ai-translate-document/<job_id>
+        Return the status and the progress of a document translation job and, once it
+        succeeded, the translated content or the id of the translated document.
+        """
+        document = self.get_object()
+
+        job = get_translation_job(job_id)
+        if (
+            job is None
+            # The job may have been evicted from the cache and updated since
+            or job.get("document_id") != str(document.id)
+            or job.get("user_id") != str(request.user.id)
+        ):
+            raise Http404
+
+        return drf.response.Response(
+            {
+                key: value
+                for key, value in job.items()
+                if key not in {"document_id", "user_id"}
+            }
+        )
+
+    @staticmethod
+    def _get_ai_stream_response(chunks):
+        """Stream the pieces of an AI answer as server-sent events."""
+        return StreamingHttpResponse(
+            utils.iter_server_sent_events(chunks),
+            content_type="text/event-stream",
+            # Prevent caches and proxies from buffering the events
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     @drf.decorators.action(
         detail=True,
         methods=["get"],
@@ -1539,7 +1865,7 @@ class DocumentViewSet(
             )
 
         try:
-            response = requests.get(
+            response = get_session(PROXY_SESSION).get(
                 url,
                 stream=True,
                 headers={
@@ -1551,6 +1877,8 @@ class DocumentViewSet(
             content_type = response.headers.get("Content-Type", "")
 
             if not content_type.startswith("image/"):
+                # Discard the connection rather than downloading the body to reuse it
+                response.close()
                 return drf.response.Response(
                     status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
                 )
@@ -1599,6 +1927,10 @@ class DocumentViewSet(
                 "Invalid format. Must be one of: json, markdown, html"
             )
 
+        etag = self.get_documents_etag([self.get_etag_values(document)], content_format)
+        if self._is_not_modified(request, etag):
+            return self.get_not_modified_response(etag)
+
         # Get the base64 content from the document
         content = None
         base64_content = document.content
@@ -1627,7 +1959,7 @@ class DocumentViewSet(
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 )
 
-        return drf_response.Response(
+        response = drf_response.Response(
             {
                 "id": str(document.id),
                 "title": document.title,
@@ -1636,6 +1968,161 @@ class DocumentViewSet(
                 "updated_at": document.updated_at,
             }
         )
+        return self.set_etag(response, etag)
+
+    @drf.decorators.action(
+        detail=True,
+        methods=["get"],
+        url_path=r"content\.bin",
+        url_name="content-bin",
+        name="Get document content as raw Yjs bytes",
+    )
+    def content_bin(self, request, *args, **kwargs):
+        """
+        Stream the raw Yjs content of the document, decoded on the fly from the base64
+        file in object storage instead of being embedded in a JSON body.
+
+        Conditional requests are supported with an ETag based on the hash of the content.
+        Single byte ranges (e.g. "bytes=0-1023") and contents with pending incremental
+        updates are served from memory, through the content cache.
+        """
+        document = self.get_object()
+        content_type = "application/vnd.yjs.doc"
+
+        etag = f'"{document.content_hash:s}"' if document.content_hash else None
+        if document.content_updates_count:
+            etag = utils.compute_etag(
+                document.content_hash,
+                document.content_updates_count,
+                document.updated_at,
+            )
+        if etag and self._is_not_modified(request, etag):
+            return self.get_not_modified_response(etag)
+
+        byte_range = self._get_content_byte_range(request, etag)
+        if byte_range is not None or document.content_updates_count:
+            if document.content is None:
+                raise Http404
+            content = base64.b64decode(document.content)
+            if byte_range is None:
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                start, end = byte_range
+                end = min(len(content) - 1, end if end is not None else len(content))
+                if start > end:
+                    return HttpResponse(
+                        status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                        headers={"Content-Range": f"bytes */{len(content):d}"},
+                    )
+                response = HttpResponse(
+                    content[start : end + 1],
+                    status=status.HTTP_206_PARTIAL_CONTENT,
+                    content_type=content_type,
+                    headers={
+                        "Content-Range": f"bytes {start:d}-{end:d}/{len(content):d}"
+                    },
+                )
+            response["Accept-Ranges"] = "bytes"
+            if etag:
+                response["ETag"] = etag
+            return response
+
+        try:
+            response = document.get_content_response()
+        except (FileNotFoundError, ClientError) as err:
+            raise Http404 from err
+
+        # Documents saved before the hash of their content was stored
+        if etag is None:
+            etag = response["ETag"]
+            if self._is_not_modified(request, etag):
+                response["Body"].close()
+                return self.get_not_modified_response(etag)
+
+        return StreamingHttpResponse(
+            iter_base64_decoded(response["Body"].iter_chunks(chunk_size=64 * 1024)),
+            content_type=content_type,
+            headers={"Accept-Ranges": "bytes", "ETag": etag},
+        )
+
+    @staticmethod
+    def _is_not_modified(request, etag):
+        """Return True if the ETag matches the "If-None-Match" header of the request."""
+        if_none_match = request.headers.get("If-None-Match")
+        if not if_none_match:
+            return False
+        etags = parse_etags(if_none_match)
+        return "*" in etags or etag in etags
+
+    def get_etag_values(self, document):
+        """Return the values of a document instance that ETags are computed from."""
+        return tuple(getattr(document, field, None) for field in self.etag_fields)
+
+    def get_pagination_etag_parts(self):
+        """
+        Return the count and links of the page being served, which ETags of paginated
+        responses depend on along with the documents of the page.
+        """
+        return tuple(self.get_paginated_response([]).data.items())
+
+    def get_documents_etag(self, documents_values, *parts):
+        """
+        Compute the ETag of a response built from documents for the current user, given
+        the values of `etag_fields` for each document and any other part the response
+        depends on.
+
+        The cache versions of the ancestors links and of the number of accesses of each
+        document are included: they change with the links and accesses of the document
+        and of its ancestors, on which its abilities depend.
+        """
+        documents_values = list(documents_values)
+        paths = [values[1] for values in documents_values]
+        steplen = models.Document.steplen
+        links_versions = get_prefix_versions(
+            models.ANCESTORS_LINKS_CACHE_NAMESPACE, paths, steplen
+        )
+        accesses_versions = get_prefix_versions(
+            models.NB_ACCESSES_CACHE_NAMESPACE, paths, steplen
+        )
+        return utils.compute_etag(
+            self.request.user.pk,
+            *parts,
+            *(
+                (values, links_versions[values[1]], accesses_versions[values[1]])
+                for values in documents_values
+            ),
+        )
+
+    def get_not_modified_response(self, etag):
+        """Return a 304 response for a request whose "If-None-Match" matched the ETag."""
+        return self.set_etag(HttpResponseNotModified(), etag)
+
+    @staticmethod
+    def set_etag(response, etag):
+        """
+        Set the ETag of a response, to be revalidated on each request as it depends on
+        the user.
+        """
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @staticmethod
+    def _get_content_byte_range(request, etag):
+        """
+        Return the first and last (or None) positions of the single byte range requested,
+        or None if the whole content should be returned.
+        """
+        if_range = request.headers.get("If-Range")
+        if if_range and if_range != etag:
+            return None
+
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", request.headers.get("Range", ""))
+        if match is None:
+            return None
+
+        start, end = match.groups()
+        return int(start), int(end) if end else None
 
 
 class DocumentAccessViewSet(
@@ -1812,25 +2299,27 @@ class DocumentAccessViewSet(
 
     def perform_update(self, serializer):
         """Update an access to the document and notify the collaboration server."""
-        access = serializer.save()
+        with transaction.atomic():
+            access = serializer.save()
 
-        access_user_id = None
-        if access.user:
-            access_user_id = str(access.user.id)
+            access_user_id = None
+            if access.user:
+                access_user_id = str(access.user.id)
 
-        # Notify collaboration server about the access change
-        CollaborationService().reset_connections(
-            str(access.document.id), access_user_id
-        )
+            # Notify collaboration server about the access change
+            models.CollaborationNotification.reset_connections(
+                str(access.document.id), access_user_id
+            )
 
     def perform_destroy(self, instance):
         """Delete an access to the document and notify the collaboration server."""
-        instance.delete()
+        with transaction.atomic():
+            instance.delete()
 
-        # Notify collaboration server about the access removed
-        CollaborationService().reset_connections(
-            str(instance.document.id), str(instance.user.id)
-        )
+            # Notify collaboration server about the access removed
+            models.CollaborationNotification.reset_connections(
+                str(instance.document.id), str(instance.user.id)
+            )
 
 
 class TemplateViewSet(
@@ -0,0 +1,189 @@
+"""
+Cache utilities for the impress core application:
+- an in-process LRU cache, bounded in entries or in size, to put in front of the
+  shared cache,
+- path prefix generations to invalidate cached values for a whole subtree at once,
+- coalescing of concurrent computations of a same value.
+"""
+
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+PREFIX_GENERATION_KEY = "{namespace:s}_generation_{prefix:s}"
+
+
+class LRUCache:
+    """
+    A thread-safe in-process cache evicting the least recently used entries. The cache
+    is bounded in number of entries and/or in total length of the cached values. Values
+    larger than the maximum size are not cached. Values may also expire after a timeout.
+    """
+
+    def __init__(self, max_entries=None, max_size=None):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value cached for a key and mark it as recently used."""
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                return default
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._pop(key)
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        """
+        Cache a value, for a number of seconds if a timeout is given, evicting the least
+        recently used entries if needed.
+        """
+        if self.max_entries == 0 or self.max_size == 0:
+            return
+
+        if self.max_size is not None and len(value) > self.max_size:
+            self.delete(key)
+            return
+
+        with self._lock:
+            self._pop(key)
+            expires_at = None if timeout is None else time.monotonic() + timeout
+            self._data[key] = (expires_at, value)
+            if self.max_size is not None:
+                self.size += len(value)
+            while (
+                self.max_entries is not None and len(self._data) > self.max_entries
+            ) or (self.max_size is not None and self.size > self.max_size):
+                self._pop(next(iter(self._data)))
+
+    def delete(self, key):
+        """Remove a key from the cache if it is present."""
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        """Empty the cache."""
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def _pop(self, key):
+        """Remove a key, the lock being held by the caller."""
+        item = self._data.pop(key, None)
+        if item is not None and self.max_size is not None:
+            self.size -= len(item[1])
+
+    def __len__(self):
+        return len(self._data)
+
+
+def get_path_prefixes(path, steplen):
+    """
+    Return all the prefixes of a materialized path, from the empty prefix that is shared
+    by all paths, to the path itself.
+    """
+    return ["", *(path[:length] for length in range(steplen, len(path) + 1, steplen))]
+
+
+def get_prefix_versions(namespace, paths, steplen):
+    """
+    Return, for each path, a version identifying the current generation of all its
+    prefixes. Generations of all the prefixes are fetched in one cache request.
+
+    The version of a path changes as soon as the generation of any of its prefixes is
+    bumped (see `invalidate_prefix`) so that values cached under a versioned key are
+    invalidated for a whole subtree at once. Generations are random tokens rather than
+    counters so that an evicted generation can never bring back a value cached before
+    an invalidation.
+    """
+    keys_per_path = {
+        path: [
+            PREFIX_GENERATION_KEY.format(namespace=namespace, prefix=prefix)
+            for prefix in get_path_prefixes(path, steplen)
+        ]
+        for path in paths
+    }
+    keys = {key for path_keys in keys_per_path.values() for key in path_keys}
+    generations = cache.get_many(keys)
+
+    missing = {key: secrets.token_hex(8) for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        generations.update(missing)
+
+    return {
+        path: hashlib.blake2b(
+            ":".join(generations[key] for key in path_keys).encode(), digest_size=16
+        ).hexdigest()
+        for path, path_keys in keys_per_path.items()
+    }
+
+
+def get_prefix_version(namespace, path, steplen):
+    """Return the version of a single path (see `get_prefix_versions`)."""
+    return get_prefix_versions(namespace, [path], steplen)[path]
+
+
+def invalidate_prefix(namespace, prefix):
+    """
+    Invalidate all values cached in a namespace for paths starting with the given prefix.
+    The empty prefix invalidates the whole namespace.
+    """
+    cache.set(
+        PREFIX_GENERATION_KEY.format(namespace=namespace, prefix=prefix),
+        secrets.token_hex(8),
+        timeout=None,
+    )
+
+
+class _InflightCall:
+    """A computation shared by the threads asking for the same key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_inflight_calls = {}
+_inflight_lock = threading.Lock()
+
+
+def coalesce(key, func):
+    """
+    Call a function, unless another thread of the process is already calling it for the
+    same key, in which case wait for its result instead of calling the function again.
+    """
+    with _inflight_lock:
+        call = _inflight_calls.get(key)
+        is_leader = call is None
+        if is_leader:
+            call = _inflight_calls[key] = _InflightCall()
+
+    if not is_leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = func()
+    except Exception as err:
+        call.error = err
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight_calls[key]
+        call.done.set()
+    return call.result
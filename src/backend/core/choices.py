@@ -1,5 +1,7 @@
 """Declare and configure choices for Docs' core application."""
 
+from functools import cache
+
 from django.db.models import TextChoices
 from django.utils.translation import gettext_lazy as _
 
@@ -70,18 +72,33 @@ class LinkReachChoices(PriorityTextChoices):
             Dictionary mapping possible reach levels to their corresponding possible roles.
         """
         return {
-            reach: [
-                role
-                for role in LinkRoleChoices.values
-                if LinkRoleChoices.get_priority(role)
-                >= LinkRoleChoices.get_priority(link_role)
-            ]
-            if reach != cls.RESTRICTED
-            else None
+            reach: list(roles) if roles is not None else None
+            for reach, roles in cls._get_select_options(link_reach, link_role)
+        }
+
+    @classmethod
+    @cache
+    def _get_select_options(cls, link_reach, link_role):
+        """
+        Compute the select options as immutable pairs of reach and roles. Results are
+        memoized as there are only a handful of possible combinations.
+        """
+        return tuple(
+            (
+                reach,
+                tuple(
+                    role
+                    for role in LinkRoleChoices.values
+                    if LinkRoleChoices.get_priority(role)
+                    >= LinkRoleChoices.get_priority(link_role)
+                )
+                if reach != cls.RESTRICTED
+                else None,
+            )
             for reach in cls.values
             if LinkReachChoices.get_priority(reach)
             >= LinkReachChoices.get_priority(link_reach)
-        }
+        )
 
 
 def get_equivalent_link_definition(ancestors_links):
@@ -3,7 +3,6 @@ Core application enums declaration
 """
 
 import re
-from enum import StrEnum
 
 from django.conf import global_settings, settings
 from django.db import models
@@ -41,8 +40,9 @@ class MoveNodePositionChoices(models.TextChoices):
     RIGHT = "right", _("Right")
 
 
-class DocumentAttachmentStatus(StrEnum):
+class DocumentAttachmentStatus(models.TextChoices):
     """Defines the possible statuses for an attachment."""
 
-    PROCESSING = "processing"
-    READY = "ready"
+    PROCESSING = "processing", _("Processing")
+    READY = "ready", _("Ready")
+    INFECTED = "infected", _("Infected")
@@ -7,7 +7,7 @@ from django.core.files.storage import default_storage
 from lasuite.malware_detection.enums import ReportStatus
 
 from core.enums import DocumentAttachmentStatus
-from core.models import Document
+from core.models import Document, DocumentAttachment
 
 logger = logging.getLogger(__name__)
 security_logger = logging.getLogger("docs.security")
@@ -18,6 +18,8 @@ def malware_detection_callback(file_path, status, error_info, **kwargs):
 
     if status == ReportStatus.SAFE:
         logger.info("File %s is safe", file_path)
+        DocumentAttachment.set_status(file_path, DocumentAttachmentStatus.READY)
+
         # Get existing metadata
         s3_client = default_storage.connection.meta.client
         bucket_name = default_storage.bucket_name
@@ -43,6 +45,8 @@ def malware_detection_callback(file_path, status, error_info, **kwargs):
         error_info,
     )
 
+    DocumentAttachment.set_status(file_path, DocumentAttachmentStatus.INFECTED)
+
     # Remove the file from the document and change the status to unsafe
     document = Document.objects.get(pk=document_id)
     document.attachments.remove(file_path)
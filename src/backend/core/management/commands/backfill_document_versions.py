@@ -0,0 +1,58 @@
+"""Management command indexing the versions of documents found in object storage."""
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.models import Document, DocumentVersion
+
+
+class Command(BaseCommand):
+    """
+    Index the versions of documents found in object storage, for documents saved before
+    versions were indexed on save. Versions already indexed are left untouched.
+    """
+
+    help = __doc__
+
+    def handle(self, *args, **options):
+        """Execute management command."""
+        s3_client = default_storage.connection.meta.client
+        bucket_name = default_storage.bucket_name
+
+        documents = Document.objects.only("id")
+        self.stdout.write(f"[INFO] Found {documents.count()} documents.")
+
+        initial_count = DocumentVersion.objects.count()
+        for document in documents.iterator():
+            file_key = document.file_key
+            markers = {}
+            versions = []
+
+            while True:
+                response = s3_client.list_object_versions(
+                    Bucket=bucket_name, Prefix=file_key, **markers
+                )
+                versions.extend(
+                    DocumentVersion(
+                        document=document,
+                        version_id=version["VersionId"],
+                        etag=version["ETag"],
+                        size=version["Size"],
+                        last_modified=version["LastModified"],
+                    )
+                    for version in response.get("Versions", [])
+                    # The prefix also matches keys starting with the file key
+                    if version["Key"] == file_key
+                )
+
+                if not response.get("IsTruncated"):
+                    break
+                markers = {
+                    "KeyMarker": response["NextKeyMarker"],
+                    "VersionIdMarker": response["NextVersionIdMarker"],
+                }
+
+            DocumentVersion.objects.bulk_create(versions, ignore_conflicts=True)
+
+        total_created = DocumentVersion.objects.count() - initial_count
+        self.stdout.write(f"[INFO] Indexed {total_created} versions.")
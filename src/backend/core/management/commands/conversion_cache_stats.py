@@ -0,0 +1,20 @@
+"""Management command reporting the hit rate of the conversion cache."""
+
+from django.core.management.base import BaseCommand
+
+from core.services.converter_services import get_conversion_cache_stats
+
+
+class Command(BaseCommand):
+    """Report the hits, misses and hit rate of the conversion cache across processes."""
+
+    help = __doc__
+
+    def handle(self, *args, **options):
+        """Execute management command."""
+        stats = get_conversion_cache_stats()
+        hit_rate = "-" if stats["hit_rate"] is None else f"{stats['hit_rate']:.1%}"
+        self.stdout.write(
+            f"[INFO] Conversion cache: {stats['hits']:d} hits, "
+            f"{stats['misses']:d} misses, hit rate {hit_rate:s}."
+        )
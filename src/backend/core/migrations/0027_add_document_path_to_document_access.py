@@ -0,0 +1,76 @@
+from django.db import migrations, models
+
+SET_DOCUMENT_PATH_SQL = """
+CREATE OR REPLACE FUNCTION impress_document_access_set_document_path()
+RETURNS trigger AS $$
+BEGIN
+    SELECT path INTO NEW.document_path
+    FROM impress_document WHERE id = NEW.document_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER impress_document_access_set_document_path
+BEFORE INSERT OR UPDATE ON impress_document_access
+FOR EACH ROW EXECUTE FUNCTION impress_document_access_set_document_path();
+
+CREATE OR REPLACE FUNCTION impress_document_sync_accesses_path()
+RETURNS trigger AS $$
+BEGIN
+    UPDATE impress_document_access SET document_path = NEW.path
+    WHERE document_id = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER impress_document_sync_accesses_path
+AFTER UPDATE OF path ON impress_document
+FOR EACH ROW WHEN (OLD.path IS DISTINCT FROM NEW.path)
+EXECUTE FUNCTION impress_document_sync_accesses_path();
+
+UPDATE impress_document_access AS a SET document_path = d.path
+FROM impress_document AS d WHERE a.document_id = d.id;
+"""
+
+DROP_DOCUMENT_PATH_SQL = """
+DROP TRIGGER IF EXISTS impress_document_sync_accesses_path ON impress_document;
+DROP FUNCTION IF EXISTS impress_document_sync_accesses_path();
+DROP TRIGGER IF EXISTS impress_document_access_set_document_path
+    ON impress_document_access;
+DROP FUNCTION IF EXISTS impress_document_access_set_document_path();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0026_allow_blank_properties"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentaccess",
+            name="document_path",
+            field=models.CharField(
+                blank=True,
+                db_collation="C",
+                default="",
+                editable=False,
+                max_length=252,
+            ),
+        ),
+        migrations.RunSQL(SET_DOCUMENT_PATH_SQL, reverse_sql=DROP_DOCUMENT_PATH_SQL),
+        migrations.AddIndex(
+            model_name="documentaccess",
+            index=models.Index(
+                fields=["user", "document_path"],
+                name="document_access_user_path_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="documentaccess",
+            index=models.Index(
+                fields=["team", "document_path"],
+                name="document_access_team_path_idx",
+            ),
+        ),
+    ]
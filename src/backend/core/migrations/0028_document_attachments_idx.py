@@ -0,0 +1,17 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0027_add_document_path_to_document_access"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="document",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["attachments"], name="document_attachments_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0032_documentversion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CollaborationNotification",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        help_text="primary key for the record as UUID",
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="id",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="date and time at which a record was created",
+                        verbose_name="created on",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="date and time at which a record was last updated",
+                        verbose_name="updated on",
+                    ),
+                ),
+                ("room", models.CharField(max_length=255, verbose_name="room")),
+                (
+                    "user_id",
+                    models.CharField(
+                        blank=True, max_length=255, null=True, verbose_name="user id"
+                    ),
+                ),
+                (
+                    "claimed_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="claimed at"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Collaboration notification",
+                "verbose_name_plural": "Collaboration notifications",
+                "db_table": "impress_collaboration_notification",
+                "ordering": ("created_at",),
+            },
+        ),
+    ]
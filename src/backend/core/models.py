@@ -13,10 +13,10 @@ from django.conf import settings
 from django.contrib.auth import models as auth_models
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.contrib.sites.models import Site
 from django.core import mail
 from django.core.cache import cache
-from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.core.mail import send_mail
 from django.db import models, transaction
@@ -32,6 +32,12 @@ from rest_framework.exceptions import ValidationError
 from timezone_field import TimeZoneField
 from treebeard.mp_tree import MP_Node, MP_NodeManager, MP_NodeQuerySet
 
+from .caches import (
+    LRUCache,
+    get_prefix_version,
+    get_prefix_versions,
+    invalidate_prefix,
+)
 from .choices import (
     PRIVILEGED_ROLES,
     LinkReachChoices,
@@ -39,10 +45,20 @@ from .choices import (
     RoleChoices,
     get_equivalent_link_definition,
 )
+from .enums import DocumentAttachmentStatus
+from .utils import merge_base64_yjs_updates, select_versions_to_thin
 from .validators import sub_validator
 
 logger = getLogger(__name__)
 
+ANCESTORS_LINKS_CACHE_NAMESPACE = "ancestors_links"
+NB_ACCESSES_CACHE_NAMESPACE = "nb_accesses"
+VERSIONS_CACHE_NAMESPACE = "versions"
+ancestors_links_local_cache = LRUCache(settings.ANCESTORS_LINKS_LOCAL_CACHE_SIZE)
+document_content_local_cache = LRUCache(
+    max_size=settings.DOCUMENT_CONTENT_LOCAL_CACHE_SIZE
+)
+
 
 def get_trashbin_cutoff():
     """
@@ -281,6 +297,44 @@ class BaseAccess(BaseModel):
         abstract = True
 
 
+class PathAncestors(models.Func):
+    """
+    Array of the paths of all the ancestors of a document, computed in SQL from its
+    path and depth. Comparing a path column against this array with `= ANY(...)` lets
+    Postgres resolve ancestors with index lookups instead of scanning for prefixes.
+    """
+
+    output_field = ArrayField(base_field=models.TextField())
+
+    def __init__(self, path, depth, include_self=False, **extra):
+        """Set whether the path of the document itself should be included."""
+        self.include_self = include_self
+        super().__init__(path, depth, **extra)
+
+    def as_sql(self, compiler, connection, function=None, template=None, **extra):
+        path, depth = self.get_source_expressions()
+        path_sql, path_params = compiler.compile(path)
+        depth_sql, depth_params = compiler.compile(depth)
+        upper_bound = depth_sql if self.include_self else f"{depth_sql:s} - 1"
+        return (
+            f"ARRAY(SELECT LEFT({path_sql:s}, n * {Document.steplen:d}) "  # noqa: S608
+            f"FROM generate_series(1, {upper_bound:s}) AS n)",
+            [*path_params, *depth_params],
+        )
+
+
+class EqualsAny(models.Func):
+    """Boolean expression checking that a value is equal to any item of an array."""
+
+    output_field = models.BooleanField()
+
+    def as_sql(self, compiler, connection, function=None, template=None, **extra):
+        value, array = self.get_source_expressions()
+        value_sql, value_params = compiler.compile(value)
+        array_sql, array_params = compiler.compile(array)
+        return f"{value_sql:s} = ANY({array_sql:s})", [*value_params, *array_params]
+
+
 class DocumentQuerySet(MP_NodeQuerySet):
     """
     Custom queryset for the Document model, providing additional methods
@@ -305,6 +359,49 @@ class DocumentQuerySet(MP_NodeQuerySet):
 
         return self.filter(link_reach=LinkReachChoices.PUBLIC)
 
+    def filter_highest_ancestors(self):
+        """
+        Keep only the documents that have none of their ancestors in the queryset. The
+        check is an anti-join looking up the paths of each document's ancestors.
+        """
+        return self.filter(
+            ~models.Exists(
+                self.order_by().filter(
+                    EqualsAny(
+                        "path",
+                        PathAncestors(
+                            models.OuterRef("path"), models.OuterRef("depth")
+                        ),
+                    )
+                )
+            )
+        )
+
+    def descendants_of_any(self, paths):
+        """
+        Keep only the documents located at or below any of the given paths.
+
+        `paths` can be a list of paths or a queryset of paths flattened with
+        `values_list`. A queryset is not evaluated: the ancestors of each document are
+        looked up in it by their exact paths, which an index on the queried path field
+        resolves without scanning it.
+        """
+        lineage_paths = PathAncestors(
+            models.OuterRef("path"), models.OuterRef("depth"), include_self=True
+        )
+
+        if isinstance(paths, models.QuerySet):
+            (field,) = paths.query.values_select
+            return self.filter(
+                models.Exists(paths.order_by().filter(EqualsAny(field, lineage_paths)))
+            )
+
+        return self.alias(
+            lineage_paths=PathAncestors(
+                models.F("path"), models.F("depth"), include_self=True
+            )
+        ).filter(lineage_paths__overlap=list(paths))
+
     def annotate_is_favorite(self, user):
         """
         Annotate document queryset with the favorite status for the current user.
@@ -325,9 +422,18 @@ class DocumentQuerySet(MP_NodeQuerySet):
         output_field = ArrayField(base_field=models.CharField())
 
         if user.is_authenticated:
+            # Accesses carry the path of their document so ancestors can be matched
+            # through the (user/team, document_path) indexes without joining documents
             user_roles_subquery = DocumentAccess.objects.filter(
                 models.Q(user=user) | models.Q(team__in=user.teams),
-                document__path=Left(models.OuterRef("path"), Length("document__path")),
+                EqualsAny(
+                    "document_path",
+                    PathAncestors(
+                        models.OuterRef("path"),
+                        models.OuterRef("depth"),
+                        include_self=True,
+                    ),
+                ),
             ).values_list("role", flat=True)
 
             return self.annotate(
@@ -391,8 +497,18 @@ class Document(MP_Node, BaseModel):
         blank=True,
         null=True,
     )
+    content_hash = models.CharField(
+        _("content hash"), max_length=64, null=True, blank=True, editable=False
+    )
+    content_size = models.PositiveBigIntegerField(
+        _("content size"), null=True, blank=True, editable=False
+    )
+    content_updates_count = models.PositiveIntegerField(default=0, editable=False)
 
     _content = None
+    _merged_content = None
+    # User to whom the version written for a new content is attributed
+    content_author = None
 
     # Tree structure
     alphabet = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
@@ -417,6 +533,10 @@ class Document(MP_Node, BaseModel):
                 name="check_deleted_at_matches_ancestors_deleted_at_when_set",
             ),
         ]
+        indexes = [
+            # Find the documents including an attachment, see `media_auth`
+            GinIndex(fields=["attachments"], name="document_attachments_idx"),
+        ]
 
     def __str__(self):
         return str(self.title) if self.title else str(_("Untitled Document"))
@@ -426,36 +546,140 @@ class Document(MP_Node, BaseModel):
         super().__init__(*args, **kwargs)
         self._ancestors_link_definition = None
         self._computed_link_definition = None
+        self._initial_link_definition = self._get_loaded_link_definition()
 
     def save(self, *args, **kwargs):
         """Write content to object storage only if _content has changed."""
-        super().save(*args, **kwargs)
+        is_adding = self._state.adding
 
+        has_changed = False
+        initial_content_hash = self.content_hash
+        initial_content_size = self.content_size
         if self._content:
-            file_key = self.file_key
             bytes_content = self._content.encode("utf-8")
+            content_hash = self.get_content_hash(bytes_content)
+            has_changed = self._has_content_changed(
+                bytes_content, content_hash, is_adding
+            )
+            if content_hash != self.content_hash:
+                self.content_hash = content_hash
+                self.content_size = len(bytes_content)
+                if kwargs.get("update_fields") is not None:
+                    kwargs["update_fields"] = {
+                        *kwargs["update_fields"],
+                        "content_hash",
+                        "content_size",
+                    }
+
+        # The content is written to object storage before its hash is saved, which
+        # must not happen if the content could not be written or later saves would not
+        # write it. The row is only locked once the content is written.
+        try:
+            response = self._write_content(bytes_content) if has_changed else None
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                if response is not None:
+                    self._create_version(response, bytes_content, is_adding)
+        except Exception:
+            self.content_hash = initial_content_hash
+            self.content_size = initial_content_size
+            self._state.adding = is_adding
+            raise
+
+        link_definition = self._get_loaded_link_definition()
+        if not is_adding and link_definition != self._initial_link_definition:
+            self.invalidate_ancestors_links_cache()
+        self._initial_link_definition = link_definition
+
+        if has_changed:
+            self._set_cached_content(self._content)
+            self._warm_conversions()
+
+    def _warm_conversions(self):
+        """Convert the new content in the background to fill the conversion cache."""
+        # pylint: disable=import-outside-toplevel
+        from core.tasks.documents import warm_document_conversions  # noqa: PLC0415
+
+        if settings.CONVERSION_CACHE_TIMEOUT and settings.CONVERSION_CACHE_WARM_FORMATS:
+            transaction.on_commit(lambda: warm_document_conversions.delay(self.pk))
+
+    def _write_content(self, bytes_content):
+        """Write the content to object storage and return the response."""
+        return default_storage.connection.meta.client.put_object(
+            Bucket=default_storage.bucket_name,
+            Key=self.file_key,
+            Body=bytes_content,
+        )
 
-            # Attempt to directly check if the object exists using the storage client.
-            try:
-                response = default_storage.connection.meta.client.head_object(
-                    Bucket=default_storage.bucket_name, Key=file_key
-                )
-            except ClientError as excpt:
-                # If the error is a 404, the object doesn't exist, so we should create it.
-                if excpt.response["Error"]["Code"] == "404":
-                    has_changed = True
-                else:
-                    raise
-            else:
-                # Compare the existing ETag with the MD5 hash of the new content.
-                has_changed = (
-                    response["ETag"].strip('"')
-                    != hashlib.md5(bytes_content).hexdigest()  # noqa: S324
-                )
+    def _create_version(self, response, bytes_content, is_adding):
+        """
+        Index the version created by writing the content so that versions can be listed
+        without requesting object storage.
+        """
+        # Versioning may not be enabled on the bucket
+        if not response.get("VersionId"):
+            return
+
+        author = self.content_author or (self.creator if is_adding else None)
+        DocumentVersion.objects.create(
+            document=self,
+            version_id=response["VersionId"],
+            etag=response["ETag"],
+            content_hash=self.content_hash,
+            size=len(bytes_content),
+            author=author if author and author.is_authenticated else None,
+            last_modified=timezone.now(),
+        )
 
-            if has_changed:
-                content_file = ContentFile(bytes_content)
-                default_storage.save(file_key, content_file)
+    @staticmethod
+    def get_content_hash(bytes_content):
+        """Return the hash stored to detect changes of the content of a document."""
+        return hashlib.blake2b(bytes_content, digest_size=32).hexdigest()
+
+    def _has_content_changed(self, bytes_content, content_hash, is_adding):
+        """
+        Compare the content to be saved with the content in object storage. The hash
+        stored in database spares a request to object storage, except for documents
+        saved before it was recorded, for which the ETag of the file is compared with
+        the MD5 hash of the content.
+        """
+        if is_adding:
+            return True
+
+        if self.content_hash is not None:
+            return content_hash != self.content_hash
+
+        try:
+            response = default_storage.connection.meta.client.head_object(
+                Bucket=default_storage.bucket_name, Key=self.file_key
+            )
+        except ClientError as excpt:
+            # If the error is a 404, the object doesn't exist, so we should create it.
+            if excpt.response["Error"]["Code"] == "404":
+                return True
+            raise
+
+        return (
+            response["ETag"].strip('"')
+            != hashlib.md5(bytes_content).hexdigest()  # noqa: S324
+        )
+
+    def _get_loaded_link_definition(self):
+        """Return the link definition as loaded, without fetching deferred fields."""
+        return (self.__dict__.get("link_reach"), self.__dict__.get("link_role"))
+
+    def move(self, target, pos=None):
+        """
+        Move the document and invalidate the cached links below its former and new
+        parents, as siblings on both sides may have been shifted.
+        """
+        super().move(target, pos=pos)
+
+        pos = pos or "last-sibling"
+        self.invalidate_ancestors_links_cache(self.path[: -self.steplen])
+        self.invalidate_ancestors_links_cache(
+            target.path if pos.endswith("-child") else target.path[: -self.steplen]
+        )
 
     def is_leaf(self):
         """
@@ -479,16 +703,75 @@ class Document(MP_Node, BaseModel):
 
     @property
     def content(self):
-        """Return the json content from object storage if available"""
+        """
+        Return the json content, with the pending incremental updates merged into the
+        content from the content cache or from object storage if available.
+        """
+        content = self._get_content_snapshot()
+        if not self.content_updates_count:
+            return content
+
+        if self._merged_content is None:
+            self._merged_content = merge_base64_yjs_updates(
+                content,
+                self.content_updates.values_list("data", flat=True),
+            )
+        return self._merged_content
+
+    def _get_content_snapshot(self):
+        """
+        Return the content as last written, from the content cache or from object
+        storage, without the pending incremental updates.
+        """
+        if self._content is None and self.id:
+            self._content = self._get_cached_content()
+
         if self._content is None and self.id:
             try:
                 response = self.get_content_response()
             except (FileNotFoundError, ClientError):
                 pass
             else:
-                self._content = response["Body"].read().decode("utf-8")
+                bytes_content = response["Body"].read()
+                self._content = bytes_content.decode("utf-8")
+                # The file may not match the stored hash if it was written before the
+                # hash was recorded or restored from a previous version
+                if self.get_content_hash(bytes_content) == self.content_hash:
+                    self._set_cached_content(self._content)
         return self._content
 
+    def get_content_cache_key(self):
+        """
+        Generate a cache key for the content of the document. It includes the hash of
+        the content so that a new content is never served from a stale cached value.
+        """
+        return f"document_{self.id!s}_content_{self.content_hash:s}"
+
+    def _get_cached_content(self):
+        """Return the content from the in-process or the shared cache, if cached."""
+        if not settings.DOCUMENT_CONTENT_CACHE_TIMEOUT or not self.content_hash:
+            return None
+
+        cache_key = self.get_content_cache_key()
+        content = document_content_local_cache.get(cache_key)
+        if content is None:
+            content = cache.get(cache_key)
+            if content is not None:
+                document_content_local_cache.set(cache_key, content)
+        return content
+
+    def _set_cached_content(self, content):
+        """
+        Cache the content in process and, unless it is too large, in the shared cache.
+        """
+        if not settings.DOCUMENT_CONTENT_CACHE_TIMEOUT or not self.content_hash:
+            return
+
+        cache_key = self.get_content_cache_key()
+        document_content_local_cache.set(cache_key, content)
+        if len(content) <= settings.DOCUMENT_CONTENT_CACHE_MAX_ITEM_SIZE:
+            cache.set(cache_key, content, settings.DOCUMENT_CONTENT_CACHE_TIMEOUT)
+
     @content.setter
     def content(self, content):
         """Cache the content, don't write to object storage yet"""
@@ -496,6 +779,52 @@ class Document(MP_Node, BaseModel):
             raise ValueError("content should be a string.")
 
         self._content = content
+        self._merged_content = None
+
+    def append_content_update(self, data):
+        """
+        Append an incremental Yjs update to the content of the document, without writing
+        the whole content to object storage. Pending updates are merged into the content
+        when it is read, and compacted into a new content once they are numerous enough.
+        """
+        # pylint: disable=import-outside-toplevel
+        from core.tasks.documents import compact_document_content_updates  # noqa: PLC0415
+
+        with transaction.atomic():
+            DocumentContentUpdate.objects.create(document=self, data=data)
+            Document.objects.filter(pk=self.pk).update(
+                content_updates_count=models.F("content_updates_count") + 1,
+                updated_at=timezone.now(),
+            )
+        self.refresh_from_db(fields=["content_updates_count", "updated_at"])
+        self._merged_content = None
+
+        if (
+            self.content_updates_count
+            >= settings.DOCUMENT_CONTENT_UPDATES_COMPACTION_THRESHOLD
+        ):
+            compact_document_content_updates.delay(self.pk)
+
+    def compact_content_updates(self):
+        """
+        Merge the pending incremental updates into the content and write it to object
+        storage. Must be called in a transaction on a document locked for update so that
+        concurrent updates are counted after the compacted ones.
+        """
+        content_updates = list(self.content_updates.values_list("id", "data"))
+        if not content_updates:
+            return
+
+        self.content = merge_base64_yjs_updates(
+            self._get_content_snapshot(), [data for _id, data in content_updates]
+        )
+        self.content_updates_count = max(
+            self.content_updates_count - len(content_updates), 0
+        )
+        self.save()
+        DocumentContentUpdate.objects.filter(
+            id__in=[update_id for update_id, _data in content_updates]
+        ).delete()
 
     def get_content_response(self, version_id=""):
         """Get the content in a specific version of the document"""
@@ -508,45 +837,41 @@ class Document(MP_Node, BaseModel):
         return default_storage.connection.meta.client.get_object(**params)
 
     def get_versions_slice(self, from_version_id="", min_datetime=None, page_size=None):
-        """Get document versions from object storage with pagination and starting conditions"""
-        # /!\ Trick here /!\
-        # The "KeyMarker" and "VersionIdMarker" fields must either be both set or both not set.
-        # The error we get otherwise is not helpful at all.
-        markers = {}
-        if from_version_id:
-            markers.update(
-                {"KeyMarker": self.file_key, "VersionIdMarker": from_version_id}
-            )
-
+        """
+        Get document versions with keyset pagination and starting conditions, from the
+        index of versions, most recent first and excluding the current version.
+        """
         real_page_size = (
             min(page_size, settings.DOCUMENT_VERSIONS_PAGE_SIZE)
             if page_size
             else settings.DOCUMENT_VERSIONS_PAGE_SIZE
         )
 
-        response = default_storage.connection.meta.client.list_object_versions(
-            Bucket=default_storage.bucket_name,
-            Prefix=self.file_key,
-            # compensate the latest version that we exclude below and get one more to
-            # know if there are more pages
-            MaxKeys=real_page_size + 2,
-            **markers,
-        )
+        queryset = self.versions.order_by("-last_modified", "-id")
+        latest_version_id = queryset.values_list("id", flat=True).first()
+        queryset = queryset.filter(
+            last_modified__gte=min_datetime or self.created_at
+        ).exclude(id=latest_version_id)
 
-        min_last_modified = min_datetime or self.created_at
+        if from_version_id:
+            marker = self.versions.filter(version_id=from_version_id).first()
+            if marker is None:
+                queryset = queryset.none()
+            else:
+                queryset = queryset.filter(
+                    models.Q(last_modified__lt=marker.last_modified)
+                    | models.Q(last_modified=marker.last_modified, id__lt=marker.id)
+                )
+
+        # Get one more version to know if there are more pages
         versions = [
             {
-                key_snake: version[key_camel]
-                for key_snake, key_camel in [
-                    ("etag", "ETag"),
-                    ("is_latest", "IsLatest"),
-                    ("last_modified", "LastModified"),
-                    ("version_id", "VersionId"),
-                ]
+                "etag": version.etag,
+                "is_latest": False,
+                "last_modified": version.last_modified,
+                "version_id": version.version_id,
             }
-            for version in response.get("Versions", [])
-            if version["LastModified"] >= min_last_modified
-            and version["IsLatest"] is False
+            for version in queryset[: real_page_size + 1]
         ]
         results = versions[:real_page_size]
 
@@ -556,7 +881,7 @@ class Document(MP_Node, BaseModel):
             next_version_id_marker = ""
         else:
             is_truncated = True
-            next_version_id_marker = versions[count - 1]["version_id"]
+            next_version_id_marker = results[count - 1]["version_id"]
 
         return {
             "next_version_id_marker": next_version_id_marker,
@@ -567,13 +892,79 @@ class Document(MP_Node, BaseModel):
 
     def delete_version(self, version_id):
         """Delete a version from object storage given its version id"""
-        return default_storage.connection.meta.client.delete_object(
+        response = default_storage.connection.meta.client.delete_object(
             Bucket=default_storage.bucket_name, Key=self.file_key, VersionId=version_id
         )
+        self.versions.filter(version_id=version_id).delete()
+        invalidate_prefix(VERSIONS_CACHE_NAMESPACE, self.path)
+        return response
 
-    def get_nb_accesses_cache_key(self):
-        """Generate a unique cache key for each document."""
-        return f"document_{self.id!s}_nb_accesses"
+    def delete_versions(self, version_ids):
+        """
+        Delete versions from object storage in batches of 1000, the maximum accepted by
+        S3 in a single request. Return the number of versions deleted and of bytes
+        reclaimed.
+        """
+        s3_client = default_storage.connection.meta.client
+        version_ids = list(version_ids)
+        deleted_count = 0
+        bytes_reclaimed = 0
+
+        for i in range(0, len(version_ids), 1000):
+            response = s3_client.delete_objects(
+                Bucket=default_storage.bucket_name,
+                Delete={
+                    "Objects": [
+                        {"Key": self.file_key, "VersionId": version_id}
+                        for version_id in version_ids[i : i + 1000]
+                    ],
+                    "Quiet": False,
+                },
+            )
+            for error in response.get("Errors", []):
+                logger.error(
+                    "Version %s of document %s could not be deleted: %s",
+                    error.get("VersionId"),
+                    self.pk,
+                    error.get("Message"),
+                )
+
+            deleted = self.versions.filter(
+                version_id__in=[
+                    deleted["VersionId"] for deleted in response.get("Deleted", [])
+                ]
+            )
+            bytes_reclaimed += deleted.aggregate(size=models.Sum("size"))["size"] or 0
+            deleted_count += deleted.delete()[0]
+
+        if version_ids:
+            invalidate_prefix(VERSIONS_CACHE_NAMESPACE, self.path)
+        return deleted_count, bytes_reclaimed
+
+    def get_versions_to_thin(self, policy, now=None):
+        """
+        Return the ids of the versions exceeding a retention policy as parsed by
+        "parse_retention_policy". The current version is always kept.
+        """
+        versions = self.versions.order_by("-last_modified", "-id").values_list(
+            "version_id", "last_modified"
+        )
+        return select_versions_to_thin(versions[1:], policy, now or timezone.now())
+
+    def get_versions_cache_version(self):
+        """Return a version changing each time a version of the document is deleted."""
+        return get_prefix_version(VERSIONS_CACHE_NAMESPACE, self.path, self.steplen)
+
+    def get_nb_accesses_cache_key(self, version=None):
+        """
+        Generate a unique cache key for each document, versioned so that it is
+        invalidated when accesses change on the document or any of its ancestors.
+        """
+        if version is None:
+            version = get_prefix_version(
+                NB_ACCESSES_CACHE_NAMESPACE, self.path, self.steplen
+            )
+        return f"document_{self.id!s}_nb_accesses_{version:s}"
 
     def get_nb_accesses(self):
         """
@@ -581,6 +972,10 @@ class Document(MP_Node, BaseModel):
         - directly attached to the document
         - attached to any of the document's ancestors
         """
+        nb_accesses = getattr(self, "_prefetched_nb_accesses", None)
+        if nb_accesses is not None:
+            return nb_accesses
+
         cache_key = self.get_nb_accesses_cache_key()
         nb_accesses = cache.get(cache_key)
 
@@ -598,6 +993,62 @@ class Document(MP_Node, BaseModel):
 
         return nb_accesses
 
+    @classmethod
+    def prefetch_nb_accesses(cls, documents):
+        """
+        Compute the number of accesses of a list of documents in bulk, looking first into
+        the cache and counting the accesses of all the missing documents in one query.
+        """
+        versions = get_prefix_versions(
+            NB_ACCESSES_CACHE_NAMESPACE,
+            {document.path for document in documents},
+            cls.steplen,
+        )
+        documents_by_key = {
+            document.get_nb_accesses_cache_key(versions[document.path]): document
+            for document in documents
+        }
+        cached = cache.get_many(documents_by_key.keys())
+        missing = {
+            cache_key: document
+            for cache_key, document in documents_by_key.items()
+            if cache_key not in cached
+        }
+
+        if missing:
+            paths = {
+                path
+                for document in missing.values()
+                for path in document.ancestors_and_self_paths
+            }
+            # Join through the indexed document foreign key, the document paths of
+            # accesses are only indexed after the user or the team
+            counts = {
+                item["document__path"]: item
+                for item in DocumentAccess.objects.filter(document__path__in=paths)
+                .order_by()
+                .values("document__path")
+                .annotate(
+                    nb_direct=models.Count("id"),
+                    nb_alive=models.Count(
+                        "id",
+                        filter=models.Q(document__ancestors_deleted_at__isnull=True),
+                    ),
+                )
+            }
+            for cache_key, document in missing.items():
+                cached[cache_key] = (
+                    counts.get(document.path, {}).get("nb_direct", 0),
+                    sum(
+                        counts.get(path, {}).get("nb_alive", 0)
+                        for path in document.ancestors_and_self_paths
+                    ),
+                )
+            cache.set_many({cache_key: cached[cache_key] for cache_key in missing})
+
+        for cache_key, document in documents_by_key.items():
+            document._prefetched_nb_accesses = tuple(cached[cache_key])  # noqa: SLF001
+
     @property
     def nb_accesses_direct(self):
         """Returns the number of accesses related to the document or one of its ancestors."""
@@ -611,14 +1062,10 @@ class Document(MP_Node, BaseModel):
     def invalidate_nb_accesses_cache(self):
         """
         Invalidate the cache for number of accesses, including on affected descendants.
-        Args:
-            path: can optionally be passed as argument (useful when invalidating cache for a
-                document we just deleted)
+        Keys are versioned by path prefix so this is a single write whatever the number
+        of descendants.
         """
-
-        for document in Document.objects.filter(path__startswith=self.path).only("id"):
-            cache_key = document.get_nb_accesses_cache_key()
-            cache.delete(cache_key)
+        invalidate_prefix(NB_ACCESSES_CACHE_NAMESPACE, self.path)
 
     def get_role(self, user):
         """Return the roles a user has on a document."""
@@ -630,30 +1077,117 @@ class Document(MP_Node, BaseModel):
         except AttributeError:
             roles = DocumentAccess.objects.filter(
                 models.Q(user=user) | models.Q(team__in=user.teams),
-                document__path=Left(models.Value(self.path), Length("document__path")),
+                document_path__in=self.ancestors_and_self_paths,
             ).values_list("role", flat=True)
 
         return RoleChoices.max(*roles)
 
-    def compute_ancestors_links_paths_mapping(self):
+    @property
+    def ancestors_and_self_paths(self):
+        """Paths of all the document's ancestors and of the document itself."""
+        return [
+            self.path[:length]
+            for length in range(self.steplen, len(self.path) + 1, self.steplen)
+        ]
+
+    def get_ancestors_links_cache_key(self):
         """
-        Compute the ancestors links for the current document up to the highest readable ancestor.
+        Generate a cache key for the links of the document and its ancestors, versioned
+        so that it is invalidated when any of the document's ancestors changes.
         """
-        ancestors = (
+        version = get_prefix_version(
+            ANCESTORS_LINKS_CACHE_NAMESPACE, self.path, self.steplen
+        )
+        return f"document_{self.id!s}_ancestors_links_{version:s}"
+
+    def get_ancestors_links(self):
+        """
+        Return the link definitions of the document and its ancestors that are not
+        deleted, ordered from the root. The result is cached in process and in the
+        shared cache.
+        """
+        timeout = settings.ANCESTORS_LINKS_CACHE_TIMEOUT
+        if timeout:
+            cache_key = self.get_ancestors_links_cache_key()
+            ancestors_links = ancestors_links_local_cache.get(cache_key)
+            if ancestors_links is not None:
+                return ancestors_links
+
+            ancestors_links = cache.get(cache_key)
+            if ancestors_links is not None:
+                ancestors_links_local_cache.set(cache_key, ancestors_links)
+                return ancestors_links
+
+        ancestors_links = list(
             (self.get_ancestors() | self._meta.model.objects.filter(pk=self.pk))
             .filter(ancestors_deleted_at__isnull=True)
             .order_by("path")
+            .values("link_reach", "link_role")
         )
-        ancestors_links = []
-        paths_links_mapping = {}
 
-        for ancestor in ancestors:
-            ancestors_links.append(
-                {"link_reach": ancestor.link_reach, "link_role": ancestor.link_role}
-            )
-            paths_links_mapping[ancestor.path] = ancestors_links.copy()
+        if timeout:
+            cache.set(cache_key, ancestors_links, timeout)
+            ancestors_links_local_cache.set(cache_key, ancestors_links)
+
+        return ancestors_links
+
+    def invalidate_ancestors_links_cache(self, path=None):
+        """
+        Invalidate the cached links of all documents below a path, by default the
+        document itself and all its descendants.
+        """
+        invalidate_prefix(
+            ANCESTORS_LINKS_CACHE_NAMESPACE, self.path if path is None else path
+        )
+
+    def compute_ancestors_links_paths_mapping(self):
+        """
+        Compute the ancestors links for the current document up to the highest readable ancestor.
+        """
+        ancestors_links = self.get_ancestors_links()
+        paths = self.ancestors_and_self_paths
+        return {
+            paths[index]: ancestors_links[: index + 1]
+            for index in range(len(ancestors_links))
+        }
 
-        return paths_links_mapping
+    @classmethod
+    def prefetch_ancestors_link_definitions(cls, documents):
+        """
+        Compute the ancestors link definition of a list of documents in bulk, fetching the
+        links of all their ancestors in one query.
+        """
+        documents = [
+            document
+            for document in documents
+            if getattr(document, "_ancestors_link_definition", None) is None
+        ]
+        paths = {
+            path
+            for document in documents
+            for path in document.ancestors_and_self_paths[:-1]
+        }
+        if not paths:
+            links = {}
+        else:
+            links = {
+                path: {"link_reach": link_reach, "link_role": link_role}
+                for path, link_reach, link_role in cls.objects.filter(
+                    path__in=paths, ancestors_deleted_at__isnull=True
+                ).values_list("path", "link_reach", "link_role")
+            }
+
+        for document in documents:
+            ancestors_paths = document.ancestors_and_self_paths[:-1]
+            # Links are only inherited when the parent is not deleted
+            ancestors_links = (
+                [links[path] for path in ancestors_paths if path in links]
+                if ancestors_paths and ancestors_paths[-1] in links
+                else []
+            )
+            document.ancestors_link_definition = get_equivalent_link_definition(
+                ancestors_links
+            )
 
     @property
     def link_definition(self):
@@ -679,6 +1213,7 @@ class Document(MP_Node, BaseModel):
     def ancestors_link_definition(self, definition):
         """Cache the ancestors_link_definition."""
         self._ancestors_link_definition = definition
+        self._computed_link_definition = None
 
     @property
     def ancestors_link_reach(self):
@@ -736,12 +1271,7 @@ class Document(MP_Node, BaseModel):
         link_select_options = LinkReachChoices.get_select_options(
             **self.ancestors_link_definition
         )
-        link_definition = get_equivalent_link_definition(
-            [
-                self.ancestors_link_definition,
-                {"link_reach": self.link_reach, "link_role": self.link_role},
-            ]
-        )
+        link_definition = self.computed_link_definition
 
         link_reach = link_definition["link_reach"]
         if link_reach == LinkReachChoices.PUBLIC or (
@@ -890,6 +1420,7 @@ class Document(MP_Node, BaseModel):
         self.ancestors_deleted_at = self.deleted_at = timezone.now()
         self.save()
         self.invalidate_nb_accesses_cache()
+        self.invalidate_ancestors_links_cache()
 
         if self.depth > 1:
             self._meta.model.objects.filter(pk=self.get_parent().pk).update(
@@ -933,6 +1464,7 @@ class Document(MP_Node, BaseModel):
         self.ancestors_deleted_at = ancestors_deleted_at
         self.save(update_fields=["deleted_at", "ancestors_deleted_at"])
         self.invalidate_nb_accesses_cache()
+        self.invalidate_ancestors_links_cache()
 
         self.get_descendants().exclude(
             models.Q(deleted_at__isnull=False)
@@ -978,6 +1510,113 @@ class LinkTrace(BaseModel):
         return f"{self.user!s} trace on document {self.document!s}"
 
 
+class DocumentVersion(BaseModel):
+    """
+    Version of the content of a document in object storage. Versions are indexed on
+    save so that they can be listed and filtered without requesting object storage.
+    """
+
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name="versions",
+    )
+    version_id = models.CharField(_("version id"), max_length=255)
+    etag = models.CharField(_("ETag"), max_length=255, blank=True)
+    content_hash = models.CharField(
+        _("content hash"), max_length=64, null=True, blank=True
+    )
+    size = models.PositiveBigIntegerField(_("size"), null=True, blank=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name="document_versions",
+        null=True,
+        blank=True,
+    )
+    last_modified = models.DateTimeField(_("last modified"))
+
+    class Meta:
+        db_table = "impress_document_version"
+        ordering = ("-last_modified", "-id")
+        verbose_name = _("Document version")
+        verbose_name_plural = _("Document versions")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["document", "version_id"],
+                name="unique_version_id_per_document",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["document", "-last_modified", "-id"],
+                name="document_version_keyset_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Version {self.version_id:s} of document {self.document_id!s}"
+
+
+class DocumentContentUpdate(BaseModel):
+    """
+    Incremental Yjs update of the content of a document, pending its compaction into
+    the content stored in object storage.
+    """
+
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name="content_updates",
+    )
+    data = models.BinaryField(_("data"))
+
+    class Meta:
+        db_table = "impress_document_content_update"
+        ordering = ("created_at",)
+        verbose_name = _("Document content update")
+        verbose_name_plural = _("Document content updates")
+
+    def __str__(self):
+        return f"Content update on document {self.document_id!s}"
+
+
+class CollaborationNotification(BaseModel):
+    """
+    Pending notification of the collaboration server, written in the transaction of
+    the change it notifies and sent asynchronously, so that a slow collaboration
+    server does not slow down requests.
+    """
+
+    room = models.CharField(_("room"), max_length=255)
+    user_id = models.CharField(_("user id"), max_length=255, null=True, blank=True)
+    # Set while a worker is sending the notification, until the claim expires
+    claimed_at = models.DateTimeField(_("claimed at"), null=True, blank=True)
+
+    class Meta:
+        db_table = "impress_collaboration_notification"
+        ordering = ("created_at",)
+        verbose_name = _("Collaboration notification")
+        verbose_name_plural = _("Collaboration notifications")
+
+    def __str__(self):
+        return f"Reset connections of room {self.room:s}"
+
+    @classmethod
+    def reset_connections(cls, room, user_id=None):
+        """
+        Record that the connections of a room, or only of a user in this room, must be
+        reset, and send notifications once the transaction is committed.
+        """
+        # pylint: disable=import-outside-toplevel
+        from core.tasks.collaboration import (  # noqa: PLC0415
+            send_collaboration_notifications,
+        )
+
+        cls.objects.create(room=room, user_id=user_id)
+        transaction.on_commit(send_collaboration_notifications.delay)
+
+
 class DocumentFavorite(BaseModel):
     """Relation model to store a user's favorite documents."""
 
@@ -1009,6 +1648,78 @@ class DocumentFavorite(BaseModel):
         return f"{self.user!s} favorite on document {self.document!s}"
 
 
+class DocumentAttachment(BaseModel):
+    """
+    Status of a file attached to documents. It mirrors the status set in the metadata
+    of the file in object storage so that checking whether an attachment can be served
+    does not require a request to object storage.
+    """
+
+    key = models.CharField(_("key"), max_length=255, unique=True)
+    status = models.CharField(
+        _("status"),
+        max_length=20,
+        choices=DocumentAttachmentStatus.choices,
+        default=DocumentAttachmentStatus.PROCESSING,
+    )
+
+    class Meta:
+        db_table = "impress_document_attachment"
+        verbose_name = _("Document attachment")
+        verbose_name_plural = _("Document attachments")
+
+    def __str__(self):
+        return f"{self.key:s} ({self.status:s})"
+
+    @staticmethod
+    def get_status_cache_key(key):
+        """Cache key of the status of an attachment."""
+        return f"attachment_status_{key:s}"
+
+    @classmethod
+    def get_status(cls, key):
+        """
+        Return the status of an attachment.
+
+        Attachments uploaded before their status was stored in database are looked up
+        once in object storage and recorded. "ready" being a final status, it is also
+        cached. Raises `ClientError` if the file is missing from object storage.
+        """
+        cache_key = cls.get_status_cache_key(key)
+        status = cache.get(cache_key)
+        if status is not None:
+            return status
+
+        status = cls.objects.filter(key=key).values_list("status", flat=True).first()
+        if status is None:
+            head_resp = default_storage.connection.meta.client.head_object(
+                Bucket=default_storage.bucket_name, Key=key
+            )
+            # Files uploaded before the malware detection have no status metadata
+            # and are served as ready. A status recorded meanwhile by the malware
+            # detection callback is more recent and is kept.
+            attachment, _created = cls.objects.get_or_create(
+                key=key,
+                defaults={
+                    "status": head_resp.get("Metadata", {}).get(
+                        "status", DocumentAttachmentStatus.READY
+                    )
+                },
+            )
+            status = attachment.status
+
+        if status == DocumentAttachmentStatus.READY:
+            cache.set(cache_key, status, settings.ATTACHMENT_STATUS_CACHE_TIMEOUT)
+
+        return status
+
+    @classmethod
+    def set_status(cls, key, status):
+        """Record the status of an attachment, e.g. after its malware analysis."""
+        cls.objects.update_or_create(key=key, defaults={"status": status})
+        cache.delete(cls.get_status_cache_key(key))
+
+
 class DocumentAccess(BaseAccess):
     """Relation model to give access to a document for a user or a team with a role."""
 
@@ -1017,12 +1728,32 @@ class DocumentAccess(BaseAccess):
         on_delete=models.CASCADE,
         related_name="accesses",
     )
+    # Denormalized copy of the document's path, kept in sync by database triggers
+    # (see migration 0027) so that it stays right whatever the way documents are
+    # moved or accesses are created (bulk operations included).
+    document_path = models.CharField(
+        max_length=7 * 36,
+        db_collation="C",
+        default="",
+        blank=True,
+        editable=False,
+    )
 
     class Meta:
         db_table = "impress_document_access"
         ordering = ("-created_at",)
         verbose_name = _("Document/user relation")
         verbose_name_plural = _("Document/user relations")
+        indexes = [
+            models.Index(
+                fields=["user", "document_path"],
+                name="document_access_user_path_idx",
+            ),
+            models.Index(
+                fields=["team", "document_path"],
+                name="document_access_team_path_idx",
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["user", "document"],
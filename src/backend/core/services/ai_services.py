@@ -1,11 +1,28 @@
 """AI services."""
 
+import base64
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html import escape
+from html.parser import HTMLParser
+
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
 
+import pycrdt
 from openai import OpenAI
 
 from core import enums
+from core.caches import LRUCache
+
+ai_local_cache = LRUCache(max_size=settings.AI_LOCAL_CACHE_SIZE)
+
+_clients = {}
+_clients_lock = threading.Lock()
 
 AI_ACTIONS = {
     "prompt": (
@@ -52,6 +69,187 @@ AI_TRANSLATE = (
 )
 
 
+def get_messages(system_content, text):
+    """Build the messages of a chat completion request."""
+    return [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": text},
+    ]
+
+
+def get_translate_prompt(language):
+    """Build the system prompt to translate text to a specified language."""
+    language_display = enums.ALL_LANGUAGES.get(language, language)
+    return AI_TRANSLATE.format(language=language_display)
+
+
+def iter_stream_content(stream):
+    """Yield the pieces of text of a streamed chat completion and close it when done."""
+    has_content = False
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                has_content = True
+                yield content
+    finally:
+        stream.close()
+
+    if not has_content:
+        raise RuntimeError("AI response does not contain an answer")
+
+
+def get_ai_client():
+    """
+    Return the client of the AI API. It is shared by all the requests handled by the
+    process so that connections to the AI API are kept alive in its pool.
+    """
+    key = (settings.AI_BASE_URL, settings.AI_API_KEY)
+    try:
+        return _clients[key]
+    except KeyError:
+        pass
+
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = OpenAI(
+                base_url=settings.AI_BASE_URL, api_key=settings.AI_API_KEY
+            )
+        return _clients[key]
+
+
+# Connections must not be shared with processes forked by celery or gunicorn workers
+os.register_at_fork(after_in_child=_clients.clear)
+
+
+def get_cache_key(system_content, text):
+    """Compute the cache key of an AI answer from the hash of the model and prompts."""
+    data = json.dumps([settings.AI_MODEL, system_content, text]).encode("utf-8")
+    return f"ai_answer_{hashlib.blake2b(data, digest_size=32).hexdigest():s}"
+
+
+def get_cached_answer(cache_key):
+    """Return an AI answer from the in-process cache or the shared cache."""
+    answer = ai_local_cache.get(cache_key)
+    if answer is None:
+        answer = cache.get(cache_key)
+        if answer is not None:
+            # Copies in process expire like answers in the shared cache
+            ai_local_cache.set(cache_key, answer, settings.AI_CACHE_TIMEOUT)
+    return answer
+
+
+def set_cached_answer(cache_key, answer):
+    """Store an AI answer in the in-process cache and the shared cache."""
+    ai_local_cache.set(cache_key, answer, settings.AI_CACHE_TIMEOUT)
+    cache.set(cache_key, answer, settings.AI_CACHE_TIMEOUT)
+
+
+def iter_and_cache_answer(chunks, cache_key):
+    """Yield the pieces of a streamed AI answer and cache the answer once complete."""
+    pieces = []
+    for chunk in chunks:
+        pieces.append(chunk)
+        yield chunk
+    set_cached_answer(cache_key, "".join(pieces))
+
+
+def get_text_nodes(node):
+    """
+    Return the text nodes of a Yjs XML node holding text, in document order. Text nodes
+    holding embedded objects are left untranslated so that these objects are kept.
+    """
+    text_nodes = []
+    for child in node.children:
+        if isinstance(child, pycrdt.XmlText):
+            if str(child).strip() and all(
+                isinstance(insert, str) for insert, _attrs in child.diff()
+            ):
+                text_nodes.append(child)
+        else:
+            text_nodes.extend(get_text_nodes(child))
+    return text_nodes
+
+
+def load_text_nodes(content):
+    """
+    Load a base64 encoded Yjs document and return it with its text nodes to translate.
+    Raise a ValueError if the document is empty or invalid.
+    """
+    if not content:
+        raise ValueError("Document is empty.")
+
+    # pycrdt panics on invalid updates with an error that is not an Exception
+    try:
+        data = base64.b64decode(content)
+        pycrdt.get_state(data)
+    except ValueError as err:
+        raise ValueError("Invalid document.") from err
+
+    doc = pycrdt.Doc()
+    doc.apply_update(data)
+    return doc, get_text_nodes(doc.get("document-store", type=pycrdt.XmlFragment))
+
+
+def serialize_text_node(text_node):
+    """
+    Serialize the formatted text of a Yjs text node to HTML, each run of formatted text
+    being wrapped in a span referencing its formatting attributes. Return the HTML and
+    the list of formatting attributes.
+    """
+    html = []
+    marks = []
+    for text, attrs in text_node.diff():
+        if not attrs:
+            html.append(escape(text))
+            continue
+        if attrs not in marks:
+            marks.append(attrs)
+        html.append(f'<span data-mark="{marks.index(attrs):d}">{escape(text)}</span>')
+    return "".join(html), marks
+
+
+class TextRunsParser(HTMLParser):
+    """Parse HTML serialized by "serialize_text_node" back to runs of formatted text."""
+
+    def __init__(self, marks):
+        super().__init__()
+        self.marks = marks
+        self.stack = []
+        self.runs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "span":
+            return
+        try:
+            attrs = self.marks[int(dict(attrs).get("data-mark"))]
+        except (IndexError, TypeError, ValueError):
+            attrs = self.stack[-1] if self.stack else None
+        self.stack.append(attrs)
+
+    def handle_endtag(self, tag):
+        if tag == "span" and self.stack:
+            self.stack.pop()
+
+    def handle_data(self, data):
+        self.runs.append((data, self.stack[-1] if self.stack else None))
+
+
+def replace_text_node(text_node, html, marks):
+    """Replace the content of a Yjs text node by the formatted text of the HTML."""
+    parser = TextRunsParser(marks)
+    parser.feed(html)
+    parser.close()
+
+    text_node.clear()
+    index = 0
+    for text, attrs in parser.runs:
+        text_node.insert(index, text, attrs)
+        index += len(text)
+
+
 class AIService:
     """Service class for AI-related operations."""
 
@@ -63,16 +261,28 @@ class AIService:
             or settings.AI_MODEL is None
         ):
             raise ImproperlyConfigured("AI configuration not set")
-        self.client = OpenAI(base_url=settings.AI_BASE_URL, api_key=settings.AI_API_KEY)
+        self.client = get_ai_client()
 
     def call_ai_api(self, system_content, text):
-        """Helper method to call the OpenAI API and process the response."""
+        """
+        Helper method to call the OpenAI API and process the response. If enabled,
+        answers are cached so that identical requests don't call the AI API again.
+        """
+        if not settings.AI_CACHE_TIMEOUT:
+            return {"answer": self._call_ai_api(system_content, text)}
+
+        cache_key = get_cache_key(system_content, text)
+        answer = get_cached_answer(cache_key)
+        if answer is None:
+            answer = self._call_ai_api(system_content, text)
+            set_cached_answer(cache_key, answer)
+        return {"answer": answer}
+
+    def _call_ai_api(self, system_content, text):
+        """Call the OpenAI API and return the text of its answer."""
         response = self.client.chat.completions.create(
             model=settings.AI_MODEL,
-            messages=[
-                {"role": "system", "content": system_content},
-                {"role": "user", "content": text},
-            ],
+            messages=get_messages(system_content, text),
         )
 
         content = response.choices[0].message.content
@@ -80,15 +290,97 @@ class AIService:
         if not content:
             raise RuntimeError("AI response does not contain an answer")
 
-        return {"answer": content}
+        return content
+
+    def stream_ai_api(self, system_content, text):
+        """
+        Call the OpenAI API in streaming mode and return an iterator on the pieces of
+        the answer as they are generated. The request is sent right away so that errors
+        occurring before the generation starts are raised by this method. A cached
+        answer is returned in one piece.
+        """
+        cache_key = None
+        if settings.AI_CACHE_TIMEOUT:
+            cache_key = get_cache_key(system_content, text)
+            answer = get_cached_answer(cache_key)
+            if answer is not None:
+                return iter([answer])
+
+        stream = self.client.chat.completions.create(
+            model=settings.AI_MODEL,
+            messages=get_messages(system_content, text),
+            stream=True,
+        )
+        chunks = iter_stream_content(stream)
+        if cache_key is None:
+            return chunks
+        return iter_and_cache_answer(chunks, cache_key)
 
     def transform(self, text, action):
         """Transform text based on specified action."""
         system_content = AI_ACTIONS[action]
         return self.call_ai_api(system_content, text)
 
+    def transform_stream(self, text, action):
+        """Transform text based on specified action, streaming the answer."""
+        system_content = AI_ACTIONS[action]
+        return self.stream_ai_api(system_content, text)
+
     def translate(self, text, language):
         """Translate text to a specified language."""
-        language_display = enums.ALL_LANGUAGES.get(language, language)
-        system_content = AI_TRANSLATE.format(language=language_display)
-        return self.call_ai_api(system_content, text)
+        return self.call_ai_api(get_translate_prompt(language), text)
+
+    def translate_stream(self, text, language):
+        """Translate text to a specified language, streaming the answer."""
+        return self.stream_ai_api(get_translate_prompt(language), text)
+
+    def translate_document(self, content, language, on_progress=None):
+        """
+        Translate a base64 encoded Yjs document to a specified language and return the
+        translated document. The text of each block is translated separately, preserving
+        the structure and the formatting of the document, and blocks are sent to the AI
+        API concurrently. "on_progress" is called with the number of blocks translated
+        and the total number of blocks, as the translation progresses.
+        """
+        doc, text_nodes = load_text_nodes(content)
+        segments = [serialize_text_node(text_node) for text_node in text_nodes]
+
+        length = sum(len(html) for html, _marks in segments)
+        if length > settings.AI_TRANSLATE_DOCUMENT_MAX_LENGTH:
+            raise ValueError(
+                "Document too long. Maximum length is "
+                f"{settings.AI_TRANSLATE_DOCUMENT_MAX_LENGTH:,} characters."
+            )
+        if len(segments) > settings.AI_TRANSLATE_DOCUMENT_MAX_BLOCKS:
+            raise ValueError(
+                "Document too long. Maximum number of blocks is "
+                f"{settings.AI_TRANSLATE_DOCUMENT_MAX_BLOCKS:,}."
+            )
+
+        system_content = get_translate_prompt(language)
+        answers = [None] * len(segments)
+        with ThreadPoolExecutor(
+            max_workers=settings.AI_TRANSLATE_DOCUMENT_MAX_WORKERS
+        ) as executor:
+            futures = {
+                executor.submit(self.call_ai_api, system_content, html): index
+                for index, (html, _marks) in enumerate(segments)
+            }
+            try:
+                for done, future in enumerate(as_completed(futures), start=1):
+                    answers[futures[future]] = future.result()["answer"]
+                    if on_progress is not None:
+                        on_progress(done, len(segments))
+            except Exception:
+                # Don't spend tokens on blocks that won't be used
+                for future in futures:
+                    future.cancel()
+                raise
+
+        # Yjs documents are not thread-safe, they are only updated once all translated
+        for text_node, (_html, marks), answer in zip(
+            text_nodes, segments, answers, strict=True
+        ):
+            replace_text_node(text_node, answer, marks)
+
+        return base64.b64encode(doc.get_update()).decode("utf-8")
@@ -1,10 +1,17 @@
 """Collaboration services."""
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
 
 import requests
 
+from core.caches import coalesce
+from core.services.http_client import get_session
+
+CONNECTIONS_CACHE_KEY = "docs:connections:{room!s}"
+CONNECTION_INFO_CACHE_KEY = "docs:connection-info:{room!s}:{session_key!s}"
+
 
 class CollaborationService:
     """Service class for Collaboration related operations."""
@@ -32,7 +39,11 @@ class CollaborationService:
             headers["X-User-Id"] = user_id
 
         try:
-            response = requests.post(endpoint_url, headers=headers, timeout=10)
+            response = get_session("collaboration").post(
+                endpoint_url,
+                headers=headers,
+                timeout=settings.COLLABORATION_API_TIMEOUT,
+            )
         except requests.RequestException as e:
             raise requests.HTTPError("Failed to notify WebSocket server.") from e
 
@@ -56,8 +67,11 @@ class CollaborationService:
         headers = {"Authorization": settings.COLLABORATION_SERVER_SECRET}
 
         try:
-            response = requests.get(
-                endpoint_url, headers=headers, params=querystring, timeout=10
+            response = get_session("collaboration").get(
+                endpoint_url,
+                headers=headers,
+                params=querystring,
+                timeout=settings.COLLABORATION_API_TIMEOUT,
             )
         except requests.RequestException as e:
             raise requests.HTTPError("Failed to get document connection info.") from e
@@ -73,3 +87,42 @@ class CollaborationService:
             f"Failed to get document connection info. Status code: {response.status_code}, "
             f"Response: {response.text}"
         )
+
+    def get_cached_document_connection_info(self, room, session_key):
+        """
+        Get the connection info for a document from the connections pushed by the
+        collaboration server or, failing that, from a short-lived cache in front of the
+        collaboration server. Concurrent requests of the process for the same room and
+        session share a single call to the collaboration server.
+        """
+        connections = cache.get(CONNECTIONS_CACHE_KEY.format(room=room))
+        if connections is not None:
+            return connections["count"], session_key in connections["session_keys"]
+
+        timeout = settings.COLLABORATION_CONNECTIONS_CACHE_TIMEOUT
+        if not timeout:
+            return self.get_document_connection_info(room, session_key)
+
+        cache_key = CONNECTION_INFO_CACHE_KEY.format(room=room, session_key=session_key)
+        connection_info = cache.get(cache_key)
+        if connection_info is None:
+
+            def get_connection_info():
+                result = self.get_document_connection_info(room, session_key)
+                cache.set(cache_key, result, timeout)
+                return result
+
+            connection_info = coalesce(cache_key, get_connection_info)
+        return tuple(connection_info)
+
+    @staticmethod
+    def set_document_connections(room, count, session_keys):
+        """
+        Record the connections of a document pushed by the collaboration server, so that
+        connection checks don't need to call it.
+        """
+        cache.set(
+            CONNECTIONS_CACHE_KEY.format(room=room),
+            {"count": count, "session_keys": set(session_keys)},
+            settings.COLLABORATION_CONNECTIONS_PUSH_TIMEOUT,
+        )
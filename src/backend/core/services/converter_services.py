@@ -1,11 +1,25 @@
 """Y-Provider API services."""
 
+import hashlib
+import json
+import re
 from base64 import b64encode
 
 from django.conf import settings
+from django.core.cache import cache
+from django.utils.html import escape
 
+import pycrdt
 import requests
 
+from core.caches import LRUCache
+from core.services.http_client import get_session
+
+CONVERSION_CACHE_HITS_KEY = "conversion_cache_hits"
+CONVERSION_CACHE_MISSES_KEY = "conversion_cache_misses"
+
+conversion_local_cache = LRUCache(max_size=settings.CONVERSION_LOCAL_CACHE_SIZE)
+
 
 class ConversionError(Exception):
     """Base exception for conversion-related errors."""
@@ -19,6 +33,423 @@ class ServiceUnavailableError(ConversionError):
     """Raised when the conversion service is unavailable."""
 
 
+class UnsupportedContentError(ConversionError):
+    """Raised when a document contains content the in-process converter ignores."""
+
+
+def _increment_counter(key):
+    """Increment a counter in the shared cache, creating it if needed."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_conversion_cache_stats():
+    """Return the hits, misses and hit rate of the conversion cache across processes."""
+    hits = cache.get(CONVERSION_CACHE_HITS_KEY, 0)
+    misses = cache.get(CONVERSION_CACHE_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else None,
+    }
+
+
+BLOCKNOTE_FORMATS = {"text/markdown", "text/html", "application/json"}
+BLOCKNOTE_BLOCK_TYPES = {
+    "paragraph",
+    "heading",
+    "bulletListItem",
+    "numberedListItem",
+    "checkListItem",
+    "quote",
+    "codeBlock",
+    "table",
+    "image",
+    "video",
+    "audio",
+    "file",
+}
+MARKDOWN_SPECIAL_CHARACTERS = re.compile(r"([\\`*_\[\]<>|~&])")
+MARKDOWN_LINE_START_MARKERS = re.compile(r"^([ \t]*)([#+=-])", re.MULTILINE)
+MARKDOWN_LINE_START_NUMBERS = re.compile(r"^([ \t]*)(\d+)([.)])", re.MULTILINE)
+MARKDOWN_STYLES = (("bold", "**"), ("italic", "*"), ("strike", "~~"))
+HTML_STYLES = (
+    ("code", "code"),
+    ("bold", "strong"),
+    ("italic", "em"),
+    ("underline", "u"),
+    ("strike", "s"),
+)
+HTML_LIST_TAGS = {
+    "bulletListItem": "ul",
+    "numberedListItem": "ol",
+    "checkListItem": "ul",
+}
+
+
+class BlockNoteConverter:
+    """
+    In-process conversion of BlockNote documents from Yjs to Markdown, HTML or JSON,
+    walking the XML fragment of the document to extract its blocks. Documents holding
+    blocks or inline content it does not know raise an UnsupportedContentError rather
+    than losing them.
+    """
+
+    # Bump to invalidate cached conversions when the output of the converter changes
+    version = "2"
+
+    @staticmethod
+    def can_convert(content_type, accept):
+        """Return True if the conversion is supported in-process."""
+        return content_type == "application/vnd.yjs.doc" and accept in BLOCKNOTE_FORMATS
+
+    def convert(self, data, accept):
+        """Convert a Yjs document given as bytes into the format passed in "accept"."""
+        try:
+            pycrdt.get_state(data)
+        except ValueError as err:
+            raise ValidationError("Invalid Yjs document") from err
+
+        doc = pycrdt.Doc()
+        doc.apply_update(data)
+        fragment = doc.get("document-store", type=pycrdt.XmlFragment)
+        blocks = [
+            block
+            for group in self._get_elements(fragment, "blockGroup")
+            for block in self._parse_block_group(group)
+        ]
+
+        if accept == "application/json":
+            return blocks
+        if accept == "text/markdown":
+            return self._blocks_to_markdown(blocks).strip("\n")
+        if accept == "text/html":
+            return self._blocks_to_html(blocks)
+        raise ValidationError("Unsupported format")
+
+    # Parsing
+
+    @staticmethod
+    def _get_elements(node, tag=None):
+        """Return the child elements of a node, optionally filtered on their tag."""
+        return [
+            child
+            for child in node.children
+            if isinstance(child, pycrdt.XmlElement)
+            and (tag is None or child.tag == tag)
+        ]
+
+    @staticmethod
+    def _get_props(element, exclude=()):
+        """Return the attributes of an element, restoring integers decoded as floats."""
+        props = {}
+        for name, value in element.attributes:
+            if name in exclude:
+                continue
+            is_integer = isinstance(value, float) and value.is_integer()
+            props[name] = int(value) if is_integer else value
+        return props
+
+    def _parse_block_group(self, group):
+        """Return the blocks of a block group."""
+        return [
+            self._parse_block(container)
+            for container in self._get_elements(group, "blockContainer")
+        ]
+
+    def _parse_block(self, container):
+        """Return a block as a dictionary following the structure of BlockNote blocks."""
+        block = {
+            "id": container.attributes.get("id"),
+            "type": "paragraph",
+            "props": self._get_props(container, exclude=("id",)),
+            "content": [],
+            "children": [],
+        }
+        for element in self._get_elements(container):
+            if element.tag == "blockGroup":
+                block["children"] = self._parse_block_group(element)
+                continue
+
+            if element.tag not in BLOCKNOTE_BLOCK_TYPES:
+                raise UnsupportedContentError(f"Unsupported block: {element.tag:s}")
+
+            block["type"] = element.tag
+            block["props"].update(self._get_props(element))
+            if element.tag == "table":
+                block["content"] = self._parse_table(element)
+            else:
+                block["content"] = self._parse_inline_content(element)
+        return block
+
+    def _parse_table(self, table):
+        """Return the content of a table block as rows of cells of inline content."""
+        return {
+            "type": "tableContent",
+            "rows": [
+                {
+                    "cells": [
+                        [
+                            item
+                            for paragraph in self._get_elements(cell)
+                            for item in self._parse_inline_content(paragraph)
+                        ]
+                        for cell in self._get_elements(row)
+                    ]
+                }
+                for row in self._get_elements(table)
+            ],
+        }
+
+    @staticmethod
+    def _parse_inline_content(element):
+        """Return the styled text and links of an element."""
+        content = []
+        for text in element.children:
+            # Custom inline content is stored as elements or embeds
+            if not isinstance(text, pycrdt.XmlText):
+                raise UnsupportedContentError("Unsupported inline content")
+            for insert, attributes in text.diff():
+                if not isinstance(insert, str):
+                    raise UnsupportedContentError("Unsupported inline content")
+                styles = attributes or {}
+                item = {
+                    "type": "text",
+                    "text": insert,
+                    "styles": {
+                        name: value.get("stringValue", True)
+                        if isinstance(value, dict)
+                        else value
+                        for name, value in styles.items()
+                        if name != "link" and value is not None
+                    },
+                }
+
+                link = styles.get("link")
+                if not link:
+                    content.append(item)
+                elif (
+                    content
+                    and content[-1]["type"] == "link"
+                    and content[-1]["href"] == link.get("href")
+                ):
+                    content[-1]["content"].append(item)
+                else:
+                    content.append(
+                        {"type": "link", "href": link.get("href"), "content": [item]}
+                    )
+        return content
+
+    # Rendering
+
+    @staticmethod
+    def _escape_markdown(text):
+        """Escape the characters of a text that Markdown would take for markup."""
+        return MARKDOWN_SPECIAL_CHARACTERS.sub(r"\\\1", text)
+
+    @staticmethod
+    def _escape_markdown_line_starts(markdown):
+        """Escape the text of lines that Markdown would take for headings or lists."""
+        markdown = MARKDOWN_LINE_START_MARKERS.sub(r"\1\\\2", markdown)
+        return MARKDOWN_LINE_START_NUMBERS.sub(r"\1\2\\\3", markdown)
+
+    @classmethod
+    def _get_plain_text(cls, content):
+        """Return the text of inline content without styles."""
+        return "".join(
+            cls._get_plain_text(item["content"])
+            if item["type"] == "link"
+            else item["text"]
+            for item in content
+        )
+
+    @classmethod
+    def _inline_to_markdown(cls, content):
+        """Render inline content as Markdown."""
+        result = []
+        for item in content:
+            if item["type"] == "link":
+                text = cls._inline_to_markdown(item["content"])
+                result.append(f"[{text:s}]({item['href'] or '':s})")
+                continue
+
+            text = item["text"]
+            stripped = text.strip()
+            if not stripped:
+                result.append(text)
+                continue
+
+            styles = item["styles"]
+            if styles.get("code"):
+                stripped = f"`{stripped:s}`"
+            else:
+                stripped = cls._escape_markdown(stripped)
+            for style, marker in MARKDOWN_STYLES:
+                if styles.get(style):
+                    stripped = f"{marker:s}{stripped:s}{marker:s}"
+
+            # Emphasis markers must be adjacent to the text they surround
+            start = text.index(text.lstrip()[0])
+            end = len(text.rstrip())
+            result.append(f"{text[:start]:s}{stripped:s}{text[end:]:s}")
+        return "".join(result)
+
+    def _block_to_markdown(self, block, number):
+        """Render a block without its children as Markdown."""
+        block_type = block["type"]
+        props = block["props"]
+        content = block["content"]
+
+        if block_type == "table":
+            rows = [
+                "| "
+                + " | ".join(self._inline_to_markdown(cell) for cell in row["cells"])
+                + " |"
+                for row in content["rows"]
+            ]
+            if rows:
+                separator = "|" + "---|" * len(content["rows"][0]["cells"])
+                rows.insert(1, separator)
+            return "\n".join(rows)
+
+        if block_type == "codeBlock":
+            language = props.get("language", "")
+            return f"```{language:s}\n{self._get_plain_text(content):s}\n```"
+
+        if block_type in {"image", "video", "audio", "file"}:
+            url = props.get("url", "")
+            caption = self._escape_markdown(
+                props.get("caption") or props.get("name") or url
+            )
+            prefix = "!" if block_type == "image" else ""
+            return f"{prefix:s}[{caption:s}]({url:s})"
+
+        prefix = ""
+        if block_type == "heading":
+            prefix = f"{'#' * props.get('level', 1):s} "
+        elif block_type == "bulletListItem":
+            prefix = "- "
+        elif block_type == "numberedListItem":
+            prefix = f"{number:d}. "
+        elif block_type == "checkListItem":
+            prefix = f"- [{'x' if props.get('checked') else ' '}] "
+        elif block_type == "quote":
+            prefix = "> "
+        markdown = self._escape_markdown_line_starts(self._inline_to_markdown(content))
+        return f"{prefix:s}{markdown:s}"
+
+    def _blocks_to_markdown(self, blocks, indent=""):
+        """Render blocks as Markdown, nested blocks being indented."""
+        result = ""
+        number = 0
+        previous_type = None
+        for block in blocks:
+            block_type = block["type"]
+            number = number + 1 if block_type == "numberedListItem" else 0
+
+            if previous_type is not None:
+                # Items of the same list are not separated by a blank line
+                tight = block_type in HTML_LIST_TAGS and block_type == previous_type
+                result += "\n" if tight else "\n\n"
+            previous_type = block_type
+
+            markdown = self._block_to_markdown(block, number)
+            result += "\n".join(
+                f"{indent:s}{line:s}" if line else line for line in markdown.split("\n")
+            )
+            if block["children"]:
+                tight = block["children"][0]["type"] in HTML_LIST_TAGS
+                result += ("\n" if tight else "\n\n") + self._blocks_to_markdown(
+                    block["children"], indent=f"{indent:s}    "
+                )
+        return result
+
+    @classmethod
+    def _inline_to_html(cls, content):
+        """Render inline content as HTML."""
+        result = []
+        for item in content:
+            if item["type"] == "link":
+                text = cls._inline_to_html(item["content"])
+                result.append(f'<a href="{escape(item["href"] or ""):s}">{text:s}</a>')
+                continue
+
+            text = escape(item["text"])
+            for style, tag in HTML_STYLES:
+                if item["styles"].get(style):
+                    text = f"<{tag:s}>{text:s}</{tag:s}>"
+            result.append(text)
+        return "".join(result)
+
+    def _block_to_html(self, block):
+        """Render a block and its children as HTML."""
+        block_type = block["type"]
+        props = block["props"]
+        content = block["content"]
+        children = self._blocks_to_html(block["children"])
+
+        if block_type in HTML_LIST_TAGS:
+            checkbox = ""
+            if block_type == "checkListItem":
+                checked = " checked" if props.get("checked") else ""
+                checkbox = f'<input type="checkbox" disabled{checked:s}>'
+            return f"<li>{checkbox:s}{self._inline_to_html(content):s}{children:s}</li>"
+
+        if block_type == "table":
+            rows = "".join(
+                "<tr>"
+                + "".join(
+                    f"<td>{self._inline_to_html(cell):s}</td>" for cell in row["cells"]
+                )
+                + "</tr>"
+                for row in content["rows"]
+            )
+            html = f"<table><tbody>{rows:s}</tbody></table>"
+        elif block_type == "codeBlock":
+            language = escape(props.get("language", ""))
+            code = escape(self._get_plain_text(content))
+            html = f'<pre><code class="language-{language:s}">{code:s}</code></pre>'
+        elif block_type == "image":
+            url = escape(props.get("url", ""))
+            caption = escape(props.get("caption", ""))
+            html = f'<img src="{url:s}" alt="{caption:s}">'
+        elif block_type in {"video", "audio"}:
+            url = escape(props.get("url", ""))
+            html = f'<{block_type:s} src="{url:s}" controls></{block_type:s}>'
+        elif block_type == "file":
+            url = escape(props.get("url", ""))
+            name = escape(props.get("name") or props.get("url", ""))
+            html = f'<a href="{url:s}">{name:s}</a>'
+        elif block_type == "heading":
+            level = props.get("level", 1)
+            html = f"<h{level:d}>{self._inline_to_html(content):s}</h{level:d}>"
+        elif block_type == "quote":
+            html = f"<blockquote>{self._inline_to_html(content):s}</blockquote>"
+        else:
+            html = f"<p>{self._inline_to_html(content):s}</p>"
+        return html + children
+
+    def _blocks_to_html(self, blocks):
+        """Render blocks as HTML, grouping consecutive list items in lists."""
+        result = ""
+        list_tag = None
+        for block in blocks:
+            block_list_tag = HTML_LIST_TAGS.get(block["type"])
+            if block_list_tag != list_tag:
+                if list_tag:
+                    result += f"</{list_tag:s}>"
+                if block_list_tag:
+                    result += f"<{block_list_tag:s}>"
+                list_tag = block_list_tag
+            result += self._block_to_html(block)
+        if list_tag:
+            result += f"</{list_tag:s}>"
+        return result
+
+
 class YdocConverter:
     """Service class for conversion-related operations."""
 
@@ -30,7 +461,7 @@ class YdocConverter:
 
     def _request(self, url, data, content_type, accept):
         """Make a request to the Y-Provider API."""
-        response = requests.post(
+        response = get_session("y-provider").post(
             url,
             data=data,
             headers={
@@ -44,14 +475,77 @@ class YdocConverter:
         response.raise_for_status()
         return response
 
+    @staticmethod
+    def get_converter_version(content_type, accept):
+        """Return the converter used for a conversion and its version."""
+        if (
+            settings.CONVERSION_BACKEND == "in-process"
+            and BlockNoteConverter.can_convert(content_type, accept)
+        ):
+            return f"in-process-{BlockNoteConverter.version:s}"
+        return "y-provider"
+
+    def get_cache_key(self, text, content_type, accept):
+        """
+        Compute the cache key of a conversion from the hash of the content, the formats
+        and the version of the converter.
+        """
+        data = text.encode("utf-8") if isinstance(text, str) else text
+        content_hash = hashlib.blake2b(data, digest_size=32).hexdigest()
+        converter_version = self.get_converter_version(content_type, accept)
+        return (
+            f"conversion_{content_hash:s}_{content_type:s}_{accept:s}"
+            f"_{converter_version:s}"
+        )
+
     def convert(
         self, text, content_type="text/markdown", accept="application/vnd.yjs.doc"
     ):
-        """Convert a Markdown text into our internal format using an external microservice."""
-
+        """
+        Convert a text between formats. Results are cached in process and in the shared
+        cache, under a key depending on the content so that the cache never needs to be
+        invalidated.
+        """
         if not text:
             raise ValidationError("Input text cannot be empty")
 
+        if not settings.CONVERSION_CACHE_TIMEOUT:
+            return self._convert(text, content_type, accept)
+
+        cache_key = self.get_cache_key(text, content_type, accept)
+        cached_result = conversion_local_cache.get(cache_key)
+        if cached_result is None:
+            cached_result = cache.get(cache_key)
+            if cached_result is not None:
+                conversion_local_cache.set(cache_key, cached_result)
+
+        if cached_result is not None:
+            _increment_counter(CONVERSION_CACHE_HITS_KEY)
+            return json.loads(cached_result)
+
+        _increment_counter(CONVERSION_CACHE_MISSES_KEY)
+        result = self._convert(text, content_type, accept)
+
+        # Results are serialized so that the size of JSON results is bounded as well
+        serialized_result = json.dumps(result)
+        conversion_local_cache.set(cache_key, serialized_result)
+        if len(serialized_result) <= settings.CONVERSION_CACHE_MAX_ITEM_SIZE:
+            cache.set(cache_key, serialized_result, settings.CONVERSION_CACHE_TIMEOUT)
+        return result
+
+    def _convert(self, text, content_type, accept):
+        """
+        Convert a text between formats. Conversions of Yjs documents to Markdown, HTML or
+        JSON are done in-process if the "in-process" backend is configured. Other
+        conversions, and documents with content unknown to the in-process converter,
+        fall back to the external microservice.
+        """
+        if self.get_converter_version(content_type, accept) != "y-provider":
+            try:
+                return BlockNoteConverter().convert(text, accept)
+            except UnsupportedContentError:
+                pass
+
         try:
             response = self._request(
                 f"{settings.Y_PROVIDER_API_BASE_URL}{settings.CONVERSION_API_ENDPOINT}/",
@@ -0,0 +1,100 @@
+"""Pooled HTTP sessions used to call other services."""
+
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+from django.conf import settings
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+PROXY_SESSION = "proxy"
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class RejectAllCookiePolicy(DefaultCookiePolicy):
+    """Cookie policy neither storing nor sending any cookie."""
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+def _build_session():
+    """
+    Build a session keeping connections alive in a pool, and retrying requests with
+    an exponential backoff when the connection fails or the service is unavailable.
+    """
+    return _mount_adapter(requests.Session(), _build_retry())
+
+
+def _build_proxy_session():
+    """
+    Build a session to fetch resources of any site on behalf of users. Its cookies
+    would be sent with the requests of other users so they are all rejected, and
+    requests are not retried so that the proxy can't be used to multiply requests.
+    """
+    session = requests.Session()
+    session.cookies.set_policy(RejectAllCookiePolicy())
+    return _mount_adapter(session, 0)
+
+
+def _build_retry():
+    """Return the retry policy of requests to other services."""
+    return Retry(
+        total=settings.HTTP_CLIENT_MAX_RETRIES,
+        backoff_factor=settings.HTTP_CLIENT_RETRY_BACKOFF_FACTOR,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+        # Return the last response so that callers can handle its status code
+        raise_on_status=False,
+    )
+
+
+def _mount_adapter(session, max_retries):
+    """Mount an adapter keeping connections alive in a pool on a session."""
+    adapter = HTTPAdapter(
+        pool_connections=settings.HTTP_CLIENT_POOL_SIZE,
+        pool_maxsize=settings.HTTP_CLIENT_POOL_SIZE,
+        max_retries=max_retries,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(service):
+    """
+    Return the session used to call a service. Each service has its own session and
+    pool of connections, shared by all the requests handled by the process. The
+    PROXY_SESSION service is reserved to requests to arbitrary sites.
+    """
+    try:
+        return _sessions[service]
+    except KeyError:
+        pass
+
+    with _sessions_lock:
+        if service not in _sessions:
+            _sessions[service] = (
+                _build_proxy_session() if service == PROXY_SESSION else _build_session()
+            )
+        return _sessions[service]
+
+
+def close_sessions():
+    """Close all sessions and their connections."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+# Connections must not be shared with processes forked by celery or gunicorn workers
+os.register_at_fork(after_in_child=_sessions.clear)
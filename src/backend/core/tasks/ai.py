@@ -0,0 +1,99 @@
+"""AI tasks."""
+
+from logging import getLogger
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.text import capfirst
+
+from core import enums, models
+from core.services.ai_services import AIService
+from core.utils import extract_attachments
+
+from impress.celery_app import app
+
+logger = getLogger(__name__)
+
+TRANSLATION_JOB_CACHE_KEY = "ai_translation_job_{job_id!s}"
+TRANSLATION_JOB_TIMEOUT = 24 * 3600
+
+
+def get_translation_job(job_id):
+    """Return the state of a document translation job, or None if it is unknown."""
+    return cache.get(TRANSLATION_JOB_CACHE_KEY.format(job_id=job_id))
+
+
+def update_translation_job(job_id, **state):
+    """Update the state of a document translation job."""
+    cache_key = TRANSLATION_JOB_CACHE_KEY.format(job_id=job_id)
+    job = cache.get(cache_key, {})
+    job.update(state)
+    cache.set(cache_key, job, TRANSLATION_JOB_TIMEOUT)
+
+
+@transaction.atomic
+def create_translated_document(document, user, language, content):
+    """
+    Save a translated document as a sibling of the original document, like a
+    duplicate, the user becoming its owner if it is a root document.
+    """
+    language_display = enums.ALL_LANGUAGES.get(language, language)
+    title = capfirst(f"{document.title or ''} ({language_display})".strip())
+    attachments = list(
+        set(extract_attachments(document.content)) & set(document.attachments)
+    )
+    translated_document = document.add_sibling(
+        "right",
+        title=title,
+        content=content,
+        attachments=attachments,
+        duplicated_from=document,
+        creator=user,
+    )
+    if document.is_root():
+        models.DocumentAccess.objects.create(
+            document=translated_document,
+            user=user,
+            role=models.RoleChoices.OWNER,
+        )
+    return translated_document
+
+
+@app.task
+def translate_document(job_id, document_id, user_id, language, duplicate=False):
+    """
+    Translate a document with AI, reporting the progress of the translation in the
+    state of the job. The translation is saved as a new document if "duplicate" is
+    set, or kept in the state of the job otherwise. The job always ends with the
+    "succeeded" or "failed" status so that clients polling it can stop.
+    """
+
+    def on_progress(done, total):
+        update_translation_job(job_id, progress=done, total=total)
+
+    try:
+        document = models.Document.objects.get(pk=document_id)
+        update_translation_job(job_id, status="running")
+
+        try:
+            content = AIService().translate_document(
+                document.content, language, on_progress=on_progress
+            )
+        except ValueError as err:
+            update_translation_job(job_id, status="failed", error=str(err))
+            return
+
+        if duplicate:
+            user = models.User.objects.get(pk=user_id)
+            translated_document = create_translated_document(
+                document, user, language, content
+            )
+            result = {"document": str(translated_document.id)}
+        else:
+            result = {"content": content}
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Could not translate document %s", document_id)
+        update_translation_job(job_id, status="failed", error="Translation failed.")
+        return
+
+    update_translation_job(job_id, status="succeeded", **result)
@@ -0,0 +1,92 @@
+"""Collaboration server tasks."""
+
+from datetime import timedelta
+from logging import getLogger
+
+from django.db import models as db
+from django.db import transaction
+from django.utils import timezone
+
+import requests
+
+from core import models
+from core.services.collaboration_services import CollaborationService
+
+from impress.celery_app import app
+
+logger = getLogger(__name__)
+
+NOTIFICATIONS_BATCH_SIZE = 500
+NOTIFICATIONS_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def coalesce_notifications(notifications):
+    """
+    Return the connections to reset per room, as a set of user ids or None to reset
+    all the connections of the room.
+    """
+    resets = {}
+    for notification in notifications:
+        if notification.user_id is None:
+            resets[notification.room] = None
+        elif resets.setdefault(notification.room, set()) is not None:
+            resets[notification.room].add(notification.user_id)
+    return resets
+
+
+@app.task
+def send_collaboration_notifications():
+    """
+    Send the pending notifications to the collaboration server in batches. Notifications
+    of a same room are coalesced, and notifications that could not be sent are kept to
+    be retried by the next run.
+
+    Each batch is claimed in a short transaction, so that no lock is held while calling
+    the collaboration server, and notifications are only deleted once sent. Claims
+    expire so that notifications claimed by a worker that died are sent again.
+    """
+    if not models.CollaborationNotification.objects.exists():
+        return
+
+    service = CollaborationService()
+    failed_rooms = set()
+
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            notifications = list(
+                models.CollaborationNotification.objects.select_for_update(
+                    skip_locked=True
+                )
+                .filter(
+                    db.Q(claimed_at__isnull=True)
+                    | db.Q(claimed_at__lt=now - NOTIFICATIONS_CLAIM_TIMEOUT)
+                )
+                .exclude(room__in=failed_rooms)
+                .order_by("created_at")[:NOTIFICATIONS_BATCH_SIZE]
+            )
+            if not notifications:
+                return
+
+            models.CollaborationNotification.objects.filter(
+                pk__in=[n.pk for n in notifications]
+            ).update(claimed_at=now)
+
+        for room, user_ids in coalesce_notifications(notifications).items():
+            try:
+                if user_ids is None:
+                    service.reset_connections(room)
+                else:
+                    for user_id in sorted(user_ids):
+                        service.reset_connections(room, user_id)
+            except requests.HTTPError as err:
+                logger.warning("Failed to reset connections of %s: %s", room, err)
+                failed_rooms.add(room)
+
+        models.CollaborationNotification.objects.filter(
+            pk__in=[n.pk for n in notifications if n.room not in failed_rooms]
+        ).delete()
+        # Release the claim so that the next run retries right away
+        models.CollaborationNotification.objects.filter(
+            pk__in=[n.pk for n in notifications if n.room in failed_rooms]
+        ).update(claimed_at=None)
@@ -0,0 +1,82 @@
+"""Document content tasks."""
+
+import base64
+from logging import getLogger
+
+from django.conf import settings
+from django.db import models as db
+from django.db import transaction
+from django.utils import timezone
+
+from core import models
+from core.services.converter_services import ConversionError, YdocConverter
+from core.utils import parse_retention_policy
+
+from impress.celery_app import app
+
+logger = getLogger(__name__)
+
+
+@app.task
+def compact_document_content_updates(document_id):
+    """Merge the pending incremental updates of a document into its content."""
+    with transaction.atomic():
+        document = models.Document.objects.select_for_update().get(pk=document_id)
+        document.compact_content_updates()
+
+
+@app.task
+def warm_document_conversions(document_id):
+    """
+    Convert the content of a document to the formats listed in the
+    "CONVERSION_CACHE_WARM_FORMATS" setting, so that conversions are served from cache.
+    """
+    document = models.Document.objects.filter(pk=document_id).first()
+    if document is None or not document.content:
+        return
+
+    data = base64.b64decode(document.content)
+    converter = YdocConverter()
+    for accept in settings.CONVERSION_CACHE_WARM_FORMATS:
+        try:
+            converter.convert(data, "application/vnd.yjs.doc", accept)
+        except ConversionError as err:
+            logger.warning(
+                "Could not convert document %s to %s: %s", document_id, accept, err
+            )
+
+
+@app.task
+def thin_document_versions():
+    """
+    Delete the versions of documents exceeding the retention policy configured in the
+    "DOCUMENT_VERSIONS_RETENTION_POLICY" setting, and report the bytes reclaimed.
+    """
+    policy = parse_retention_policy(settings.DOCUMENT_VERSIONS_RETENTION_POLICY)
+    if not any(interval for _min_age, interval in policy):
+        return {"deleted_versions": 0, "bytes_reclaimed": 0}
+
+    now = timezone.now()
+    min_age = min(min_age for min_age, interval in policy if interval)
+    documents = (
+        models.Document.objects.filter(versions__last_modified__lte=now - min_age)
+        .annotate(nb_versions=db.Count("versions"))
+        .filter(nb_versions__gt=1)
+        .only("id", "path")
+    )
+
+    deleted_versions = 0
+    bytes_reclaimed = 0
+    for document in documents.iterator():
+        version_ids = document.get_versions_to_thin(policy, now=now)
+        if version_ids:
+            deleted_count, deleted_size = document.delete_versions(version_ids)
+            deleted_versions += deleted_count
+            bytes_reclaimed += deleted_size
+
+    logger.info(
+        "Deleted %d document versions, reclaiming %d bytes",
+        deleted_versions,
+        bytes_reclaimed,
+    )
+    return {"deleted_versions": deleted_versions, "bytes_reclaimed": bytes_reclaimed}
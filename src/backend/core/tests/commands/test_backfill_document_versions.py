@@ -0,0 +1,39 @@
+"""
+Unit test for `backfill_document_versions` command.
+"""
+
+from django.core.management import call_command
+
+import pytest
+
+from core import factories, models
+
+pytestmark = pytest.mark.django_db
+
+
+def test_backfill_document_versions():
+    """
+    The command should index the versions of documents found in object storage,
+    leaving versions already indexed untouched.
+    """
+    document = factories.DocumentFactory(content="version 1")
+    document.content = "version 2"
+    document.save()
+    other_document = factories.DocumentFactory()
+
+    indexed_versions = list(document.versions.values_list("version_id", flat=True))
+    assert len(indexed_versions) == 2
+
+    # Simulate documents saved before versions were indexed
+    models.DocumentVersion.objects.filter(
+        document=document, version_id=indexed_versions[1]
+    ).delete()
+    models.DocumentVersion.objects.filter(document=other_document).delete()
+
+    call_command("backfill_document_versions")
+
+    assert sorted(document.versions.values_list("version_id", flat=True)) == sorted(
+        indexed_versions
+    )
+    assert other_document.versions.count() == 1
+    assert models.DocumentVersion.objects.count() == 3
@@ -460,6 +460,40 @@ def test_api_document_versions_retrieve_authenticated_related_parent(
     assert response.json()["content"] == "new content 1"
 
 
+def test_api_document_versions_retrieve_not_indexed():
+    """
+    Versions written before versions were indexed in database should be retrieved
+    from object storage.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory(users=[user])
+    time.sleep(1)  # minio stores datetimes with the precision of a second
+    document.content = "new content"
+    document.save()
+    document.content = "new content 1"
+    document.save()
+
+    version_id = document.get_versions_slice()["versions"][0]["version_id"]
+    document.versions.all().delete()
+
+    response = client.get(
+        f"/api/v1.0/documents/{document.id!s}/versions/{version_id:s}/",
+    )
+
+    assert response.status_code == 200
+    assert response.json()["content"] == "new content"
+
+    response = client.get(
+        f"/api/v1.0/documents/{document.id!s}/versions/unknown-version/",
+    )
+
+    assert response.status_code == 404
+
+
 def test_api_document_versions_create_anonymous():
     """Anonymous users should not be allowed to create document versions."""
     document = factories.DocumentFactory()
@@ -731,3 +765,43 @@ def test_api_document_versions_delete_administrator_or_owner(via, mock_user_team
 
     versions = document.get_versions_slice()["versions"]
     assert len(versions) == 1
+
+
+def test_api_document_versions_list_etag():
+    """
+    The list of versions should be revalidated against its ETag, which changes when a
+    version is added or deleted.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory()
+    factories.UserDocumentAccessFactory(document=document, user=user, role="owner")
+    url = f"/api/v1.0/documents/{document.id!s}/versions/"
+
+    time.sleep(1)  # minio stores datetimes with the precision of a second
+    for i in range(2):
+        document.content = f"new content {i:d}"
+        document.save()
+
+    etag = client.get(url)["ETag"]
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    document.content = "new content 2"
+    document.save()
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+    etag = response["ETag"]
+
+    version_id = response.json()["versions"][0]["version_id"]
+    client.delete(f"{url:s}{version_id:s}/")
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["count"] == 1
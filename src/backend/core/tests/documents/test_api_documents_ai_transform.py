@@ -8,6 +8,7 @@ from unittest.mock import MagicMock, patch
 from django.test import override_settings
 
 import pytest
+from openai import OpenAIError
 from rest_framework.test import APIClient
 
 from core import factories
@@ -25,6 +26,16 @@ def ai_settings():
         yield
 
 
+def get_stream_mock(*pieces):
+    """Return a mock of a streamed chat completion yielding the pieces of text."""
+    stream = MagicMock()
+    stream.__iter__.return_value = [
+        MagicMock(choices=[MagicMock(delta=MagicMock(content=piece))])
+        for piece in pieces
+    ]
+    return stream
+
+
 @override_settings(
     AI_ALLOW_REACH_FROM=random.choice(["public", "authenticated", "restricted"])
 )
@@ -360,3 +371,61 @@ def test_api_documents_ai_transform_throttling_user(mock_create):
     assert response.json() == {
         "detail": "Request was throttled. Expected available in 60 seconds."
     }
+
+
+@pytest.mark.usefixtures("ai_settings")
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_documents_ai_transform_stream(mock_create):
+    """
+    The AI transform answer should be streamed as server-sent events when requested.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory(users=[(user, "editor")])
+
+    stream = get_stream_mock("Sa", None, "lut")
+    mock_create.return_value = stream
+
+    url = f"/api/v1.0/documents/{document.id!s}/ai-transform/"
+    response = client.post(
+        url, {"text": "Hello", "action": "correct", "stream": True}, format="json"
+    )
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "text/event-stream"
+    assert response["Cache-Control"] == "no-cache"
+    assert b"".join(response.streaming_content).decode() == (
+        'data: {"answer": "Sa"}\n\ndata: {"answer": "lut"}\n\nevent: done\ndata: {}\n\n'
+    )
+    assert mock_create.call_args.kwargs["stream"] is True
+    stream.close.assert_called_once_with()
+
+
+@pytest.mark.usefixtures("ai_settings")
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_documents_ai_transform_stream_error(mock_create):
+    """An error occurring while streaming the answer should be sent as an event."""
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory(users=[(user, "editor")])
+
+    stream = MagicMock()
+    stream.__iter__.side_effect = OpenAIError("Mocked client error")
+    mock_create.return_value = stream
+
+    url = f"/api/v1.0/documents/{document.id!s}/ai-transform/"
+    response = client.post(
+        url, {"text": "Hello", "action": "correct", "stream": True}, format="json"
+    )
+
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content).decode() == (
+        "event: error\ndata: {}\n\n"
+    )
+    stream.close.assert_called_once_with()
@@ -25,6 +25,16 @@ def ai_settings():
         yield
 
 
+def get_stream_mock(*pieces):
+    """Return a mock of a streamed chat completion yielding the pieces of text."""
+    stream = MagicMock()
+    stream.__iter__.return_value = [
+        MagicMock(choices=[MagicMock(delta=MagicMock(content=piece))])
+        for piece in pieces
+    ]
+    return stream
+
+
 def test_api_documents_ai_translate_viewset_options_metadata():
     """The documents endpoint should give us the list of available languages."""
     user = factories.UserFactory()
@@ -382,3 +392,34 @@ def test_api_documents_ai_translate_throttling_user(mock_create):
     assert response.json() == {
         "detail": "Request was throttled. Expected available in 60 seconds."
     }
+
+
+@pytest.mark.usefixtures("ai_settings")
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_documents_ai_translate_stream(mock_create):
+    """
+    The AI translate answer should be streamed as server-sent events when requested.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory(users=[(user, "editor")])
+
+    stream = get_stream_mock("Sa", None, "lut")
+    mock_create.return_value = stream
+
+    url = f"/api/v1.0/documents/{document.id!s}/ai-translate/"
+    response = client.post(
+        url, {"text": "Hello", "language": "fr", "stream": True}, format="json"
+    )
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "text/event-stream"
+    assert response["Cache-Control"] == "no-cache"
+    assert b"".join(response.streaming_content).decode() == (
+        'data: {"answer": "Sa"}\n\ndata: {"answer": "lut"}\n\nevent: done\ndata: {}\n\n'
+    )
+    assert mock_create.call_args.kwargs["stream"] is True
+    stream.close.assert_called_once_with()
@@ -0,0 +1,418 @@
+"""
+Test AI translate document API endpoint for users in impress's core app.
+"""
+
+import base64
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+from django.test import override_settings
+
+import pycrdt
+import pytest
+from rest_framework.test import APIClient
+
+from core import factories, models
+from core.tasks.ai import (
+    get_translation_job,
+    translate_document,
+    update_translation_job,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def ai_settings():
+    """Fixture to set AI settings."""
+    with override_settings(
+        AI_BASE_URL="http://example.com", AI_API_KEY="test-key", AI_MODEL="llama"
+    ):
+        yield
+
+
+def get_content():
+    """Return a base64 Yjs document structured like BlockNote documents."""
+    ydoc = pycrdt.Doc()
+    ydoc["document-store"] = fragment = pycrdt.XmlFragment()
+    group = fragment.children.append(pycrdt.XmlElement("blockGroup"))
+
+    blocks = [
+        ("heading", {"level": 2}, [("Title", None)]),
+        ("paragraph", {}, [("Some ", None), ("bold", {"bold": {}}), (" & more", None)]),
+        ("paragraph", {}, [(" ", None)]),
+    ]
+    for i, (block_type, props, inserts) in enumerate(blocks):
+        container = group.children.append(
+            pycrdt.XmlElement("blockContainer", {"id": str(i)})
+        )
+        element = container.children.append(pycrdt.XmlElement(block_type, props))
+        text = element.children.append(pycrdt.XmlText())
+        for insert, attributes in inserts:
+            text.insert(len(text), insert, attributes)
+
+    return base64.b64encode(ydoc.get_update()).decode("utf-8")
+
+
+def get_text_runs(content):
+    """Return the runs of formatted text of each block of a base64 Yjs document."""
+    ydoc = pycrdt.Doc()
+    ydoc.apply_update(base64.b64decode(content))
+    fragment = ydoc.get("document-store", type=pycrdt.XmlFragment)
+    return [
+        list(container.children[0].children[0].diff())
+        for container in fragment.children[0].children
+    ]
+
+
+def uppercase_answer(model, messages):
+    """Mock the AI API, answering with the text it was given in uppercase."""
+    return MagicMock(
+        choices=[MagicMock(message=MagicMock(content=messages[1]["content"].upper()))]
+    )
+
+
+def test_api_documents_ai_translate_document_anonymous():
+    """Anonymous users should not be able to translate documents."""
+    document = factories.DocumentFactory(link_reach="public", link_role="editor")
+
+    response = APIClient().post(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/",
+        {"language": "fr"},
+    )
+
+    assert response.status_code == 401
+
+
+@pytest.mark.usefixtures("ai_settings")
+def test_api_documents_ai_translate_document_reader():
+    """Readers should not be able to translate documents."""
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(users=[(user, "reader")])
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/",
+        {"language": "fr"},
+    )
+
+    assert response.status_code == 403
+
+
+@pytest.mark.usefixtures("ai_settings")
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_documents_ai_translate_document_success(mock_create):
+    """
+    Editors should be able to translate a whole document block by block, preserving
+    its formatting, and poll the job for the translated content.
+    """
+    user = factories.UserFactory()
+    content = get_content()
+    document = factories.DocumentFactory(users=[(user, "editor")], content=content)
+    mock_create.side_effect = uppercase_answer
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/",
+        {"language": "fr"},
+    )
+
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    # Blank blocks are not sent to the AI API
+    assert mock_create.call_count == 2
+
+    response = client.get(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/{job_id:s}/"
+    )
+
+    assert response.status_code == 200
+    job = response.json()
+    assert job["status"] == "succeeded"
+    assert job["progress"] == job["total"] == 2
+    assert get_text_runs(job["content"]) == [
+        [("TITLE", None)],
+        [("SOME ", None), ("BOLD", {"bold": {}}), (" & MORE", None)],
+        [(" ", None)],
+    ]
+
+    # The document itself is left unchanged
+    document = models.Document.objects.get(pk=document.pk)
+    assert document.content == content
+
+
+@pytest.mark.usefixtures("ai_settings")
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_documents_ai_translate_document_embeds(mock_create):
+    """Blocks holding embedded objects should be left untranslated to keep them."""
+    ydoc = pycrdt.Doc()
+    ydoc["document-store"] = fragment = pycrdt.XmlFragment()
+    group = fragment.children.append(pycrdt.XmlElement("blockGroup"))
+    for i, inserts in enumerate([["Hello ", {"mention": "John"}], ["Bye"]]):
+        container = group.children.append(
+            pycrdt.XmlElement("blockContainer", {"id": str(i)})
+        )
+        paragraph = container.children.append(pycrdt.XmlElement("paragraph"))
+        text = paragraph.children.append(pycrdt.XmlText())
+        for insert in inserts:
+            if isinstance(insert, str):
+                text.insert(len(text), insert)
+            else:
+                text.insert_embed(len(text), insert)
+    content = base64.b64encode(ydoc.get_update()).decode("utf-8")
+
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(users=[(user, "editor")], content=content)
+    mock_create.side_effect = uppercase_answer
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/",
+        {"language": "fr"},
+    )
+    job_id = response.json()["id"]
+
+    response = client.get(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/{job_id:s}/"
+    )
+
+    assert mock_create.call_count == 1
+    assert get_text_runs(response.json()["content"]) == [
+        [("Hello ", None), ({"mention": "John"}, None)],
+        [("BYE", None)],
+    ]
+
+
+@pytest.mark.usefixtures("ai_settings")
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_documents_ai_translate_document_duplicate(mock_create):
+    """The translation should be saved as a new document if requested."""
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(
+        title="My document", users=[(user, "editor")], content=get_content()
+    )
+    mock_create.side_effect = uppercase_answer
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/",
+        {"language": "fr", "duplicate": True},
+    )
+    job_id = response.json()["id"]
+
+    response = client.get(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/{job_id:s}/"
+    )
+
+    job = response.json()
+    assert job["status"] == "succeeded"
+    assert "content" not in job
+
+    translated_document = models.Document.objects.get(pk=job["document"])
+    assert translated_document.title == "My document (French)"
+    assert translated_document.duplicated_from == document
+    assert translated_document.get_role(user) == "owner"
+    assert get_text_runs(translated_document.content)[0] == [("TITLE", None)]
+
+
+@pytest.mark.usefixtures("ai_settings")
+@override_settings(AI_TRANSLATE_DOCUMENT_MAX_LENGTH=10)
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_documents_ai_translate_document_too_long(mock_create):
+    """Documents longer than the maximum length should not be translated."""
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(
+        users=[(user, "editor")], content=get_content()
+    )
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/",
+        {"language": "fr"},
+    )
+    job_id = response.json()["id"]
+
+    response = client.get(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/{job_id:s}/"
+    )
+
+    assert response.json() == {
+        "status": "failed",
+        "progress": 0,
+        "total": None,
+        "error": "Document too long. Maximum length is 10 characters.",
+    }
+    mock_create.assert_not_called()
+
+
+@pytest.mark.usefixtures("ai_settings")
+@override_settings(AI_USER_RATE_THROTTLE_RATES={"minute": 3, "hour": 50, "day": 200})
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_documents_ai_translate_document_throttled_per_block(mock_create):
+    """Each block of the document should be counted against the AI rate limits."""
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(
+        users=[(user, "editor")], content=get_content()
+    )
+    mock_create.side_effect = uppercase_answer
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/",
+        {"language": "fr"},
+    )
+    assert response.status_code == 202
+
+    # The 2 blocks of the document exceed the remaining budget of the minute
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/",
+        {"language": "fr"},
+    )
+    assert response.status_code == 429
+    assert mock_create.call_count == 2
+
+
+@pytest.mark.usefixtures("ai_settings")
+@override_settings(AI_TRANSLATE_DOCUMENT_MAX_BLOCKS=1)
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_documents_ai_translate_document_too_many_blocks(mock_create):
+    """
+    Documents with more blocks than the maximum should not be translated, as each
+    block is sent to the AI API in a separate request.
+    """
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(
+        users=[(user, "editor")], content=get_content()
+    )
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/",
+        {"language": "fr"},
+    )
+    job_id = response.json()["id"]
+
+    response = client.get(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/{job_id:s}/"
+    )
+
+    assert response.json()["status"] == "failed"
+    assert response.json()["error"] == (
+        "Document too long. Maximum number of blocks is 1."
+    )
+    mock_create.assert_not_called()
+
+
+@pytest.mark.usefixtures("ai_settings")
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_documents_ai_translate_document_status_other_user(mock_create):
+    """Users should not be able to poll the translation jobs of other users."""
+    user, other_user = factories.UserFactory.create_batch(2)
+    document = factories.DocumentFactory(
+        users=[(user, "editor"), (other_user, "editor")], content=get_content()
+    )
+    mock_create.side_effect = uppercase_answer
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/",
+        {"language": "fr"},
+    )
+    job_id = response.json()["id"]
+
+    client.force_login(other_user)
+    response = client.get(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/{job_id:s}/"
+    )
+
+    assert response.status_code == 404
+
+
+def test_api_documents_ai_translate_document_task_document_deleted():
+    """The job should fail if the document was deleted before being translated."""
+    job_id = uuid4()
+
+    translate_document(job_id, str(uuid4()), str(uuid4()), "fr")
+
+    assert get_translation_job(job_id) == {
+        "status": "failed",
+        "error": "Translation failed.",
+    }
+
+
+@pytest.mark.usefixtures("ai_settings")
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_documents_ai_translate_document_task_duplicate_failed(mock_create):
+    """
+    The job should fail, without leaving a partially created document, if the
+    translated document could not be saved.
+    """
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(
+        users=[(user, "editor")], content=get_content()
+    )
+    mock_create.side_effect = uppercase_answer
+    job_id = uuid4()
+
+    with patch.object(
+        models.DocumentAccess.objects, "create", side_effect=RuntimeError("Failed")
+    ):
+        translate_document(job_id, str(document.id), str(user.id), "fr", duplicate=True)
+
+    assert get_translation_job(job_id)["status"] == "failed"
+    assert models.Document.objects.count() == 1
+
+
+@pytest.mark.usefixtures("ai_settings")
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_documents_ai_translate_document_invalid_content(mock_create):
+    """The job should fail if the content of the document is not a Yjs document."""
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(
+        users=[(user, "editor")],
+        content=base64.b64encode(b"not a yjs document").decode("utf-8"),
+    )
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/",
+        {"language": "fr"},
+    )
+    job_id = response.json()["id"]
+
+    response = client.get(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/{job_id:s}/"
+    )
+
+    assert response.json()["status"] == "failed"
+    assert response.json()["error"] == "Invalid document."
+    mock_create.assert_not_called()
+
+
+def test_api_documents_ai_translate_document_status_evicted():
+    """
+    Polling a job that was evicted from the cache and updated since, losing its
+    document and user, should return a 404.
+    """
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(users=[(user, "editor")])
+    job_id = str(uuid4())
+    update_translation_job(job_id, status="running")
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.get(
+        f"/api/v1.0/documents/{document.id!s}/ai-translate-document/{job_id:s}/"
+    )
+
+    assert response.status_code == 404
@@ -13,7 +13,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 import pytest
 from rest_framework.test import APIClient
 
-from core import factories
+from core import factories, models
 from core.api.viewsets import malware_detection
 from core.tests.conftest import TEAM, USER, VIA
 
@@ -91,6 +91,7 @@ def test_api_documents_attachment_upload_anonymous_success():
     assert file_head["Metadata"] == {"owner": "None", "status": "processing"}
     assert file_head["ContentType"] == "image/png"
     assert file_head["ContentDisposition"] == 'inline; filename="test.png"'
+    assert models.DocumentAttachment.objects.get(key=key).status == "processing"
 
 
 @pytest.mark.parametrize(
@@ -1,6 +1,7 @@
 """Test the can_edit endpoint in the viewset DocumentViewSet."""
 
 from django.core.cache import cache
+from django.test.utils import override_settings
 
 import pytest
 import responses
@@ -316,3 +317,84 @@ def test_api_documents_can_edit_websocket_server_room_not_found_other_already_ed
     assert response.json() == {"can_edit": False}
 
     assert ws_resp.call_count == 1
+
+
+@responses.activate
+def test_api_documents_can_edit_connection_info_cached(settings):
+    """
+    Connection checks of the collaboration server should be cached for a short time.
+    """
+    user = factories.UserFactory(with_owned_document=True)
+    client = APIClient()
+    client.force_login(user)
+    session_key = client.session.session_key
+
+    document = factories.DocumentFactory(users=[(user, "editor")])
+
+    settings.COLLABORATION_API_URL = "http://example.com/"
+    settings.COLLABORATION_SERVER_SECRET = "secret-token"
+    settings.COLLABORATION_WS_NOT_CONNECTED_READY_ONLY = True
+    settings.COLLABORATION_CONNECTIONS_CACHE_TIMEOUT = 3
+    endpoint_url = (
+        f"{settings.COLLABORATION_API_URL}get-connections/"
+        f"?room={document.id}&sessionKey={session_key}"
+    )
+    ws_resp = responses.get(endpoint_url, json={"count": 3, "exists": True})
+
+    for _ in range(2):
+        response = client.get(f"/api/v1.0/documents/{document.id!s}/can-edit/")
+        assert response.status_code == 200
+        assert response.json() == {"can_edit": True}
+
+    assert ws_resp.call_count == 1
+
+
+@responses.activate
+@override_settings(SERVER_TO_SERVER_API_TOKENS=["DummyToken"])
+def test_api_documents_can_edit_connections_pushed(settings):
+    """
+    Connections pushed by the collaboration server should be used instead of calling it.
+    """
+    user = factories.UserFactory(with_owned_document=True)
+    client = APIClient()
+    client.force_login(user)
+    session_key = client.session.session_key
+
+    document = factories.DocumentFactory(users=[(user, "editor")])
+
+    settings.COLLABORATION_API_URL = "http://example.com/"
+    settings.COLLABORATION_SERVER_SECRET = "secret-token"
+    settings.COLLABORATION_WS_NOT_CONNECTED_READY_ONLY = True
+    endpoint_url = (
+        f"{settings.COLLABORATION_API_URL}get-connections/"
+        f"?room={document.id}&sessionKey={session_key}"
+    )
+    ws_resp = responses.get(endpoint_url, json={"count": 0, "exists": False})
+
+    response = APIClient().post(
+        f"/api/v1.0/documents/{document.id!s}/connections/",
+        {"count": 2, "session_keys": [session_key, "other"]},
+        format="json",
+        HTTP_AUTHORIZATION="Bearer DummyToken",
+    )
+    assert response.status_code == 204
+
+    response = client.get(f"/api/v1.0/documents/{document.id!s}/can-edit/")
+    assert response.status_code == 200
+    assert response.json() == {"can_edit": True}
+    assert ws_resp.call_count == 0
+
+
+@override_settings(SERVER_TO_SERVER_API_TOKENS=["DummyToken"])
+def test_api_documents_connections_push_invalid():
+    """Pushing connections should require a server token and a valid payload."""
+    document = factories.DocumentFactory()
+    url = f"/api/v1.0/documents/{document.id!s}/connections/"
+
+    response = APIClient().post(url, {"count": 1}, format="json")
+    assert response.status_code == 401
+
+    response = APIClient().post(
+        url, {"count": -1}, format="json", HTTP_AUTHORIZATION="Bearer DummyToken"
+    )
+    assert response.status_code == 400
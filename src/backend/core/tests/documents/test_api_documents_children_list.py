@@ -22,7 +22,7 @@ def test_api_documents_children_list_anonymous_public_standalone(
     child1, child2 = factories.DocumentFactory.create_batch(2, parent=document)
     factories.UserDocumentAccessFactory(document=child1)
 
-    with django_assert_num_queries(8):
+    with django_assert_num_queries(5):
         APIClient().get(f"/api/v1.0/documents/{document.id!s}/children/")
     with django_assert_num_queries(4):
         response = APIClient().get(f"/api/v1.0/documents/{document.id!s}/children/")
@@ -98,7 +98,7 @@ def test_api_documents_children_list_anonymous_public_parent(django_assert_num_q
     child1, child2 = factories.DocumentFactory.create_batch(2, parent=document)
     factories.UserDocumentAccessFactory(document=child1)
 
-    with django_assert_num_queries(9):
+    with django_assert_num_queries(6):
         APIClient().get(f"/api/v1.0/documents/{document.id!s}/children/")
     with django_assert_num_queries(5):
         response = APIClient().get(f"/api/v1.0/documents/{document.id!s}/children/")
@@ -191,7 +191,7 @@ def test_api_documents_children_list_authenticated_unrelated_public_or_authentic
     child1, child2 = factories.DocumentFactory.create_batch(2, parent=document)
     factories.UserDocumentAccessFactory(document=child1)
 
-    with django_assert_num_queries(9):
+    with django_assert_num_queries(6):
         client.get(f"/api/v1.0/documents/{document.id!s}/children/")
     with django_assert_num_queries(5):
         response = client.get(
@@ -273,7 +273,7 @@ def test_api_documents_children_list_authenticated_public_or_authenticated_paren
     child1, child2 = factories.DocumentFactory.create_batch(2, parent=document)
     factories.UserDocumentAccessFactory(document=child1)
 
-    with django_assert_num_queries(10):
+    with django_assert_num_queries(7):
         client.get(f"/api/v1.0/documents/{document.id!s}/children/")
 
     with django_assert_num_queries(6):
@@ -381,7 +381,7 @@ def test_api_documents_children_list_authenticated_related_direct(
     child1, child2 = factories.DocumentFactory.create_batch(2, parent=document)
     factories.UserDocumentAccessFactory(document=child1)
 
-    with django_assert_num_queries(9):
+    with django_assert_num_queries(6):
         response = client.get(
             f"/api/v1.0/documents/{document.id!s}/children/",
         )
@@ -466,7 +466,7 @@ def test_api_documents_children_list_authenticated_related_parent(
         document=grand_parent, user=user
     )
 
-    with django_assert_num_queries(10):
+    with django_assert_num_queries(7):
         response = client.get(
             f"/api/v1.0/documents/{document.id!s}/children/",
         )
@@ -603,7 +603,7 @@ def test_api_documents_children_list_authenticated_related_team_members(
 
     access = factories.TeamDocumentAccessFactory(document=document, team="myteam")
 
-    with django_assert_num_queries(9):
+    with django_assert_num_queries(6):
         response = client.get(f"/api/v1.0/documents/{document.id!s}/children/")
 
     # pylint: disable=R0801
@@ -661,3 +661,32 @@ def test_api_documents_children_list_authenticated_related_team_members(
             },
         ],
     }
+
+
+def test_api_documents_children_list_pagination_cursor():
+    """Children can be paginated with a cursor following their order in the tree."""
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory(users=[user])
+    children = factories.DocumentFactory.create_batch(3, parent=document)
+
+    response = client.get(
+        f"/api/v1.0/documents/{document.id!s}/children/?pagination=cursor&page_size=2"
+    )
+
+    assert response.status_code == 200
+    content = response.json()
+    assert "count" not in content
+    assert [item["id"] for item in content["results"]] == [
+        str(child.id) for child in children[:2]
+    ]
+
+    response = client.get(content["next"])
+
+    assert response.status_code == 200
+    content = response.json()
+    assert [item["id"] for item in content["results"]] == [str(children[2].id)]
+    assert content["next"] is None
@@ -0,0 +1,112 @@
+"""
+Tests for Documents API endpoint in impress's core app: content.bin
+"""
+
+import base64
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import factories, models
+
+pytestmark = pytest.mark.django_db
+
+
+def test_api_documents_content_bin_anonymous_public():
+    """Anonymous users should get the raw Yjs content of public documents."""
+    document = factories.DocumentFactory(link_reach="public")
+
+    response = APIClient().get(f"/api/v1.0/documents/{document.id!s}/content.bin/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/vnd.yjs.doc"
+    assert response["ETag"] == f'"{document.content_hash:s}"'
+    assert b"".join(response.streaming_content) == base64.b64decode(document.content)
+
+
+def test_api_documents_content_bin_anonymous_restricted():
+    """Anonymous users should not get the content of restricted documents."""
+    document = factories.DocumentFactory(link_reach="restricted")
+
+    response = APIClient().get(f"/api/v1.0/documents/{document.id!s}/content.bin/")
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_api_documents_content_bin_authenticated_no_access():
+    """Authenticated users should not get the content of documents they can't read."""
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(link_reach="restricted")
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.get(f"/api/v1.0/documents/{document.id!s}/content.bin/")
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_api_documents_content_bin_not_modified():
+    """A request with the ETag of the content should get a 304 response."""
+    document = factories.DocumentFactory(link_reach="public")
+    url = f"/api/v1.0/documents/{document.id!s}/content.bin/"
+
+    response = APIClient().get(url, HTTP_IF_NONE_MATCH=f'"{document.content_hash:s}"')
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response["ETag"] == f'"{document.content_hash:s}"'
+
+    response = APIClient().get(url, HTTP_IF_NONE_MATCH='"other"')
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_api_documents_content_bin_legacy_etag():
+    """Documents without a stored content hash should use the ETag of their file."""
+    document = factories.DocumentFactory(link_reach="public")
+    models.Document.objects.filter(pk=document.pk).update(content_hash=None)
+    url = f"/api/v1.0/documents/{document.id!s}/content.bin/"
+
+    response = APIClient().get(url)
+    assert response.status_code == status.HTTP_200_OK
+    etag = response["ETag"]
+
+    response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_api_documents_content_bin_range():
+    """Single byte ranges of the content should be served with a 206 response."""
+    document = factories.DocumentFactory(link_reach="public")
+    content = base64.b64decode(document.content)
+    url = f"/api/v1.0/documents/{document.id!s}/content.bin/"
+
+    response = APIClient().get(url, HTTP_RANGE="bytes=1-4")
+
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == content[1:5]
+    assert response["Content-Range"] == f"bytes 1-4/{len(content):d}"
+
+    response = APIClient().get(url, HTTP_RANGE="bytes=2-")
+
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == content[2:]
+
+    response = APIClient().get(url, HTTP_RANGE=f"bytes={len(content):d}-")
+
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response["Content-Range"] == f"bytes */{len(content):d}"
+
+
+def test_api_documents_content_bin_range_if_range_mismatch():
+    """A range should be ignored if the content changed since the "If-Range" ETag."""
+    document = factories.DocumentFactory(link_reach="public")
+
+    response = APIClient().get(
+        f"/api/v1.0/documents/{document.id!s}/content.bin/",
+        HTTP_RANGE="bytes=1-4",
+        HTTP_IF_RANGE='"other"',
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert b"".join(response.streaming_content) == base64.b64decode(document.content)
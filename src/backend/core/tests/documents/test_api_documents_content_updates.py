@@ -0,0 +1,131 @@
+"""
+Tests for Documents API endpoint in impress's core app: content-updates
+"""
+
+import base64
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test.utils import override_settings
+
+import pycrdt
+import pytest
+from rest_framework.test import APIClient
+
+from core import factories, models
+from core.utils import base64_yjs_to_text
+
+pytestmark = pytest.mark.django_db
+
+
+def get_ydoc_and_updates(*paragraphs):
+    """
+    Return a base64 ydoc with the first paragraph and the incremental updates adding
+    each of the next paragraphs.
+    """
+    ydoc = pycrdt.Doc()
+    ydoc["document-store"] = fragment = pycrdt.XmlFragment(
+        [pycrdt.XmlElement("p", {}, [pycrdt.XmlText(paragraphs[0])])]
+    )
+    content = base64.b64encode(ydoc.get_update()).decode("utf-8")
+
+    updates = []
+    for paragraph in paragraphs[1:]:
+        state = ydoc.get_state()
+        fragment.children.append(
+            pycrdt.XmlElement("p", {}, [pycrdt.XmlText(paragraph)])
+        )
+        updates.append(base64.b64encode(ydoc.get_update(state)).decode("utf-8"))
+
+    return content, updates
+
+
+def test_api_documents_content_updates_anonymous_reader():
+    """Anonymous users should not be allowed to update a public document they can read."""
+    content, updates = get_ydoc_and_updates("hello", "world")
+    document = factories.DocumentFactory(
+        link_reach="public", link_role="reader", content=content
+    )
+
+    response = APIClient().post(
+        f"/api/v1.0/documents/{document.id!s}/content-updates/",
+        {"content": updates[0], "websocket": True},
+        format="json",
+    )
+
+    assert response.status_code == 401
+    assert not models.DocumentContentUpdate.objects.exists()
+
+
+def test_api_documents_content_updates_editor():
+    """
+    Editors should be able to append incremental updates to a document without writing
+    its content to object storage. The updates should be merged when reading it.
+    """
+    user = factories.UserFactory()
+    content, updates = get_ydoc_and_updates("hello", "beautiful", "world")
+    document = factories.DocumentFactory(users=[(user, "editor")], content=content)
+
+    client = APIClient()
+    client.force_login(user)
+
+    with mock.patch.object(
+        default_storage.connection.meta.client, "put_object"
+    ) as mock_put_object:
+        for update in updates:
+            response = client.post(
+                f"/api/v1.0/documents/{document.id!s}/content-updates/",
+                {"content": update, "websocket": True},
+                format="json",
+            )
+            assert response.status_code == 201
+
+    mock_put_object.assert_not_called()
+
+    document = models.Document.objects.get(pk=document.pk)
+    assert document.content_updates_count == 2
+    assert base64_yjs_to_text(document.content) == "hello beautiful world"
+
+    response = client.get(f"/api/v1.0/documents/{document.id!s}/")
+    assert base64_yjs_to_text(response.json()["content"]) == "hello beautiful world"
+
+
+def test_api_documents_content_updates_invalid():
+    """Updates that are not valid Yjs updates should be rejected."""
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(users=[(user, "editor")])
+
+    client = APIClient()
+    client.force_login(user)
+
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/content-updates/",
+        {"content": base64.b64encode(b"garbage").decode(), "websocket": True},
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"content": ["Invalid Yjs update."]}
+
+
+@override_settings(DOCUMENT_CONTENT_UPDATES_COMPACTION_THRESHOLD=2)
+def test_api_documents_content_updates_compaction():
+    """Updates should be merged into the content once numerous enough."""
+    user = factories.UserFactory()
+    content, updates = get_ydoc_and_updates("hello", "beautiful", "world")
+    document = factories.DocumentFactory(users=[(user, "editor")], content=content)
+
+    client = APIClient()
+    client.force_login(user)
+
+    for update in updates:
+        client.post(
+            f"/api/v1.0/documents/{document.id!s}/content-updates/",
+            {"content": update, "websocket": True},
+            format="json",
+        )
+
+    assert not models.DocumentContentUpdate.objects.exists()
+    document = models.Document.objects.get(pk=document.pk)
+    assert document.content_updates_count == 0
+    assert base64_yjs_to_text(document.content) == "hello beautiful world"
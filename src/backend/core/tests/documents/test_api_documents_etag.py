@@ -0,0 +1,167 @@
+"""
+Tests for conditional requests on the Documents API endpoints in impress's core app.
+"""
+
+from unittest import mock
+
+import pytest
+from rest_framework.test import APIClient
+
+from core import factories, models
+
+pytestmark = pytest.mark.django_db
+
+
+def test_api_documents_etag_retrieve_not_modified():
+    """
+    A document retrieved with the ETag of its last response should get a 304 response
+    without serializing the document nor reading its content.
+    """
+    document = factories.DocumentFactory(link_reach="public")
+    url = f"/api/v1.0/documents/{document.id!s}/"
+
+    response = APIClient().get(url)
+
+    assert response.status_code == 200
+    etag = response["ETag"]
+    assert "private" in response["Cache-Control"]
+
+    with mock.patch.object(
+        models.Document, "get_content_response"
+    ) as mock_get_content_response:
+        response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    mock_get_content_response.assert_not_called()
+
+
+def test_api_documents_etag_retrieve_modified():
+    """The ETag of a document should change when its content or title changes."""
+    document = factories.DocumentFactory(link_reach="public")
+    url = f"/api/v1.0/documents/{document.id!s}/"
+    etag = APIClient().get(url)["ETag"]
+
+    document.content = "new content"
+    document.save()
+
+    response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    etag = response["ETag"]
+
+    models.Document.objects.filter(pk=document.pk).update(title="new title")
+
+    response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["title"] == "new title"
+
+
+def test_api_documents_etag_retrieve_user():
+    """The ETag should depend on the user and change with their accesses."""
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(link_reach="public")
+    url = f"/api/v1.0/documents/{document.id!s}/"
+    anonymous_etag = APIClient().get(url)["ETag"]
+
+    client = APIClient()
+    client.force_login(user)
+    response = client.get(url, HTTP_IF_NONE_MATCH=anonymous_etag)
+    assert response.status_code == 200
+    etag = response["ETag"]
+
+    factories.UserDocumentAccessFactory(document=document, user=user, role="owner")
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["user_role"] == "owner"
+
+
+def test_api_documents_etag_retrieve_ancestor_link_changed():
+    """The ETag of a document should change when the link of an ancestor changes."""
+    parent = factories.DocumentFactory(link_reach="public")
+    document = factories.DocumentFactory(parent=parent, link_reach="restricted")
+    url = f"/api/v1.0/documents/{document.id!s}/"
+    etag = APIClient().get(url)["ETag"]
+
+    parent.link_role = "editor"
+    parent.save()
+
+    response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["computed_link_role"] == "editor"
+
+
+def test_api_documents_etag_children():
+    """The children of a document should be revalidated against their ETag."""
+    document = factories.DocumentFactory(link_reach="public")
+    factories.DocumentFactory(parent=document)
+    url = f"/api/v1.0/documents/{document.id!s}/children/"
+
+    etag = APIClient().get(url)["ETag"]
+
+    response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    factories.DocumentFactory(parent=document)
+
+    response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+
+
+def test_api_documents_etag_children_other_page():
+    """
+    The ETag of a page of children should be computed from the page served and
+    change with the count of children, even if the page itself is unchanged.
+    """
+    document = factories.DocumentFactory(link_reach="public")
+    factories.DocumentFactory(parent=document, title="a")
+    url = f"/api/v1.0/documents/{document.id!s}/children/?page_size=1&ordering=title"
+
+    etag = APIClient().get(url)["ETag"]
+
+    factories.DocumentFactory(parent=document, title="b")
+
+    response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+    assert response.json()["next"] is not None
+
+
+def test_api_documents_etag_tree():
+    """The tree of a document should be revalidated against its ETag."""
+    parent = factories.DocumentFactory(link_reach="public")
+    document = factories.DocumentFactory(parent=parent)
+    url = f"/api/v1.0/documents/{document.id!s}/tree/"
+
+    etag = APIClient().get(url)["ETag"]
+
+    response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    sibling = factories.DocumentFactory(parent=parent)
+
+    response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert sibling.path in [child["path"] for child in response.json()["children"]]
+
+
+@mock.patch("core.services.converter_services.YdocConverter.convert")
+def test_api_documents_etag_content(mock_convert):
+    """The converted content should only be computed if the document changed."""
+    document = factories.DocumentFactory(link_reach="public")
+    mock_convert.return_value = "# Title"
+    url = f"/api/v1.0/documents/{document.id!s}/content/"
+
+    etag = APIClient().get(url, {"content_format": "markdown"})["ETag"]
+    response = APIClient().get(
+        url, {"content_format": "markdown"}, HTTP_IF_NONE_MATCH=etag
+    )
+
+    assert response.status_code == 304
+    assert mock_convert.call_count == 1
+
+    # Each format has its own ETag
+    response = APIClient().get(url, {"content_format": "html"}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
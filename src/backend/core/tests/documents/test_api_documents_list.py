@@ -153,11 +153,11 @@ def test_api_documents_list_authenticated_direct(django_assert_num_queries):
         str(child4_with_access.id),
     }
 
-    with django_assert_num_queries(14):
+    with django_assert_num_queries(5):
         response = client.get("/api/v1.0/documents/")
 
     # nb_accesses should now be cached
-    with django_assert_num_queries(6):
+    with django_assert_num_queries(4):
         response = client.get("/api/v1.0/documents/")
 
     assert response.status_code == 200
@@ -191,11 +191,11 @@ def test_api_documents_list_authenticated_via_team(
 
     expected_ids = {str(document.id) for document in documents_team1 + documents_team2}
 
-    with django_assert_num_queries(14):
+    with django_assert_num_queries(4):
         response = client.get("/api/v1.0/documents/")
 
     # nb_accesses should now be cached
-    with django_assert_num_queries(4):
+    with django_assert_num_queries(3):
         response = client.get("/api/v1.0/documents/")
 
     assert response.status_code == 200
@@ -224,11 +224,11 @@ def test_api_documents_list_authenticated_link_reach_restricted(
     other_document = factories.DocumentFactory(link_reach="public")
     models.LinkTrace.objects.create(document=other_document, user=user)
 
-    with django_assert_num_queries(6):
+    with django_assert_num_queries(4):
         response = client.get("/api/v1.0/documents/")
 
     # nb_accesses should now be cached
-    with django_assert_num_queries(4):
+    with django_assert_num_queries(3):
         response = client.get("/api/v1.0/documents/")
 
     assert response.status_code == 200
@@ -273,11 +273,11 @@ def test_api_documents_list_authenticated_link_reach_public_or_authenticated(
 
     expected_ids = {str(document1.id), str(document2.id), str(visible_child.id)}
 
-    with django_assert_num_queries(11):
+    with django_assert_num_queries(5):
         response = client.get("/api/v1.0/documents/")
 
     # nb_accesses should now be cached
-    with django_assert_num_queries(5):
+    with django_assert_num_queries(4):
         response = client.get("/api/v1.0/documents/")
 
     assert response.status_code == 200
@@ -363,6 +363,99 @@ def test_api_documents_list_pagination_force_page_size():
         document_ids.remove(item["id"])
 
 
+def test_api_documents_list_pagination_cursor(django_assert_num_queries):
+    """
+    Cursor pagination can be requested via querystring. It should not count documents
+    and should allow to walk through all pages following the "next" links.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document_ids = {
+        str(access.document_id)
+        for access in factories.UserDocumentAccessFactory.create_batch(5, user=user)
+    }
+    # Documents with the same update date should not be skipped nor repeated
+    models.Document.objects.update(updated_at=timezone.now())
+
+    response = client.get("/api/v1.0/documents/?pagination=cursor&page_size=2")
+
+    assert response.status_code == 200
+    content = response.json()
+    assert "count" not in content
+    assert content["previous"] is None
+
+    results_ids = [item["id"] for item in content["results"]]
+    while content["next"]:
+        response = client.get(content["next"])
+        assert response.status_code == 200
+        content = response.json()
+        assert len(content["results"]) <= 2
+        results_ids.extend(item["id"] for item in content["results"])
+
+    assert len(results_ids) == 5
+    assert set(results_ids) == document_ids
+
+
+def test_api_documents_list_pagination_cursor_ordering():
+    """Cursor pagination should follow the ordering requested."""
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    factories.DocumentFactory(title="b", users=[user])
+    factories.DocumentFactory(title="a", users=[user])
+    factories.DocumentFactory(title="c", users=[user])
+
+    response = client.get(
+        "/api/v1.0/documents/?pagination=cursor&page_size=2&ordering=title"
+    )
+
+    assert response.status_code == 200
+    content = response.json()
+    assert [item["title"] for item in content["results"]] == ["a", "b"]
+
+    response = client.get(content["next"])
+
+    assert response.status_code == 200
+    assert [item["title"] for item in response.json()["results"]] == ["c"]
+
+
+def test_api_documents_list_pagination_cursor_ordering_null_titles():
+    """
+    Cursor pagination ordered by title should not skip nor repeat documents without
+    a title across pages.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document_ids = [
+        str(factories.DocumentFactory(title=title, users=[user]).id)
+        for title in [None, None, None, "a", "b"]
+    ]
+
+    response = client.get(
+        "/api/v1.0/documents/?pagination=cursor&page_size=2&ordering=title"
+    )
+    assert response.status_code == 200
+    content = response.json()
+
+    results = list(content["results"])
+    while content["next"]:
+        response = client.get(content["next"])
+        assert response.status_code == 200
+        content = response.json()
+        results.extend(content["results"])
+
+    assert sorted(item["id"] for item in results) == sorted(document_ids)
+    assert [item["title"] for item in results][3:] == ["a", "b"]
+
+
 def test_api_documents_list_authenticated_distinct():
     """A document with several related users should only be listed once."""
     user = factories.UserFactory()
@@ -397,11 +490,11 @@ def test_api_documents_list_favorites_no_extra_queries(django_assert_num_queries
     factories.DocumentFactory.create_batch(2, users=[user])
 
     url = "/api/v1.0/documents/"
-    with django_assert_num_queries(14):
+    with django_assert_num_queries(4):
         response = client.get(url)
 
     # nb_accesses should now be cached
-    with django_assert_num_queries(4):
+    with django_assert_num_queries(3):
         response = client.get(url)
 
     assert response.status_code == 200
@@ -414,7 +507,7 @@ def test_api_documents_list_favorites_no_extra_queries(django_assert_num_queries
     for document in special_documents:
         models.DocumentFavorite.objects.create(document=document, user=user)
 
-    with django_assert_num_queries(4):
+    with django_assert_num_queries(3):
         response = client.get(url)
 
     assert response.status_code == 200
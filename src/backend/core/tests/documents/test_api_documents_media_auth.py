@@ -3,20 +3,25 @@ Test media-auth authorization API endpoint in docs core app.
 """
 
 from io import BytesIO
+from unittest import mock
 from urllib.parse import urlparse
 from uuid import uuid4
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.storage import default_storage
+from django.test import override_settings
 from django.utils import timezone
 
 import pytest
 import requests
 from freezegun import freeze_time
+from lasuite.malware_detection.enums import ReportStatus
 from rest_framework.test import APIClient
 
 from core import factories, models
 from core.enums import DocumentAttachmentStatus
+from core.malware_detection import malware_detection_callback
 from core.tests.conftest import TEAM, USER, VIA
 
 pytestmark = pytest.mark.django_db
@@ -412,3 +417,185 @@ def test_api_documents_media_auth_missing_status_metadata():
         timeout=1,
     )
     assert response.content.decode("utf-8") == "my prose"
+
+
+def test_api_documents_media_auth_ready_status_cached():
+    """
+    The "ready" status of an attachment is final so it should be fetched only once
+    from object storage.
+    """
+    document_id = uuid4()
+    key = f"{document_id!s}/attachments/{uuid4()!s}.jpg"
+    default_storage.connection.meta.client.put_object(
+        Bucket=default_storage.bucket_name,
+        Key=key,
+        Body=BytesIO(b"my prose"),
+        ContentType="text/plain",
+        Metadata={"status": DocumentAttachmentStatus.READY},
+    )
+    factories.DocumentFactory(id=document_id, link_reach="public", attachments=[key])
+
+    original_url = f"http://localhost/media/{key:s}"
+    response = APIClient().get(
+        "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+    )
+    assert response.status_code == 200
+
+    with mock.patch.object(
+        default_storage.connection.meta.client, "head_object"
+    ) as mock_head_object:
+        response = APIClient().get(
+            "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+        )
+
+    assert response.status_code == 200
+    mock_head_object.assert_not_called()
+
+
+def test_api_documents_media_auth_processing_status_not_cached():
+    """An attachment should be served as soon as its status switches to "ready"."""
+    document_id = uuid4()
+    key = f"{document_id!s}/attachments/{uuid4()!s}.jpg"
+    default_storage.connection.meta.client.put_object(
+        Bucket=default_storage.bucket_name,
+        Key=key,
+        Body=BytesIO(b"my prose"),
+        ContentType="text/plain",
+        Metadata={"status": DocumentAttachmentStatus.PROCESSING},
+    )
+    factories.DocumentFactory(id=document_id, link_reach="public", attachments=[key])
+
+    original_url = f"http://localhost/media/{key:s}"
+    response = APIClient().get(
+        "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+    )
+    assert response.status_code == 403
+
+    malware_detection_callback(key, ReportStatus.SAFE, None)
+
+    response = APIClient().get(
+        "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+    )
+    assert response.status_code == 200
+
+
+def test_api_documents_media_auth_missing_status_metadata_recorded():
+    """
+    Attachments without status metadata should be looked up only once in object
+    storage and recorded as ready.
+    """
+    document_id = uuid4()
+    key = f"{document_id!s}/attachments/{uuid4()!s}.jpg"
+    default_storage.connection.meta.client.put_object(
+        Bucket=default_storage.bucket_name,
+        Key=key,
+        Body=BytesIO(b"my prose"),
+        ContentType="text/plain",
+    )
+    factories.DocumentFactory(id=document_id, link_reach="public", attachments=[key])
+
+    original_url = f"http://localhost/media/{key:s}"
+    response = APIClient().get(
+        "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+    )
+    assert response.status_code == 200
+    assert (
+        models.DocumentAttachment.objects.get(key=key).status
+        == DocumentAttachmentStatus.READY
+    )
+
+    cache.clear()
+    with mock.patch.object(
+        default_storage.connection.meta.client, "head_object"
+    ) as mock_head_object:
+        response = APIClient().get(
+            "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+        )
+
+    assert response.status_code == 200
+    mock_head_object.assert_not_called()
+
+
+def test_api_documents_media_auth_processing_status_recorded():
+    """
+    The status found in object storage for attachments not yet recorded should not
+    be looked up again.
+    """
+    document_id = uuid4()
+    key = f"{document_id!s}/attachments/{uuid4()!s}.jpg"
+    default_storage.connection.meta.client.put_object(
+        Bucket=default_storage.bucket_name,
+        Key=key,
+        Body=BytesIO(b"my prose"),
+        ContentType="text/plain",
+        Metadata={"status": DocumentAttachmentStatus.PROCESSING},
+    )
+    factories.DocumentFactory(id=document_id, link_reach="public", attachments=[key])
+
+    original_url = f"http://localhost/media/{key:s}"
+    response = APIClient().get(
+        "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+    )
+    assert response.status_code == 403
+
+    with mock.patch.object(
+        default_storage.connection.meta.client, "head_object"
+    ) as mock_head_object:
+        response = APIClient().get(
+            "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+        )
+
+    assert response.status_code == 403
+    mock_head_object.assert_not_called()
+    assert (
+        models.DocumentAttachment.objects.get(key=key).status
+        == DocumentAttachmentStatus.PROCESSING
+    )
+
+
+@override_settings(MEDIA_AUTH_CACHE_TIMEOUT=30)
+def test_api_documents_media_auth_authorization_cached(django_assert_num_queries):
+    """
+    The authorization of a user on an attachment should be cached so that loading
+    the same media again does not hit the database, while the S3 signature is
+    computed for each request.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    document_id = uuid4()
+    key = f"{document_id!s}/attachments/{uuid4()!s}.jpg"
+    default_storage.connection.meta.client.put_object(
+        Bucket=default_storage.bucket_name,
+        Key=key,
+        Body=BytesIO(b"my prose"),
+        ContentType="text/plain",
+        Metadata={"status": DocumentAttachmentStatus.READY},
+    )
+    factories.DocumentFactory(
+        id=document_id, link_reach="restricted", attachments=[key], users=[user]
+    )
+
+    original_url = f"http://localhost/media/{key:s}"
+    response = client.get(
+        "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+    )
+    assert response.status_code == 200
+
+    now = timezone.now()
+    with freeze_time(now), django_assert_num_queries(1):
+        response = client.get(
+            "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+        )
+
+    assert response.status_code == 200
+    assert response["X-Amz-Date"] == now.strftime("%Y%m%dT%H%M%SZ")
+
+    # The authorization is cached per user
+    other_client = APIClient()
+    other_client.force_login(factories.UserFactory())
+    response = other_client.get(
+        "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+    )
+    assert response.status_code == 403
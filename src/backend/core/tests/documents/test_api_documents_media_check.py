@@ -1,6 +1,7 @@
 """Test the "media_check" endpoint."""
 
 from io import BytesIO
+from unittest import mock
 from uuid import uuid4
 
 from django.core.files.storage import default_storage
@@ -8,7 +9,7 @@ from django.core.files.storage import default_storage
 import pytest
 from rest_framework.test import APIClient
 
-from core import factories
+from core import factories, models
 from core.enums import DocumentAttachmentStatus
 from core.tests.conftest import TEAM, USER, VIA
 
@@ -242,3 +243,65 @@ def test_api_documents_media_check_restricted_document(via, mock_user_teams):
         "status": DocumentAttachmentStatus.READY,
         "file": f"/media/{key:s}",
     }
+
+
+def test_api_documents_media_check_status_from_database():
+    """
+    The status of attachments recorded in database should be returned without
+    requesting object storage.
+    """
+    document = factories.DocumentFactory(link_reach="public")
+    key = f"{document.id!s}/attachments/{uuid4()!s}.jpg"
+    document.attachments = [key]
+    document.save(update_fields=["attachments"])
+    models.DocumentAttachment.objects.create(key=key)
+
+    client = APIClient()
+    url = f"/api/v1.0/documents/{document.id!s}/media-check/"
+
+    with mock.patch.object(
+        default_storage.connection.meta.client, "head_object"
+    ) as mock_head_object:
+        response = client.get(url, {"key": key})
+        assert response.json() == {"status": DocumentAttachmentStatus.PROCESSING}
+
+        models.DocumentAttachment.set_status(key, DocumentAttachmentStatus.READY)
+
+        response = client.get(url, {"key": key})
+        assert response.json() == {
+            "status": DocumentAttachmentStatus.READY,
+            "file": f"/media/{key:s}",
+        }
+
+    mock_head_object.assert_not_called()
+
+
+def test_api_documents_media_check_legacy_attachment_ready():
+    """
+    The status of attachments uploaded before statuses were recorded in database
+    should be read from object storage and recorded once ready.
+    """
+    document = factories.DocumentFactory(link_reach="public")
+    key = f"{document.id!s}/attachments/{uuid4()!s}.jpg"
+    default_storage.connection.meta.client.put_object(
+        Bucket=default_storage.bucket_name,
+        Key=key,
+        Body=BytesIO(b"my prose"),
+        ContentType="text/plain",
+        Metadata={"status": DocumentAttachmentStatus.READY},
+    )
+    document.attachments = [key]
+    document.save(update_fields=["attachments"])
+
+    response = APIClient().get(
+        f"/api/v1.0/documents/{document.id!s}/media-check/", {"key": key}
+    )
+
+    assert response.json() == {
+        "status": DocumentAttachmentStatus.READY,
+        "file": f"/media/{key:s}",
+    }
+    assert (
+        models.DocumentAttachment.objects.get(key=key).status
+        == DocumentAttachmentStatus.READY
+    )
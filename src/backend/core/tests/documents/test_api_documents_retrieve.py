@@ -1052,3 +1052,19 @@ def test_api_documents_retrieve_permanently_deleted_related(role, depth):
 
     assert response.status_code == 404
     assert response.json() == {"detail": "Not found."}
+
+
+def test_api_documents_retrieve_omit_content():
+    """The content should be left out of the response if the client asks for it."""
+    document = factories.DocumentFactory(link_reach="public")
+
+    with mock.patch.object(
+        models.Document, "get_content_response"
+    ) as mock_get_content_response:
+        response = APIClient().get(
+            f"/api/v1.0/documents/{document.id!s}/", {"omit_content": "true"}
+        )
+
+    assert response.status_code == 200
+    assert "content" not in response.json()
+    mock_get_content_response.assert_not_called()
@@ -23,7 +23,7 @@ def test_api_documents_tree_list_anonymous_public_standalone(django_assert_num_q
     )
     child = factories.DocumentFactory(link_reach="public", parent=document)
 
-    with django_assert_num_queries(14):
+    with django_assert_num_queries(5):
         APIClient().get(f"/api/v1.0/documents/{document.id!s}/tree/")
 
     with django_assert_num_queries(4):
@@ -388,7 +388,7 @@ def test_api_documents_tree_list_authenticated_unrelated_public_or_authenticated
     document, sibling = factories.DocumentFactory.create_batch(2, parent=parent)
     child = factories.DocumentFactory(link_reach="public", parent=document)
 
-    with django_assert_num_queries(13):
+    with django_assert_num_queries(6):
         client.get(f"/api/v1.0/documents/{document.id!s}/tree/")
 
     with django_assert_num_queries(5):
@@ -1241,10 +1241,10 @@ def test_api_documents_tree_list_deleted_document_owner(django_assert_num_querie
     document.refresh_from_db()
     child.refresh_from_db()
 
-    with django_assert_num_queries(9):
+    with django_assert_num_queries(5):
         client.get(f"/api/v1.0/documents/{document.id!s}/tree/")
 
-    with django_assert_num_queries(5):
+    with django_assert_num_queries(4):
         response = client.get(f"/api/v1.0/documents/{document.id!s}/tree/")
 
     assert response.status_code == 200
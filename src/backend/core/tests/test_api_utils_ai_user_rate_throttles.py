@@ -2,7 +2,7 @@
 Test throttling on users for the AI endpoint.
 """
 
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from uuid import uuid4
 
 from django.test import override_settings
@@ -12,7 +12,7 @@ from rest_framework.response import Response
 from rest_framework.test import APIRequestFactory
 from rest_framework.views import APIView
 
-from core.api.utils import AIUserRateThrottle
+from core.api.utils import AI_THROTTLE_SCRIPT, AIUserRateThrottle
 from core.factories import UserFactory
 
 pytestmark = pytest.mark.django_db
@@ -137,3 +137,69 @@ def test_api_utils_ai_user_rate_throttle_day_limit(mock_time):
     request.user = user
     response = DocumentAPIView.as_view()(request, pk=document_id)
     assert response.status_code == 200
+
+
+@override_settings(AI_USER_RATE_THROTTLE_RATES={"minute": 3, "hour": 6, "day": 10})
+@patch("time.time")
+@patch("core.api.utils.get_redis_client")
+def test_api_utils_ai_user_rate_throttle_redis(mock_get_redis_client, mock_time):
+    """
+    With a Redis cache, the limits should be checked and the request logged by a
+    single atomic script.
+    """
+    user = UserFactory()
+    api_rf = APIRequestFactory()
+    mock_time.return_value = 1000000
+    client = mock_get_redis_client.return_value
+    script = client.register_script.return_value = MagicMock()
+
+    # Counts of the requests of the last minute, hour and day, and whether allowed
+    script.return_value = [2, 2, 2, 1]
+    document_id = str(uuid4())
+    request = api_rf.get(f"/documents/{document_id:s}/")
+    request.user = user
+    response = DocumentAPIView.as_view()(request, pk=document_id)
+    assert response.status_code == 200
+
+    client.register_script.assert_called_once_with(AI_THROTTLE_SCRIPT)
+    kwargs = script.call_args.kwargs
+    assert kwargs["keys"] == [f":1:user_{user.id!s}_throttle_ai:requests"]
+    assert kwargs["args"][:4] == [1000000, 3, 6, 10]
+    assert kwargs["args"][4].startswith("1000000:")
+    assert kwargs["args"][5] == 1
+
+    script.return_value = [3, 3, 3, 0]
+    response = DocumentAPIView.as_view()(request, pk=document_id)
+    assert response.status_code == 429
+    assert response["Retry-After"] == "60"
+
+
+class CostlyDocumentAPIView(DocumentAPIView):
+    """A view making several requests to the AI API per request."""
+
+    def get_ai_cost(self, request):
+        """Each request makes 2 requests to the AI API."""
+        return 2
+
+
+@override_settings(AI_USER_RATE_THROTTLE_RATES={"minute": 3, "hour": 6, "day": 10})
+@patch("time.time")
+def test_api_utils_ai_user_rate_throttle_cost(mock_time):
+    """Requests should be counted as many times as the requests to the AI they make."""
+    user = UserFactory()
+    api_rf = APIRequestFactory()
+    mock_time.return_value = 1000000
+
+    document_id = str(uuid4())
+    request = api_rf.get(f"/documents/{document_id:s}/")
+    request.user = user
+    response = CostlyDocumentAPIView.as_view()(request, pk=document_id)
+    assert response.status_code == 200
+
+    # Only 1 request remains in the budget of the minute
+    response = CostlyDocumentAPIView.as_view()(request, pk=document_id)
+    assert response.status_code == 429
+    assert response["Retry-After"] == "60"
+
+    response = DocumentAPIView.as_view()(request, pk=document_id)
+    assert response.status_code == 200
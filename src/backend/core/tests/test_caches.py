@@ -0,0 +1,164 @@
+"""Unit tests for the cache utilities of the core application."""
+
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+
+from core.caches import (
+    LRUCache,
+    coalesce,
+    get_path_prefixes,
+    get_prefix_version,
+    get_prefix_versions,
+    invalidate_prefix,
+)
+
+
+def test_caches_lru_cache_evicts_least_recently_used():
+    """The least recently used entry should be evicted when the cache is full."""
+    lru_cache = LRUCache(max_entries=2)
+    lru_cache.set("a", 1)
+    lru_cache.set("b", 2)
+
+    assert lru_cache.get("a") == 1  # "b" is now the least recently used
+    lru_cache.set("c", 3)
+
+    assert lru_cache.get("b") is None
+    assert lru_cache.get("a") == 1
+    assert lru_cache.get("c") == 3
+    assert len(lru_cache) == 2
+
+
+def test_caches_lru_cache_disabled():
+    """A cache without entries should not store anything."""
+    lru_cache = LRUCache(max_entries=0)
+    lru_cache.set("a", 1)
+
+    assert lru_cache.get("a", "default") == "default"
+
+
+def test_caches_lru_cache_max_size():
+    """The least recently used entries should be evicted to respect the maximum size."""
+    lru_cache = LRUCache(max_size=10)
+    lru_cache.set("a", "aaaa")
+    lru_cache.set("b", "bbbb")
+    lru_cache.set("c", "cccc")
+
+    assert lru_cache.get("a") is None
+    assert lru_cache.size == 8
+
+    # Values larger than the maximum size are not cached
+    lru_cache.set("b", "b" * 11)
+    assert lru_cache.get("b") is None
+    assert lru_cache.get("c") == "cccc"
+    assert lru_cache.size == 4
+
+
+def test_caches_lru_cache_timeout():
+    """Values cached with a timeout should expire, releasing their size."""
+    lru_cache = LRUCache(max_size=10)
+    with mock.patch("time.monotonic", return_value=1000):
+        lru_cache.set("a", "aaaa", timeout=60)
+        lru_cache.set("b", "bbbb")
+
+    with mock.patch("time.monotonic", return_value=1059):
+        assert lru_cache.get("a") == "aaaa"
+
+    with mock.patch("time.monotonic", return_value=1060):
+        assert lru_cache.get("a") is None
+        assert lru_cache.get("b") == "bbbb"
+        assert lru_cache.size == 4
+
+
+def test_caches_get_path_prefixes():
+    """All prefixes of a path should be listed, starting with the empty prefix."""
+    assert get_path_prefixes("0000001000000A", 7) == ["", "0000001", "0000001000000A"]
+
+
+def test_caches_prefix_version_is_stable():
+    """The version of a path should not change until one of its prefixes is invalidated."""
+    version = get_prefix_version("test", "0000001000000A", 7)
+    assert get_prefix_version("test", "0000001000000A", 7) == version
+
+
+def test_caches_invalidate_prefix_subtree():
+    """Invalidating a prefix should change the version of all the paths below it only."""
+    child_version = get_prefix_version("test", "0000001000000A", 7)
+    sibling_version = get_prefix_version("test", "0000001000000B", 7)
+    other_version = get_prefix_version("test", "0000002", 7)
+
+    invalidate_prefix("test", "0000001000000A")
+
+    assert get_prefix_version("test", "0000001000000A", 7) != child_version
+    assert get_prefix_version("test", "0000001000000B", 7) == sibling_version
+    assert get_prefix_version("test", "0000002", 7) == other_version
+
+    # Other namespaces are not affected
+    assert get_prefix_version("other", "0000001000000A", 7) == get_prefix_version(
+        "other", "0000001000000A", 7
+    )
+
+
+def test_caches_invalidate_prefix_global():
+    """Invalidating the empty prefix should change the version of all paths."""
+    version = get_prefix_version("test", "0000002", 7)
+
+    invalidate_prefix("test", "")
+
+    assert get_prefix_version("test", "0000002", 7) != version
+
+
+def test_caches_prefix_version_evicted_generation():
+    """
+    A generation evicted from the cache should never bring back the version computed
+    before it was bumped.
+    """
+    version = get_prefix_version("test", "0000001", 7)
+    invalidate_prefix("test", "0000001")
+    bumped_version = get_prefix_version("test", "0000001", 7)
+    cache.delete("test_generation_0000001")
+
+    assert get_prefix_version("test", "0000001", 7) not in {version, bumped_version}
+
+
+def test_caches_get_prefix_versions_batch():
+    """Versions of several paths should match the versions computed one by one."""
+    paths = ["0000001", "0000001000000A", "0000002"]
+
+    versions = get_prefix_versions("test", paths, 7)
+
+    assert versions == {path: get_prefix_version("test", path, 7) for path in paths}
+
+
+def test_caches_coalesce_concurrent_calls():
+    """Concurrent calls for the same key should share a single computation."""
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(coalesce("key", compute)))
+    leader.start()
+    started.wait(timeout=5)
+
+    follower = threading.Thread(target=lambda: results.append(coalesce("key", compute)))
+    follower.start()
+    time.sleep(0.1)  # let the follower wait for the leader
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert results == ["value", "value"]
+    assert len(calls) == 1
+
+    # Once done, the next call computes the value again
+    assert coalesce("key", compute) == "value"
+    assert len(calls) == 2
@@ -11,6 +11,7 @@ from lasuite.malware_detection.enums import ReportStatus
 from core.enums import DocumentAttachmentStatus
 from core.factories import DocumentFactory
 from core.malware_detection import malware_detection_callback
+from core.models import DocumentAttachment
 
 pytestmark = pytest.mark.django_db
 
@@ -54,6 +55,10 @@ def test_malware_detection_callback_safe_status(safe_file):
     head_resp = s3_client.head_object(Bucket=bucket_name, Key=safe_file)
     metadata = head_resp.get("Metadata", {})
     assert metadata["status"] == DocumentAttachmentStatus.READY
+    assert (
+        DocumentAttachment.objects.get(key=safe_file).status
+        == DocumentAttachmentStatus.READY
+    )
 
 
 def test_malware_detection_callback_unsafe_status(unsafe_file):
@@ -74,3 +79,7 @@ def test_malware_detection_callback_unsafe_status(unsafe_file):
 
     assert unsafe_file not in document.attachments
     assert not default_storage.exists(unsafe_file)
+    assert (
+        DocumentAttachment.objects.get(key=unsafe_file).status
+        == DocumentAttachmentStatus.INFECTED
+    )
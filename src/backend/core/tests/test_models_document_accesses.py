@@ -77,6 +77,64 @@ def test_models_document_accesses_user_and_team_empty():
         factories.UserDocumentAccessFactory(user=None)
 
 
+# document_path
+
+
+def test_models_document_accesses_document_path_on_create():
+    """The path of the document should be copied on its accesses when they are created."""
+    document = factories.DocumentFactory()
+    child = factories.DocumentFactory(parent=document)
+    access = factories.UserDocumentAccessFactory(document=child)
+
+    access.refresh_from_db()
+    assert access.document_path == child.path
+
+
+def test_models_document_accesses_document_path_on_bulk_create():
+    """Accesses created in bulk should also get the path of their document."""
+    document = factories.DocumentFactory()
+    users = factories.UserFactory.create_batch(2)
+    models.DocumentAccess.objects.bulk_create(
+        [models.DocumentAccess(document=document, user=user) for user in users]
+    )
+
+    assert list(
+        models.DocumentAccess.objects.values_list("document_path", flat=True)
+    ) == [document.path, document.path]
+
+
+def test_models_document_accesses_document_path_on_move():
+    """Moving a document should update the path on the accesses of the whole subtree."""
+    document = factories.DocumentFactory()
+    child = factories.DocumentFactory(parent=document)
+    target = factories.DocumentFactory()
+    document_access = factories.UserDocumentAccessFactory(document=document)
+    child_access = factories.UserDocumentAccessFactory(document=child)
+
+    document.move(target, pos="first-child")
+
+    document.refresh_from_db()
+    child.refresh_from_db()
+    document_access.refresh_from_db()
+    child_access.refresh_from_db()
+    assert document.path.startswith(target.path)
+    assert document_access.document_path == document.path
+    assert child_access.document_path == child.path
+
+
+def test_models_document_accesses_get_role_ancestors():
+    """Roles given on ancestors should be resolved through the indexed document path."""
+    user = factories.UserFactory()
+    grand_parent = factories.DocumentFactory(users=[(user, "editor")])
+    parent = factories.DocumentFactory(parent=grand_parent)
+    document = factories.DocumentFactory(parent=parent, users=[(user, "reader")])
+
+    assert document.get_role(user) == "editor"
+    assert (
+        models.Document.objects.annotate_user_roles(user).get(pk=document.pk).user_roles
+    ) == ["reader", "editor"]
+
+
 # get_abilities
 
 
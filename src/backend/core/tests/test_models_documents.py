@@ -17,6 +17,7 @@ from django.test.utils import override_settings
 from django.utils import timezone
 
 import pytest
+from botocore.exceptions import ClientError
 
 from core import factories, models
 
@@ -846,6 +847,191 @@ def test_models_documents_version_duplicate():
     assert len(response["Versions"]) == 2
 
 
+def test_models_documents_version_indexed():
+    """
+    Each version written to object storage should be indexed in database with its
+    author, so that listing versions does not request object storage.
+    """
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(creator=user)
+
+    version = document.versions.get()
+    assert version.author == user
+    assert version.content_hash == document.content_hash
+    assert version.size == document.content_size
+
+    editor = factories.UserFactory()
+    document.content = "new content"
+    document.content_author = editor
+    document.save()
+
+    assert document.versions.count() == 2
+    assert document.versions.first().author == editor
+
+    with mock.patch.object(
+        default_storage.connection.meta.client, "list_object_versions"
+    ) as mock_list_object_versions:
+        response = document.get_versions_slice()
+
+    mock_list_object_versions.assert_not_called()
+    assert [v["version_id"] for v in response["versions"]] == [version.version_id]
+
+
+def test_models_documents_content_hash():
+    """
+    The hash and size of the content should be stored so that saving an unchanged
+    content does not request object storage.
+    """
+    document = factories.DocumentFactory(content="my content")
+
+    document.refresh_from_db()
+    assert document.content_hash == models.Document.get_content_hash(b"my content")
+    assert document.content_size == 10
+
+    document.content = "my content"
+    client = default_storage.connection.meta.client
+    with (
+        mock.patch.object(client, "head_object") as mock_head_object,
+        mock.patch.object(client, "put_object") as mock_put_object,
+    ):
+        document.save()
+
+    mock_head_object.assert_not_called()
+    mock_put_object.assert_not_called()
+
+    document.content = "my new content"
+    document.save(update_fields=["title"])
+
+    document.refresh_from_db()
+    assert document.content_hash == models.Document.get_content_hash(b"my new content")
+    assert document.content_size == 14
+    assert document.content == "my new content"
+
+
+def test_models_documents_content_hash_write_failed():
+    """
+    The hash of the content should not be saved if the content could not be written
+    to object storage, so that saving the content again writes it.
+    """
+    document = factories.DocumentFactory(title="my title", content="my content")
+
+    document.title = "my new title"
+    document.content = "my new content"
+    with (
+        mock.patch.object(
+            default_storage.connection.meta.client,
+            "put_object",
+            side_effect=ClientError({"Error": {}}, "PutObject"),
+        ),
+        pytest.raises(ClientError),
+    ):
+        document.save()
+
+    assert document.content_hash == models.Document.get_content_hash(b"my content")
+    assert document.content_size == 10
+    saved_document = models.Document.objects.get(pk=document.pk)
+    assert saved_document.title == "my title"
+    assert saved_document.content_hash == document.content_hash
+
+    document.save()
+
+    document = models.Document.objects.get(pk=document.pk)
+    assert document.title == "my new title"
+    assert document.content == "my new content"
+
+
+def test_models_documents_content_written_before_saving():
+    """
+    The content should be written to object storage before the document is saved,
+    so that the document is not locked while its content is uploaded.
+    """
+    document = factories.DocumentFactory(content="my content")
+    client = default_storage.connection.meta.client
+    put_object = client.put_object
+    saved_hashes = []
+
+    def check_put_object(**kwargs):
+        saved_hashes.append(
+            models.Document.objects.values_list("content_hash", flat=True).get(
+                pk=document.pk
+            )
+        )
+        return put_object(**kwargs)
+
+    document.content = "my new content"
+    with mock.patch.object(client, "put_object", side_effect=check_put_object):
+        document.save()
+
+    assert saved_hashes == [models.Document.get_content_hash(b"my content")]
+    document.refresh_from_db()
+    assert document.content_hash == models.Document.get_content_hash(b"my new content")
+
+
+def test_models_documents_content_hash_legacy():
+    """
+    For documents saved before the hash of their content was stored, the content
+    should be compared with the file in object storage and its hash recorded.
+    """
+    document = factories.DocumentFactory(content="my content")
+    models.Document.objects.filter(pk=document.pk).update(
+        content_hash=None, content_size=None
+    )
+    document.refresh_from_db()
+    document.content = "my content"
+
+    with mock.patch.object(
+        default_storage.connection.meta.client, "put_object"
+    ) as mock_put_object:
+        document.save()
+
+    mock_put_object.assert_not_called()
+    document.refresh_from_db()
+    assert document.content_hash == models.Document.get_content_hash(b"my content")
+
+
+@override_settings(DOCUMENT_CONTENT_CACHE_TIMEOUT=60)
+def test_models_documents_content_cached():
+    """
+    The content of documents should be cached, in process and in the shared cache,
+    under a key that changes with the content.
+    """
+    document = factories.DocumentFactory(content="my content")
+    client = default_storage.connection.meta.client
+
+    with mock.patch.object(client, "get_object") as mock_get_object:
+        assert models.Document.objects.get(pk=document.pk).content == "my content"
+
+        # The shared cache is used by other processes
+        models.document_content_local_cache.clear()
+        assert models.Document.objects.get(pk=document.pk).content == "my content"
+
+    mock_get_object.assert_not_called()
+
+    document.content = "my new content"
+    document.save()
+    cache.clear()
+    models.document_content_local_cache.clear()
+
+    # The content is read from object storage and cached again
+    with mock.patch.object(client, "get_object", wraps=client.get_object) as mock_get:
+        assert models.Document.objects.get(pk=document.pk).content == "my new content"
+        assert models.Document.objects.get(pk=document.pk).content == "my new content"
+
+    assert mock_get.call_count == 1
+
+
+@override_settings(DOCUMENT_CONTENT_CACHE_TIMEOUT=60)
+def test_models_documents_content_cached_hash_mismatch():
+    """A content not matching the stored hash should not be cached."""
+    document = factories.DocumentFactory(content="my content")
+    models.Document.objects.filter(pk=document.pk).update(content_hash="other")
+    models.document_content_local_cache.clear()
+    cache.clear()
+
+    assert models.Document.objects.get(pk=document.pk).content == "my content"
+    assert len(models.document_content_local_cache) == 0
+
+
 def test_models_documents__email_invitation__success():
     """
     The email invitation is sent successfully.
@@ -988,7 +1174,8 @@ def test_models_documents_nb_accesses_cache_is_set_and_retrieved_ancestors(
     """Test that nb_accesses is cached when calling nb_accesses_ancestors."""
     parent = factories.DocumentFactory()
     document = factories.DocumentFactory(parent=parent)
-    key = f"document_{document.id!s}_nb_accesses"
+    # The cache key is versioned and changes when the cache is invalidated
+    key = document.get_nb_accesses_cache_key
     nb_accesses_parent = random.randint(1, 4)
     factories.UserDocumentAccessFactory.create_batch(
         nb_accesses_parent, document=parent
@@ -1000,7 +1187,7 @@ def test_models_documents_nb_accesses_cache_is_set_and_retrieved_ancestors(
     factories.UserDocumentAccessFactory()  # An unrelated access should not be counted
 
     # Initially, the nb_accesses should not be cached
-    assert cache.get(key) is None
+    assert cache.get(key()) is None
 
     # Compute the nb_accesses for the first time (this should set the cache)
     nb_accesses_ancestors = nb_accesses_parent + nb_accesses_direct
@@ -1010,16 +1197,16 @@ def test_models_documents_nb_accesses_cache_is_set_and_retrieved_ancestors(
     # Ensure that the nb_accesses is now cached
     with django_assert_num_queries(0):
         assert document.nb_accesses_ancestors == nb_accesses_ancestors
-    assert cache.get(key) == (nb_accesses_direct, nb_accesses_ancestors)
+    assert cache.get(key()) == (nb_accesses_direct, nb_accesses_ancestors)
 
     # The cache value should be invalidated when a document access is created
     models.DocumentAccess.objects.create(
         document=document, user=factories.UserFactory(), role="reader"
     )
-    assert cache.get(key) is None  # Cache should be invalidated
+    assert cache.get(key()) is None  # Cache should be invalidated
     with django_assert_num_queries(2):
         assert document.nb_accesses_ancestors == nb_accesses_ancestors + 1
-    assert cache.get(key) == (nb_accesses_direct + 1, nb_accesses_ancestors + 1)
+    assert cache.get(key()) == (nb_accesses_direct + 1, nb_accesses_ancestors + 1)
 
 
 def test_models_documents_nb_accesses_cache_is_set_and_retrieved_direct(
@@ -1028,7 +1215,8 @@ def test_models_documents_nb_accesses_cache_is_set_and_retrieved_direct(
     """Test that nb_accesses is cached when calling nb_accesses_direct."""
     parent = factories.DocumentFactory()
     document = factories.DocumentFactory(parent=parent)
-    key = f"document_{document.id!s}_nb_accesses"
+    # The cache key is versioned and changes when the cache is invalidated
+    key = document.get_nb_accesses_cache_key
     nb_accesses_parent = random.randint(1, 4)
     factories.UserDocumentAccessFactory.create_batch(
         nb_accesses_parent, document=parent
@@ -1040,7 +1228,7 @@ def test_models_documents_nb_accesses_cache_is_set_and_retrieved_direct(
     factories.UserDocumentAccessFactory()  # An unrelated access should not be counted
 
     # Initially, the nb_accesses should not be cached
-    assert cache.get(key) is None
+    assert cache.get(key()) is None
 
     # Compute the nb_accesses for the first time (this should set the cache)
     nb_accesses_ancestors = nb_accesses_parent + nb_accesses_direct
@@ -1050,16 +1238,16 @@ def test_models_documents_nb_accesses_cache_is_set_and_retrieved_direct(
     # Ensure that the nb_accesses is now cached
     with django_assert_num_queries(0):
         assert document.nb_accesses_direct == nb_accesses_direct
-    assert cache.get(key) == (nb_accesses_direct, nb_accesses_ancestors)
+    assert cache.get(key()) == (nb_accesses_direct, nb_accesses_ancestors)
 
     # The cache value should be invalidated when a document access is created
     models.DocumentAccess.objects.create(
         document=document, user=factories.UserFactory(), role="reader"
     )
-    assert cache.get(key) is None  # Cache should be invalidated
+    assert cache.get(key()) is None  # Cache should be invalidated
     with django_assert_num_queries(2):
         assert document.nb_accesses_direct == nb_accesses_direct + 1
-    assert cache.get(key) == (nb_accesses_direct + 1, nb_accesses_ancestors + 1)
+    assert cache.get(key()) == (nb_accesses_direct + 1, nb_accesses_ancestors + 1)
 
 
 @pytest.mark.parametrize("field", ["nb_accesses_ancestors", "nb_accesses_direct"])
@@ -1069,22 +1257,23 @@ def test_models_documents_nb_accesses_cache_is_invalidated_on_access_removal(
 ):
     """Test that the cache is invalidated when a document access is deleted."""
     document = factories.DocumentFactory()
-    key = f"document_{document.id!s}_nb_accesses"
+    # The cache key is versioned and changes when the cache is invalidated
+    key = document.get_nb_accesses_cache_key
     access = factories.UserDocumentAccessFactory(document=document)
 
     # Initially, the nb_accesses should be cached
     assert getattr(document, field) == 1
-    assert cache.get(key) == (1, 1)
+    assert cache.get(key()) == (1, 1)
 
     # Remove the access and check if cache is invalidated
     access.delete()
-    assert cache.get(key) is None  # Cache should be invalidated
+    assert cache.get(key()) is None  # Cache should be invalidated
 
     # Recompute the nb_accesses (this should trigger a cache set)
     with django_assert_num_queries(2):
         new_nb_accesses = getattr(document, field)
     assert new_nb_accesses == 0
-    assert cache.get(key) == (0, 0)  # Cache should now contain the new value
+    assert cache.get(key()) == (0, 0)  # Cache should now contain the new value
 
 
 @pytest.mark.parametrize("field", ["nb_accesses_ancestors", "nb_accesses_direct"])
@@ -1094,22 +1283,23 @@ def test_models_documents_nb_accesses_cache_is_invalidated_on_document_soft_dele
 ):
     """Test that the cache is invalidated when a document access is deleted."""
     document = factories.DocumentFactory()
-    key = f"document_{document.id!s}_nb_accesses"
+    # The cache key is versioned and changes when the cache is invalidated
+    key = document.get_nb_accesses_cache_key
     factories.UserDocumentAccessFactory(document=document)
 
     # Initially, the nb_accesses should be cached
     assert getattr(document, field) == 1
-    assert cache.get(key) == (1, 1)
+    assert cache.get(key()) == (1, 1)
 
     # Soft delete the document and check if cache is invalidated
     document.soft_delete()
-    assert cache.get(key) is None  # Cache should be invalidated
+    assert cache.get(key()) is None  # Cache should be invalidated
 
     # Recompute the nb_accesses (this should trigger a cache set)
     with django_assert_num_queries(2):
         new_nb_accesses = getattr(document, field)
     assert new_nb_accesses == (1 if field == "nb_accesses_direct" else 0)
-    assert cache.get(key) == (1, 0)  # Cache should now contain the new value
+    assert cache.get(key()) == (1, 0)  # Cache should now contain the new value
 
     document.restore()
 
@@ -1117,7 +1307,110 @@ def test_models_documents_nb_accesses_cache_is_invalidated_on_document_soft_dele
     with django_assert_num_queries(2):
         new_nb_accesses = getattr(document, field)
     assert new_nb_accesses == 1
-    assert cache.get(key) == (1, 1)  # Cache should now contain the new value
+    assert cache.get(key()) == (1, 1)  # Cache should now contain the new value
+
+
+def test_models_documents_nb_accesses_cache_invalidation_subtree(
+    django_assert_num_queries,
+):
+    """
+    Invalidating the cache of a document should invalidate its descendants without
+    querying them, and leave other documents untouched.
+    """
+    parent = factories.DocumentFactory()
+    child = factories.DocumentFactory(parent=parent)
+    grand_child = factories.DocumentFactory(parent=child)
+    sibling = factories.DocumentFactory(parent=parent)
+
+    keys = {
+        document: document.get_nb_accesses_cache_key()
+        for document in [parent, child, grand_child, sibling]
+    }
+
+    with django_assert_num_queries(0):
+        child.invalidate_nb_accesses_cache()
+
+    assert parent.get_nb_accesses_cache_key() == keys[parent]
+    assert sibling.get_nb_accesses_cache_key() == keys[sibling]
+    assert child.get_nb_accesses_cache_key() != keys[child]
+    assert grand_child.get_nb_accesses_cache_key() != keys[grand_child]
+
+
+def test_models_documents_prefetch_nb_accesses(django_assert_num_queries):
+    """
+    The number of accesses of a list of documents should be computed in one query and
+    the result should be cached for each document.
+    """
+    parent = factories.DocumentFactory()
+    document = factories.DocumentFactory(parent=parent)
+    other_document = factories.DocumentFactory()
+    factories.UserDocumentAccessFactory.create_batch(2, document=parent)
+    factories.UserDocumentAccessFactory(document=document)
+    factories.UserDocumentAccessFactory.create_batch(3, document=other_document)
+
+    documents = [parent, document, other_document]
+    with django_assert_num_queries(1):
+        models.Document.prefetch_nb_accesses(documents)
+
+    with django_assert_num_queries(0):
+        assert [(d.nb_accesses_direct, d.nb_accesses_ancestors) for d in documents] == [
+            (2, 2),
+            (1, 3),
+            (3, 3),
+        ]
+    assert cache.get(document.get_nb_accesses_cache_key()) == (1, 3)
+
+    # Cached values are reused without any query
+    documents = [models.Document.objects.get(pk=d.pk) for d in documents]
+    with django_assert_num_queries(0):
+        models.Document.prefetch_nb_accesses(documents)
+
+
+def test_models_documents_prefetch_ancestors_link_definitions(
+    django_assert_num_queries,
+):
+    """
+    The ancestors link definition of a list of documents should be computed in one query
+    and match the definition computed document by document.
+    """
+    grand_parent = factories.DocumentFactory(link_reach="public", link_role="reader")
+    parent = factories.DocumentFactory(
+        parent=grand_parent, link_reach="authenticated", link_role="editor"
+    )
+    document = factories.DocumentFactory(parent=parent, link_reach="restricted")
+    other_root = factories.DocumentFactory(link_reach="authenticated")
+    other_child = factories.DocumentFactory(parent=other_root)
+
+    documents = [
+        models.Document.objects.get(pk=d.pk)
+        for d in [grand_parent, parent, document, other_root, other_child]
+    ]
+    with django_assert_num_queries(1):
+        models.Document.prefetch_ancestors_link_definitions(documents)
+
+    with django_assert_num_queries(0):
+        bulk_definitions = [d.ancestors_link_definition for d in documents]
+
+    assert bulk_definitions == [
+        models.Document.objects.get(pk=d.pk).ancestors_link_definition
+        for d in documents
+    ]
+    assert bulk_definitions[2] == {"link_reach": "public", "link_role": "reader"}
+
+
+def test_models_documents_prefetch_ancestors_link_definitions_deleted_parent():
+    """Documents under a deleted parent should not inherit any link definition."""
+    parent = factories.DocumentFactory(link_reach="public")
+    document = factories.DocumentFactory(parent=parent)
+    parent.soft_delete()
+
+    document = models.Document.objects.get(pk=document.pk)
+    models.Document.prefetch_ancestors_link_definitions([document])
+
+    assert document.ancestors_link_definition == {
+        "link_reach": None,
+        "link_role": None,
+    }
 
 
 def test_models_documents_numchild_deleted_from_instance():
@@ -1388,6 +1681,17 @@ def test_models_documents_get_select_options(reach, role, select_options):
     assert models.LinkReachChoices.get_select_options(reach, role) == select_options
 
 
+def test_models_documents_get_select_options_not_shared():
+    """Changing the select options returned should not affect other callers."""
+    select_options = models.LinkReachChoices.get_select_options("public", "reader")
+    select_options["public"].append("other")
+    select_options["restricted"] = ["other"]
+
+    assert models.LinkReachChoices.get_select_options("public", "reader") == {
+        "public": ["reader", "editor"]
+    }
+
+
 def test_models_documents_compute_ancestors_links_paths_mapping_single(
     django_assert_num_queries,
 ):
@@ -1445,3 +1749,146 @@ def test_models_documents_compute_ancestors_links_paths_mapping_structure(
                 {"link_reach": sibling.link_reach, "link_role": sibling.link_role},
             ],
         }
+
+
+@override_settings(ANCESTORS_LINKS_CACHE_TIMEOUT=60)
+def test_models_documents_ancestors_links_cached(
+    django_assert_num_queries,
+):
+    """The links of a document and its ancestors should be cached."""
+    root = factories.DocumentFactory(link_reach="authenticated", link_role="reader")
+    document = factories.DocumentFactory(parent=root, link_reach="restricted")
+
+    with django_assert_num_queries(1):
+        mapping = document.compute_ancestors_links_paths_mapping()
+
+    with django_assert_num_queries(0):
+        assert document.compute_ancestors_links_paths_mapping() == mapping
+
+    # The shared cache is used by other processes
+    models.ancestors_links_local_cache.clear()
+    document = models.Document.objects.get(pk=document.pk)
+    with django_assert_num_queries(0):
+        assert document.compute_ancestors_links_paths_mapping() == mapping
+
+
+@override_settings(ANCESTORS_LINKS_CACHE_TIMEOUT=60)
+def test_models_documents_ancestors_links_cache_invalidation_link():
+    """Changing the link definition of an ancestor should invalidate the cache."""
+    root = factories.DocumentFactory(link_reach="authenticated", link_role="reader")
+    parent = factories.DocumentFactory(parent=root, link_reach="restricted")
+    document = factories.DocumentFactory(parent=parent, link_reach="restricted")
+    other_document = factories.DocumentFactory(link_reach="restricted")
+
+    assert document.compute_ancestors_links_paths_mapping()[parent.path][-1] == {
+        "link_reach": "restricted",
+        "link_role": parent.link_role,
+    }
+    other_key = other_document.get_ancestors_links_cache_key()
+
+    parent = models.Document.objects.get(pk=parent.pk)
+    parent.link_reach = "public"
+    parent.link_role = "editor"
+    parent.save()
+
+    assert document.compute_ancestors_links_paths_mapping()[parent.path][-1] == {
+        "link_reach": "public",
+        "link_role": "editor",
+    }
+    # Documents in other trees are not affected
+    assert other_document.get_ancestors_links_cache_key() == other_key
+
+
+@override_settings(ANCESTORS_LINKS_CACHE_TIMEOUT=60)
+def test_models_documents_ancestors_links_cache_invalidation_delete():
+    """Soft deleting or restoring an ancestor should invalidate the cache."""
+    root = factories.DocumentFactory(link_reach="public")
+    parent = factories.DocumentFactory(parent=root)
+    document = factories.DocumentFactory(parent=parent)
+
+    assert len(document.compute_ancestors_links_paths_mapping()) == 3
+
+    parent.soft_delete()
+    assert list(document.compute_ancestors_links_paths_mapping()) == [root.path]
+
+    parent.restore()
+    assert len(document.compute_ancestors_links_paths_mapping()) == 3
+
+
+@override_settings(ANCESTORS_LINKS_CACHE_TIMEOUT=60)
+def test_models_documents_ancestors_links_cache_invalidation_move():
+    """Moving a document should invalidate the cache of its new subtree."""
+    root = factories.DocumentFactory(link_reach="restricted")
+    document = factories.DocumentFactory(parent=root, link_reach="restricted")
+    child = factories.DocumentFactory(parent=document, link_reach="restricted")
+    target = factories.DocumentFactory(link_reach="public", link_role="editor")
+
+    assert child.compute_ancestors_links_paths_mapping()[root.path] == [
+        {"link_reach": "restricted", "link_role": root.link_role}
+    ]
+
+    document.move(target, pos="first-child")
+    child.refresh_from_db()
+
+    assert child.compute_ancestors_links_paths_mapping()[target.path] == [
+        {"link_reach": "public", "link_role": "editor"}
+    ]
+
+
+def test_models_documents_filter_highest_ancestors():
+    """Only documents without any ancestor in the queryset should be kept."""
+    root = factories.DocumentFactory()
+    child = factories.DocumentFactory(parent=root)
+    grand_child = factories.DocumentFactory(parent=child)
+    other_root = factories.DocumentFactory()
+    other_grand_child = factories.DocumentFactory(
+        parent=factories.DocumentFactory(parent=other_root)
+    )
+
+    queryset = models.Document.objects.filter(
+        pk__in=[root.pk, child.pk, grand_child.pk, other_grand_child.pk]
+    )
+    assert list(queryset.filter_highest_ancestors()) == [root, other_grand_child]
+
+    queryset = models.Document.objects.filter(
+        pk__in=[child.pk, grand_child.pk, other_root.pk]
+    )
+    assert list(queryset.filter_highest_ancestors()) == [child, other_root]
+
+
+def test_models_documents_descendants_of_any_paths():
+    """Documents at or below any of the given paths should be kept."""
+    root = factories.DocumentFactory()
+    child = factories.DocumentFactory(parent=root)
+    grand_child = factories.DocumentFactory(parent=child)
+    other_root = factories.DocumentFactory()
+    other_child = factories.DocumentFactory(parent=other_root)
+    factories.DocumentFactory()
+
+    assert list(models.Document.objects.descendants_of_any([child.path])) == [
+        child,
+        grand_child,
+    ]
+    assert list(
+        models.Document.objects.descendants_of_any([grand_child.path, other_root.path])
+    ) == [grand_child, other_root, other_child]
+    assert not models.Document.objects.descendants_of_any([]).exists()
+
+
+def test_models_documents_descendants_of_any_queryset(django_assert_num_queries):
+    """Paths can be given as a queryset that is resolved in the database."""
+    user = factories.UserFactory()
+    root = factories.DocumentFactory(users=[(user, "owner")])
+    child = factories.DocumentFactory(parent=root)
+    other_root = factories.DocumentFactory(users=[(user, "reader")])
+    factories.DocumentFactory(parent=other_root)
+
+    owned_paths = models.DocumentAccess.objects.filter(
+        user=user, role="owner"
+    ).values_list("document_path", flat=True)
+
+    with django_assert_num_queries(1):
+        assert list(models.Document.objects.descendants_of_any(owned_paths)) == [
+            root,
+            child,
+        ]
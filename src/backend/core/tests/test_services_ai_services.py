@@ -10,7 +10,7 @@ from django.test.utils import override_settings
 import pytest
 from openai import OpenAIError
 
-from core.services.ai_services import AIService
+from core.services.ai_services import AIService, ai_local_cache
 
 pytestmark = pytest.mark.django_db
 
@@ -82,3 +82,137 @@ def test_api_ai__success(mock_create):
     response = AIService().transform("hello", "prompt")
 
     assert response == {"answer": "Salut"}
+
+
+@override_settings(
+    AI_BASE_URL="http://example.com", AI_API_KEY="test-key", AI_MODEL="test-model"
+)
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_ai__stream_success(mock_create):
+    """The AI answer should be yielded piece by piece when streamed."""
+
+    mock_create.return_value = stream = MagicMock()
+    stream.__iter__.return_value = [
+        MagicMock(choices=[]),
+        MagicMock(choices=[MagicMock(delta=MagicMock(content="Sa"))]),
+        MagicMock(choices=[MagicMock(delta=MagicMock(content="lut"))]),
+    ]
+
+    assert list(AIService().translate_stream("hello", "fr")) == ["Sa", "lut"]
+    assert mock_create.call_args.kwargs["stream"] is True
+    stream.close.assert_called_once_with()
+
+
+@override_settings(
+    AI_BASE_URL="http://example.com", AI_API_KEY="test-key", AI_MODEL="test-model"
+)
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_ai__stream_client_error(mock_create):
+    """Errors occurring before the answer is generated should be raised right away."""
+
+    mock_create.side_effect = OpenAIError("Mocked client error")
+
+    with pytest.raises(OpenAIError, match="Mocked client error"):
+        AIService().transform_stream("hello", "prompt")
+
+
+@override_settings(
+    AI_BASE_URL="http://example.com", AI_API_KEY="test-key", AI_MODEL="test-model"
+)
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_ai__stream_no_answer(mock_create):
+    """Fail when the streamed answer is empty."""
+
+    mock_create.return_value = stream = MagicMock()
+    stream.__iter__.return_value = [
+        MagicMock(choices=[MagicMock(delta=MagicMock(content=None))])
+    ]
+
+    with pytest.raises(RuntimeError, match="AI response does not contain an answer"):
+        list(AIService().transform_stream("hello", "prompt"))
+
+
+@override_settings(
+    AI_BASE_URL="http://example.com", AI_API_KEY="test-key", AI_MODEL="test-model"
+)
+def test_api_ai__client_reused():
+    """The client of the AI API and its connections should be shared by requests."""
+    client = AIService().client
+    assert AIService().client is client
+
+    # A new client is built if the configuration changes
+    with override_settings(AI_API_KEY="other-key"):
+        other_client = AIService().client
+
+    assert other_client is not client
+    assert other_client.api_key == "other-key"
+
+
+@override_settings(
+    AI_BASE_URL="http://example.com", AI_API_KEY="test-key", AI_MODEL="test-model"
+)
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_ai__cache_disabled(mock_create):
+    """Answers should not be cached by default."""
+    mock_create.return_value = MagicMock(
+        choices=[MagicMock(message=MagicMock(content="Salut"))]
+    )
+
+    AIService().translate("hello", "fr")
+    AIService().translate("hello", "fr")
+
+    assert mock_create.call_count == 2
+
+
+@override_settings(
+    AI_BASE_URL="http://example.com",
+    AI_API_KEY="test-key",
+    AI_MODEL="test-model",
+    AI_CACHE_TIMEOUT=60,
+)
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_ai__cache(mock_create):
+    """Identical requests should be answered from the cache once enabled."""
+    ai_local_cache.clear()
+    mock_create.return_value = MagicMock(
+        choices=[MagicMock(message=MagicMock(content="Salut"))]
+    )
+
+    assert AIService().translate("hello", "fr") == {"answer": "Salut"}
+    assert AIService().translate("hello", "fr") == {"answer": "Salut"}
+    assert mock_create.call_count == 1
+
+    # Answers are shared with other processes through the shared cache
+    ai_local_cache.clear()
+    assert AIService().translate("hello", "fr") == {"answer": "Salut"}
+    assert mock_create.call_count == 1
+
+    # The answer depends on the prompt and on the text
+    AIService().translate("hello", "de")
+    AIService().translate("hi", "fr")
+    assert mock_create.call_count == 3
+
+    # Streamed requests reuse cached answers
+    assert list(AIService().translate_stream("hello", "fr")) == ["Salut"]
+    assert mock_create.call_count == 3
+
+
+@override_settings(
+    AI_BASE_URL="http://example.com",
+    AI_API_KEY="test-key",
+    AI_MODEL="test-model",
+    AI_CACHE_TIMEOUT=60,
+)
+@patch("openai.resources.chat.completions.Completions.create")
+def test_api_ai__cache_stream(mock_create):
+    """Streamed answers should be cached once complete."""
+    ai_local_cache.clear()
+    mock_create.return_value = stream = MagicMock()
+    stream.__iter__.return_value = [
+        MagicMock(choices=[MagicMock(delta=MagicMock(content="Sa"))]),
+        MagicMock(choices=[MagicMock(delta=MagicMock(content="lut"))]),
+    ]
+
+    assert list(AIService().transform_stream("hello", "prompt")) == ["Sa", "lut"]
+    assert AIService().transform("hello", "prompt") == {"answer": "Salut"}
+    assert mock_create.call_count == 1
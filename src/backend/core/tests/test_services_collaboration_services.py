@@ -17,7 +17,7 @@ from core.services.collaboration_services import CollaborationService
 
 
 @pytest.fixture
-def mock_reset_connections(settings):
+def mock_reset_connections(settings, django_capture_on_commit_callbacks):
     """
     Creates a context manager to mock the reset-connections endpoint for collaboration services.
     Args:
@@ -32,6 +32,7 @@ def mock_reset_connections(settings):
             # Your test code here
     The context manager performs the following actions:
         - Mocks the reset-connections endpoint using responses.RequestsMock.
+        - Runs the callbacks registered on commit, which send the notifications.
         - Sets the COLLABORATION_API_URL and COLLABORATION_SERVER_SECRET in the settings.
         - Verifies that the reset-connections endpoint is called exactly once.
         - Checks that the request URL and headers are correct.
@@ -53,7 +54,8 @@ def mock_reset_connections(settings):
                 json={},
                 status=200,
             )
-            yield
+            with django_capture_on_commit_callbacks(execute=True):
+                yield
 
             assert len(rsps.calls) == 1, (
                 "Expected one call to reset-connections endpoint"
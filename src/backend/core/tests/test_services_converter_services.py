@@ -3,13 +3,20 @@
 from base64 import b64decode
 from unittest.mock import MagicMock, patch
 
+from django.core.cache import cache
+
+import pycrdt
 import pytest
 import requests
 
 from core.services.converter_services import (
+    BlockNoteConverter,
     ServiceUnavailableError,
+    UnsupportedContentError,
     ValidationError,
     YdocConverter,
+    conversion_local_cache,
+    get_conversion_cache_stats,
 )
 
 
@@ -27,7 +34,7 @@ def test_convert_empty_text():
         converter.convert("")
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_convert_service_unavailable(mock_post):
     """Should raise ServiceUnavailableError when service is unavailable."""
     converter = YdocConverter()
@@ -41,7 +48,7 @@ def test_convert_service_unavailable(mock_post):
         converter.convert("test text")
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_convert_http_error(mock_post):
     """Should raise ServiceUnavailableError when HTTP error occurs."""
     converter = YdocConverter()
@@ -57,7 +64,7 @@ def test_convert_http_error(mock_post):
         converter.convert("test text")
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_convert_full_integration(mock_post, settings):
     """Test full integration with all settings."""
 
@@ -91,7 +98,7 @@ def test_convert_full_integration(mock_post, settings):
     )
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_convert_full_integration_with_specific_headers(mock_post, settings):
     """Test successful conversion with specific content type and accept headers."""
     settings.Y_PROVIDER_API_BASE_URL = "http://test.com/"
@@ -126,7 +133,7 @@ def test_convert_full_integration_with_specific_headers(mock_post, settings):
     )
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_convert_timeout(mock_post):
     """Should raise ServiceUnavailableError when request times out."""
     converter = YdocConverter()
@@ -146,3 +153,217 @@ def test_convert_none_input():
 
     with pytest.raises(ValidationError, match="Input text cannot be empty"):
         converter.convert(None)
+
+
+def get_blocknote_ydoc():
+    """Return a Yjs document structured like BlockNote documents."""
+    ydoc = pycrdt.Doc()
+    ydoc["document-store"] = fragment = pycrdt.XmlFragment()
+    group = fragment.children.append(pycrdt.XmlElement("blockGroup"))
+
+    blocks = [
+        ("heading", {"level": 2}, [("Title", None)]),
+        ("paragraph", {}, [("Some ", None), ("bold", {"bold": {}}), (" text", None)]),
+        ("bulletListItem", {}, [("first", None)]),
+        ("bulletListItem", {}, [("second <item>", None)]),
+        ("paragraph", {}, [("A ", None), ("link", {"link": {"href": "https://a.b"}})]),
+    ]
+    for i, (block_type, props, inserts) in enumerate(blocks):
+        container = group.children.append(
+            pycrdt.XmlElement("blockContainer", {"id": str(i)})
+        )
+        element = container.children.append(pycrdt.XmlElement(block_type, props))
+        text = element.children.append(pycrdt.XmlText())
+        for insert, attributes in inserts:
+            text.insert(len(text), insert, attributes)
+
+    return ydoc.get_update()
+
+
+def test_convert_in_process_markdown(settings):
+    """Yjs documents should be converted to Markdown without calling the microservice."""
+    settings.CONVERSION_BACKEND = "in-process"
+    with patch("requests.Session.post") as mock_post:
+        result = YdocConverter().convert(
+            get_blocknote_ydoc(), "application/vnd.yjs.doc", "text/markdown"
+        )
+
+    mock_post.assert_not_called()
+    assert result == (
+        "## Title\n\n"
+        "Some **bold** text\n\n"
+        "- first\n"
+        "- second \\<item\\>\n\n"
+        "A [link](https://a.b)"
+    )
+
+
+def test_convert_in_process_markdown_escaped(settings):
+    """Text that Markdown would take for markup should be escaped."""
+    settings.CONVERSION_BACKEND = "in-process"
+    ydoc = pycrdt.Doc()
+    ydoc["document-store"] = fragment = pycrdt.XmlFragment()
+    group = fragment.children.append(pycrdt.XmlElement("blockGroup"))
+    for i, text in enumerate(["1. not a *list*", "# [not] a_heading", "- a `b`"]):
+        container = group.children.append(
+            pycrdt.XmlElement("blockContainer", {"id": str(i)})
+        )
+        paragraph = container.children.append(pycrdt.XmlElement("paragraph"))
+        paragraph.children.append(pycrdt.XmlText(text))
+
+    result = YdocConverter().convert(
+        ydoc.get_update(), "application/vnd.yjs.doc", "text/markdown"
+    )
+
+    assert result == (
+        "1\\. not a \\*list\\*\n\n\\# \\[not\\] a\\_heading\n\n\\- a \\`b\\`"
+    )
+
+
+def test_convert_in_process_html(settings):
+    """Yjs documents should be converted to HTML, text being escaped."""
+    settings.CONVERSION_BACKEND = "in-process"
+    result = YdocConverter().convert(
+        get_blocknote_ydoc(), "application/vnd.yjs.doc", "text/html"
+    )
+
+    assert result == (
+        "<h2>Title</h2>"
+        "<p>Some <strong>bold</strong> text</p>"
+        "<ul><li>first</li><li>second &lt;item&gt;</li></ul>"
+        '<p>A <a href="https://a.b">link</a></p>'
+    )
+
+
+def test_convert_in_process_json(settings):
+    """Yjs documents should be converted to BlockNote blocks."""
+    settings.CONVERSION_BACKEND = "in-process"
+    result = YdocConverter().convert(
+        get_blocknote_ydoc(), "application/vnd.yjs.doc", "application/json"
+    )
+
+    assert result[0] == {
+        "id": "0",
+        "type": "heading",
+        "props": {"level": 2},
+        "content": [{"type": "text", "text": "Title", "styles": {}}],
+        "children": [],
+    }
+    assert result[4]["content"][1] == {
+        "type": "link",
+        "href": "https://a.b",
+        "content": [{"type": "text", "text": "link", "styles": {}}],
+    }
+
+
+def test_convert_in_process_invalid():
+    """Invalid Yjs documents should raise a ValidationError."""
+    with pytest.raises(ValidationError, match="Invalid Yjs document"):
+        BlockNoteConverter().convert(b"garbage", "text/html")
+
+
+@patch("requests.Session.post")
+def test_convert_in_process_fallback(mock_post, settings):
+    """
+    Conversions not supported in-process, or all conversions with the "y-provider"
+    backend, should be sent to the microservice.
+    """
+    mock_post.return_value.content = b"ydoc"
+    mock_post.return_value.text = "# Title"
+
+    result = YdocConverter().convert(
+        get_blocknote_ydoc(), "application/vnd.yjs.doc", "text/markdown"
+    )
+    assert result == "# Title"
+    assert mock_post.call_count == 1
+
+    settings.CONVERSION_BACKEND = "in-process"
+    YdocConverter().convert("# Title")
+    assert mock_post.call_count == 2
+
+
+def get_ydoc_with_custom_content(custom_block=False):
+    """
+    Return a Yjs document with a mention, custom inline content stored as an element,
+    or with a block of a custom type.
+    """
+    ydoc = pycrdt.Doc()
+    ydoc["document-store"] = fragment = pycrdt.XmlFragment()
+    group = fragment.children.append(pycrdt.XmlElement("blockGroup"))
+    container = group.children.append(pycrdt.XmlElement("blockContainer", {"id": "0"}))
+    block = container.children.append(
+        pycrdt.XmlElement("callout" if custom_block else "paragraph")
+    )
+    block.children.append(pycrdt.XmlText("Hello "))
+    if not custom_block:
+        block.children.append(pycrdt.XmlElement("mention", {"user": "John"}))
+    return ydoc.get_update()
+
+
+@pytest.mark.parametrize("custom_block", [True, False])
+@patch("requests.Session.post")
+def test_convert_in_process_unsupported_content(mock_post, custom_block, settings):
+    """
+    Documents with custom blocks or inline content should be converted by the
+    microservice rather than losing this content.
+    """
+    settings.CONVERSION_BACKEND = "in-process"
+    mock_post.return_value.text = "Hello @John"
+    ydoc = get_ydoc_with_custom_content(custom_block=custom_block)
+
+    with pytest.raises(UnsupportedContentError):
+        BlockNoteConverter().convert(ydoc, "text/markdown")
+
+    result = YdocConverter().convert(ydoc, "application/vnd.yjs.doc", "text/markdown")
+
+    assert result == "Hello @John"
+    mock_post.assert_called_once()
+
+
+def test_convert_cached(settings):
+    """
+    Conversion results should be cached in process and in the shared cache, under a
+    key depending on the content, the formats and the converter.
+    """
+    settings.CONVERSION_BACKEND = "in-process"
+    settings.CONVERSION_CACHE_TIMEOUT = 60
+    cache.clear()
+    conversion_local_cache.clear()
+    converter = YdocConverter()
+    ydoc = get_blocknote_ydoc()
+
+    with patch.object(
+        BlockNoteConverter, "convert", wraps=BlockNoteConverter().convert
+    ) as mock_convert:
+        result = converter.convert(ydoc, "application/vnd.yjs.doc", "application/json")
+        assert converter.convert(
+            ydoc, "application/vnd.yjs.doc", "application/json"
+        ) == (result)
+        assert mock_convert.call_count == 1
+
+        # The shared cache is used by other processes
+        conversion_local_cache.clear()
+        converter.convert(ydoc, "application/vnd.yjs.doc", "application/json")
+        assert mock_convert.call_count == 1
+
+        # Other formats are cached separately
+        converter.convert(ydoc, "application/vnd.yjs.doc", "text/html")
+        assert mock_convert.call_count == 2
+
+    assert get_conversion_cache_stats() == {
+        "hits": 2,
+        "misses": 2,
+        "hit_rate": 0.5,
+    }
+
+
+def test_convert_cached_converter_version(settings):
+    """Changing the converter should not serve results cached by the previous one."""
+    settings.CONVERSION_BACKEND = "in-process"
+    settings.CONVERSION_CACHE_TIMEOUT = 60
+    converter = YdocConverter()
+    ydoc = get_blocknote_ydoc()
+
+    key = converter.get_cache_key(ydoc, "application/vnd.yjs.doc", "text/html")
+    settings.CONVERSION_BACKEND = "y-provider"
+    assert converter.get_cache_key(ydoc, "application/vnd.yjs.doc", "text/html") != key
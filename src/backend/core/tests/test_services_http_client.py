@@ -0,0 +1,78 @@
+"""Test the pooled HTTP sessions used to call other services."""
+
+import pytest
+import responses
+from responses.registries import OrderedRegistry
+
+from core.services.http_client import PROXY_SESSION, close_sessions, get_session
+
+
+@pytest.fixture(autouse=True)
+def fresh_sessions():
+    """Build new sessions for each test so that they use the current settings."""
+    close_sessions()
+    yield
+    close_sessions()
+
+
+def test_http_client_get_session_reused(settings):
+    """Each service should get its own session, reused across calls."""
+    settings.HTTP_CLIENT_POOL_SIZE = 3
+    session = get_session("collaboration")
+
+    assert get_session("collaboration") is session
+    assert get_session("y-provider") is not session
+
+    adapter = session.get_adapter("https://collaboration.test/")
+    assert adapter._pool_maxsize == 3  # pylint: disable=protected-access
+
+
+@responses.activate(registry=OrderedRegistry)
+def test_http_client_retry(settings):
+    """Requests should be retried when the service is unavailable."""
+    settings.HTTP_CLIENT_MAX_RETRIES = 2
+    settings.HTTP_CLIENT_RETRY_BACKOFF_FACTOR = 0
+    url = "https://collaboration.test/reset-connections/"
+    responses.post(url, status=503)
+    responses.post(url, status=200)
+
+    response = get_session("collaboration").post(url, timeout=1)
+
+    assert response.status_code == 200
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_http_client_retry_exhausted(settings):
+    """The last response should be returned once retries are exhausted."""
+    settings.HTTP_CLIENT_MAX_RETRIES = 1
+    settings.HTTP_CLIENT_RETRY_BACKOFF_FACTOR = 0
+    url = "https://collaboration.test/reset-connections/"
+    responses.post(url, status=503)
+
+    response = get_session("collaboration").post(url, timeout=1)
+
+    assert response.status_code == 503
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_http_client_proxy_session(settings):
+    """
+    The session of the proxy, fetching resources of any site for all users, should
+    neither retry requests nor keep cookies.
+    """
+    settings.HTTP_CLIENT_MAX_RETRIES = 2
+    settings.HTTP_CLIENT_RETRY_BACKOFF_FACTOR = 0
+    url = "https://example.com/image.png"
+    responses.get(url, status=503, headers={"Set-Cookie": "session=secret; Path=/"})
+
+    session = get_session(PROXY_SESSION)
+    response = session.get(url, timeout=1)
+
+    assert response.status_code == 503
+    assert len(responses.calls) == 1
+    assert not session.cookies
+
+    session.get(url, timeout=1)
+    assert "Cookie" not in responses.calls[1].request.headers
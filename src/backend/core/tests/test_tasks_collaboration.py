@@ -0,0 +1,130 @@
+"""
+Unit tests for the collaboration server tasks
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+import pytest
+import responses
+
+from core import models
+from core.tasks.collaboration import (
+    NOTIFICATIONS_CLAIM_TIMEOUT,
+    coalesce_notifications,
+    send_collaboration_notifications,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def collaboration_settings(settings):
+    """Configure the collaboration server API."""
+    settings.COLLABORATION_API_URL = "http://example.com/"
+    settings.COLLABORATION_SERVER_SECRET = "secret-token"
+    return settings
+
+
+def test_tasks_coalesce_notifications():
+    """Notifications should be coalesced per room, resetting a room including users."""
+    notifications = [
+        models.CollaborationNotification(room="a", user_id="1"),
+        models.CollaborationNotification(room="a", user_id="1"),
+        models.CollaborationNotification(room="a", user_id="2"),
+        models.CollaborationNotification(room="b", user_id="3"),
+        models.CollaborationNotification(room="b", user_id=None),
+        models.CollaborationNotification(room="b", user_id="4"),
+    ]
+
+    assert coalesce_notifications(notifications) == {"a": {"1", "2"}, "b": None}
+
+
+@responses.activate
+def test_tasks_send_collaboration_notifications(collaboration_settings):
+    """Pending notifications should be sent once per room and user, then deleted."""
+    for room, user_id in [("a", "1"), ("a", "1"), ("a", "2"), ("b", "3"), ("b", None)]:
+        models.CollaborationNotification.objects.create(room=room, user_id=user_id)
+    for room in ["a", "b"]:
+        responses.post(f"http://example.com/reset-connections/?room={room:s}")
+
+    send_collaboration_notifications()
+
+    assert [
+        (call.request.url, call.request.headers.get("X-User-Id"))
+        for call in responses.calls
+    ] == [
+        ("http://example.com/reset-connections/?room=a", "1"),
+        ("http://example.com/reset-connections/?room=a", "2"),
+        ("http://example.com/reset-connections/?room=b", None),
+    ]
+    assert not models.CollaborationNotification.objects.exists()
+
+
+@responses.activate
+def test_tasks_send_collaboration_notifications_failure(collaboration_settings):
+    """Notifications that could not be sent should be kept to be retried."""
+    models.CollaborationNotification.objects.create(room="a")
+    models.CollaborationNotification.objects.create(room="b")
+    responses.post("http://example.com/reset-connections/?room=a", status=500)
+    responses.post("http://example.com/reset-connections/?room=b")
+
+    send_collaboration_notifications()
+
+    assert list(
+        models.CollaborationNotification.objects.values_list("room", flat=True)
+    ) == ["a"]
+
+
+@responses.activate
+def test_tasks_send_collaboration_notifications_claimed(collaboration_settings):
+    """
+    Notifications should be claimed before calling the collaboration server so that
+    no lock is held on them meanwhile, and released if they could not be sent.
+    """
+    models.CollaborationNotification.objects.create(room="a", user_id="1")
+    claimed_during_calls = []
+
+    def callback(request):
+        claimed_during_calls.extend(
+            models.CollaborationNotification.objects.values_list(
+                "claimed_at", flat=True
+            )
+        )
+        return (500, {}, "")
+
+    responses.add_callback(
+        responses.POST, "http://example.com/reset-connections/?room=a", callback
+    )
+
+    send_collaboration_notifications()
+
+    assert len(claimed_during_calls) == 1
+    assert claimed_during_calls[0] is not None
+    notification = models.CollaborationNotification.objects.get()
+    assert (notification.room, notification.user_id) == ("a", "1")
+    assert notification.claimed_at is None
+
+
+@responses.activate
+def test_tasks_send_collaboration_notifications_claim_expired(collaboration_settings):
+    """
+    Notifications claimed by another worker should be skipped, unless their claim
+    expired, e.g. because the worker died while sending them.
+    """
+    now = timezone.now()
+    models.CollaborationNotification.objects.create(room="a", claimed_at=now)
+    models.CollaborationNotification.objects.create(
+        room="b", claimed_at=now - NOTIFICATIONS_CLAIM_TIMEOUT - timedelta(seconds=1)
+    )
+    responses.post("http://example.com/reset-connections/?room=b")
+
+    send_collaboration_notifications()
+
+    assert [call.request.url for call in responses.calls] == [
+        "http://example.com/reset-connections/?room=b"
+    ]
+    assert list(
+        models.CollaborationNotification.objects.values_list("room", flat=True)
+    ) == ["a"]
@@ -0,0 +1,97 @@
+"""
+Unit tests for the document tasks
+"""
+
+import base64
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test.utils import override_settings
+from django.utils import timezone
+
+import pytest
+
+from core import factories, models
+from core.services.converter_services import YdocConverter
+from core.tasks.documents import thin_document_versions
+
+pytestmark = pytest.mark.django_db
+
+
+def list_s3_version_ids(document):
+    """Return the ids of the versions of a document in object storage."""
+    response = default_storage.connection.meta.client.list_object_versions(
+        Bucket=default_storage.bucket_name, Prefix=document.file_key
+    )
+    return {version["VersionId"] for version in response["Versions"]}
+
+
+@override_settings(DOCUMENT_VERSIONS_RETENTION_POLICY=["0:0", "86400:3600"])
+def test_tasks_thin_document_versions():
+    """
+    Versions exceeding the retention policy should be deleted from object storage and
+    from the index of versions, keeping the current version.
+    """
+    document = factories.DocumentFactory()
+    for i in range(3):
+        document.content = f"content {i:d}"
+        document.save()
+    recent_document = factories.DocumentFactory()
+    recent_document.content = "new content"
+    recent_document.save()
+
+    versions = list(document.versions.all())
+    assert len(versions) == 4
+
+    # All versions but the current one were created within the same hour two days ago
+    two_days_ago = timezone.now().replace(minute=30) - timedelta(days=2)
+    for i, version in enumerate(versions[1:]):
+        models.DocumentVersion.objects.filter(pk=version.pk).update(
+            last_modified=two_days_ago - timedelta(minutes=i)
+        )
+
+    result = thin_document_versions()
+
+    assert result == {
+        "deleted_versions": 2,
+        "bytes_reclaimed": versions[2].size + versions[3].size,
+    }
+    kept_version_ids = {versions[0].version_id, versions[1].version_id}
+    assert set(document.versions.values_list("version_id", flat=True)) == (
+        kept_version_ids
+    )
+    assert list_s3_version_ids(document) == kept_version_ids
+    assert recent_document.versions.count() == 2
+    assert document.content == "content 2"
+
+
+def test_tasks_thin_document_versions_no_policy():
+    """No version should be deleted if no retention policy is configured."""
+    document = factories.DocumentFactory()
+    document.content = "new content"
+    document.save()
+    document.versions.update(last_modified=timezone.now() - timedelta(days=365))
+
+    assert thin_document_versions() == {"deleted_versions": 0, "bytes_reclaimed": 0}
+    assert document.versions.count() == 2
+
+
+@override_settings(
+    CONVERSION_CACHE_TIMEOUT=60, CONVERSION_CACHE_WARM_FORMATS=["text/markdown"]
+)
+def test_tasks_warm_document_conversions(django_capture_on_commit_callbacks):
+    """Documents should be converted to the configured formats once saved."""
+    document = factories.DocumentFactory()
+    content = base64.b64encode(b"new content").decode()
+
+    with (
+        mock.patch.object(YdocConverter, "convert") as mock_convert,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        document.content = content
+        document.save()
+
+    mock_convert.assert_called_once_with(
+        b"new content", "application/vnd.yjs.doc", "text/markdown"
+    )
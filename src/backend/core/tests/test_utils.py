@@ -2,8 +2,10 @@
 
 import base64
 import uuid
+from datetime import datetime, timedelta, timezone
 
 import pycrdt
+import pytest
 
 from core import utils
 
@@ -75,3 +77,42 @@ def test_utils_extract_attachments():
     base64_string = base64.b64encode(update).decode("utf-8")
     # image_key2 is missing the "/media/" part and shouldn't get extracted
     assert utils.extract_attachments(base64_string) == [image_key1, image_key3]
+
+
+def test_utils_parse_retention_policy():
+    """Retention rules should be parsed and sorted by increasing minimum age."""
+    assert utils.parse_retention_policy(["2592000:86400", "0:0", "86400:3600"]) == [
+        (timedelta(0), timedelta(0)),
+        (timedelta(days=1), timedelta(hours=1)),
+        (timedelta(days=30), timedelta(days=1)),
+    ]
+
+    for rule in ["86400", "a:b", "-1:3600"]:
+        with pytest.raises(ValueError):
+            utils.parse_retention_policy([rule])
+
+
+def test_utils_select_versions_to_thin():
+    """
+    Only the most recent version of each interval of the rule applying to its age
+    should be kept.
+    """
+    now = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+    policy = utils.parse_retention_policy(["0:0", "86400:3600", "2592000:86400"])
+    ages = [
+        # Kept: less than a day old
+        timedelta(minutes=10),
+        timedelta(minutes=20),
+        # Hourly: the first version of each hour is kept
+        timedelta(days=2, minutes=10),
+        timedelta(days=2, minutes=20),
+        timedelta(days=2, hours=1, minutes=10),
+        # Daily
+        timedelta(days=40, hours=1),
+        timedelta(days=40, hours=2),
+        timedelta(days=41, hours=1),
+    ]
+    versions = [(i, now - age) for i, age in enumerate(ages)]
+
+    assert utils.select_versions_to_thin(versions, policy, now) == [3, 6]
+    assert not utils.select_versions_to_thin(versions, [], now)
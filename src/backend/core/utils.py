@@ -2,6 +2,7 @@
 
 import base64
 import re
+from datetime import timedelta
 
 import pycrdt
 from bs4 import BeautifulSoup
@@ -48,6 +49,66 @@ def filter_descendants(paths, root_paths, skip_sorting=False):
     return results
 
 
+def iter_base64_decoded(chunks):
+    """Decode base64 content received in chunks, yielding the decoded bytes."""
+    remainder = b""
+    for chunk in chunks:
+        data = remainder + chunk
+        size = len(data) - len(data) % 4
+        remainder = data[size:]
+        if size:
+            yield base64.b64decode(data[:size])
+
+    if remainder:
+        raise ValueError("Truncated base64 content.")
+
+
+def parse_retention_policy(rules):
+    """
+    Parse retention rules formatted as "<min age>:<interval>" in seconds, e.g. "86400:3600"
+    to keep one version per hour for versions older than a day. An interval of 0 keeps
+    all versions. Rules are returned as timedeltas sorted by increasing minimum age.
+    """
+    policy = []
+    for rule in rules:
+        try:
+            min_age, interval = (int(value) for value in rule.split(":"))
+        except ValueError as err:
+            raise ValueError(f"Invalid retention rule: {rule!r}") from err
+        if min_age < 0 or interval < 0:
+            raise ValueError(f"Invalid retention rule: {rule!r}")
+        policy.append((timedelta(seconds=min_age), timedelta(seconds=interval)))
+    return sorted(policy)
+
+
+def select_versions_to_thin(versions, policy, now):
+    """
+    Select the versions exceeding a retention policy. Versions are (key, datetime) pairs
+    sorted from the most recent. Each version falls under the rule with the greatest
+    minimum age below its age, and only the most recent version of each interval of
+    this rule is kept. Versions younger than all rules are kept.
+    """
+    kept_slots = set()
+    selected = []
+    for key, last_modified in versions:
+        age = now - last_modified
+        rule = None
+        for min_age, interval in policy:
+            if min_age > age:
+                break
+            rule = (min_age, interval)
+
+        if rule is None or not rule[1]:
+            continue
+
+        slot = (rule, last_modified.timestamp() // rule[1].total_seconds())
+        if slot in kept_slots:
+            selected.append(key)
+        else:
+            kept_slots.add(slot)
+    return selected
+
+
 def base64_yjs_to_xml(base64_string):
     """Extract xml from base64 yjs document."""
 
@@ -59,6 +120,20 @@ def base64_yjs_to_xml(base64_string):
     return str(doc.get("document-store", type=pycrdt.XmlFragment))
 
 
+def merge_base64_yjs_updates(base64_string, updates):
+    """
+    Apply incremental Yjs updates to a base64 yjs document and return the merged
+    document as base64. Yjs updates being idempotent and commutative, updates already
+    included in the document or applied out of order are merged correctly.
+    """
+    doc = pycrdt.Doc()
+    if base64_string:
+        doc.apply_update(base64.b64decode(base64_string))
+    for update in updates:
+        doc.apply_update(bytes(update))
+    return base64.b64encode(doc.get_update()).decode("utf-8")
+
+
 def base64_yjs_to_text(base64_string):
     """Extract text from base64 yjs document."""
 
@@ -223,6 +223,16 @@ class Base(Configuration):
     )
     # Document versions
     DOCUMENT_VERSIONS_PAGE_SIZE = 50
+    # Rules "<min age>:<interval>" in seconds thinning versions older than the minimum
+    # age to one per interval, e.g. "0:0,86400:3600,2592000:86400"
+    DOCUMENT_VERSIONS_RETENTION_POLICY = values.ListValue(
+        [], environ_name="DOCUMENT_VERSIONS_RETENTION_POLICY", environ_prefix=None
+    )
+    DOCUMENT_VERSIONS_RETENTION_INTERVAL = values.PositiveIntegerValue(
+        60 * 60,
+        environ_name="DOCUMENT_VERSIONS_RETENTION_INTERVAL",
+        environ_prefix=None,
+    )
 
     # Internationalization
     # https://docs.djangoproject.com/en/3.1/topics/i18n/
@@ -447,6 +457,44 @@ class Base(Configuration):
         30, environ_name="TRASHBIN_CUTOFF_DAYS", environ_prefix=None
     )
 
+    # Cache of the links of documents and their ancestors, set the timeout to 0 to disable
+    ANCESTORS_LINKS_CACHE_TIMEOUT = values.IntegerValue(
+        3600, environ_name="ANCESTORS_LINKS_CACHE_TIMEOUT", environ_prefix=None
+    )
+    ANCESTORS_LINKS_LOCAL_CACHE_SIZE = values.IntegerValue(
+        10000, environ_name="ANCESTORS_LINKS_LOCAL_CACHE_SIZE", environ_prefix=None
+    )
+
+    # Cache of the content of documents, set the timeout to 0 to disable
+    DOCUMENT_CONTENT_CACHE_TIMEOUT = values.IntegerValue(
+        3600, environ_name="DOCUMENT_CONTENT_CACHE_TIMEOUT", environ_prefix=None
+    )
+    DOCUMENT_CONTENT_CACHE_MAX_ITEM_SIZE = values.IntegerValue(
+        1024 * 1024,
+        environ_name="DOCUMENT_CONTENT_CACHE_MAX_ITEM_SIZE",
+        environ_prefix=None,
+    )
+    DOCUMENT_CONTENT_LOCAL_CACHE_SIZE = values.IntegerValue(
+        64 * 1024 * 1024,
+        environ_name="DOCUMENT_CONTENT_LOCAL_CACHE_SIZE",
+        environ_prefix=None,
+    )
+
+    # Number of pending incremental updates of a document triggering their compaction
+    DOCUMENT_CONTENT_UPDATES_COMPACTION_THRESHOLD = values.PositiveIntegerValue(
+        100,
+        environ_name="DOCUMENT_CONTENT_UPDATES_COMPACTION_THRESHOLD",
+        environ_prefix=None,
+    )
+
+    # Cache of media authorizations and of the "ready" status of attachments
+    MEDIA_AUTH_CACHE_TIMEOUT = values.IntegerValue(
+        30, environ_name="MEDIA_AUTH_CACHE_TIMEOUT", environ_prefix=None
+    )
+    ATTACHMENT_STATUS_CACHE_TIMEOUT = values.IntegerValue(
+        3600, environ_name="ATTACHMENT_STATUS_CACHE_TIMEOUT", environ_prefix=None
+    )
+
     # Mail
     EMAIL_BACKEND = values.Value("django.core.mail.backends.smtp.EmailBackend")
     EMAIL_BRAND_NAME = values.Value(None)
@@ -481,6 +529,30 @@ class Base(Configuration):
     COLLABORATION_WS_URL = values.Value(
         None, environ_name="COLLABORATION_WS_URL", environ_prefix=None
     )
+    COLLABORATION_API_TIMEOUT = values.PositiveIntegerValue(
+        10, environ_name="COLLABORATION_API_TIMEOUT", environ_prefix=None
+    )
+    # Cache of the connections to documents checked on the collaboration server, set
+    # the timeout to 0 to disable
+    COLLABORATION_CONNECTIONS_CACHE_TIMEOUT = values.IntegerValue(
+        3, environ_name="COLLABORATION_CONNECTIONS_CACHE_TIMEOUT", environ_prefix=None
+    )
+    # Lifetime of the connections pushed by the collaboration server, which should push
+    # them again before they expire
+    COLLABORATION_CONNECTIONS_PUSH_TIMEOUT = values.IntegerValue(
+        60, environ_name="COLLABORATION_CONNECTIONS_PUSH_TIMEOUT", environ_prefix=None
+    )
+
+    # Pooled HTTP sessions used to call other services
+    HTTP_CLIENT_POOL_SIZE = values.PositiveIntegerValue(
+        10, environ_name="HTTP_CLIENT_POOL_SIZE", environ_prefix=None
+    )
+    HTTP_CLIENT_MAX_RETRIES = values.PositiveIntegerValue(
+        2, environ_name="HTTP_CLIENT_MAX_RETRIES", environ_prefix=None
+    )
+    HTTP_CLIENT_RETRY_BACKOFF_FACTOR = values.FloatValue(
+        0.2, environ_name="HTTP_CLIENT_RETRY_BACKOFF_FACTOR", environ_prefix=None
+    )
     COLLABORATION_WS_NOT_CONNECTED_READY_ONLY = values.BooleanValue(
         False,
         environ_name="COLLABORATION_WS_NOT_CONNECTED_READY_ONLY",
@@ -669,6 +741,25 @@ class Base(Configuration):
     AI_API_KEY = SecretFileValue(None, environ_name="AI_API_KEY", environ_prefix=None)
     AI_BASE_URL = values.Value(None, environ_name="AI_BASE_URL", environ_prefix=None)
     AI_MODEL = values.Value(None, environ_name="AI_MODEL", environ_prefix=None)
+    # Cache of AI answers to identical requests, set the timeout to enable it
+    AI_CACHE_TIMEOUT = values.IntegerValue(
+        0, environ_name="AI_CACHE_TIMEOUT", environ_prefix=None
+    )
+    AI_LOCAL_CACHE_SIZE = values.IntegerValue(
+        4 * 1024 * 1024, environ_name="AI_LOCAL_CACHE_SIZE", environ_prefix=None
+    )
+    # Translation of whole documents, block by block
+    AI_TRANSLATE_DOCUMENT_MAX_LENGTH = values.PositiveIntegerValue(
+        100000, environ_name="AI_TRANSLATE_DOCUMENT_MAX_LENGTH", environ_prefix=None
+    )
+    # Maximum number of blocks of a document translation, each sent to the AI API
+    # in a separate request counted against the AI rate limits
+    AI_TRANSLATE_DOCUMENT_MAX_BLOCKS = values.PositiveIntegerValue(
+        100, environ_name="AI_TRANSLATE_DOCUMENT_MAX_BLOCKS", environ_prefix=None
+    )
+    AI_TRANSLATE_DOCUMENT_MAX_WORKERS = values.PositiveIntegerValue(
+        4, environ_name="AI_TRANSLATE_DOCUMENT_MAX_WORKERS", environ_prefix=None
+    )
     AI_ALLOW_REACH_FROM = values.Value(
         choices=("public", "authenticated", "restricted"),
         default="authenticated",
@@ -696,6 +787,34 @@ class Base(Configuration):
         environ_prefix=None,
     )
 
+    # Conversion of documents: "y-provider" sends all conversions to the microservice,
+    # "in-process" converts Yjs documents to Markdown, HTML and JSON in the backend,
+    # falling back to the microservice for content the backend does not support
+    CONVERSION_BACKEND = values.Value(
+        default="y-provider",
+        environ_name="CONVERSION_BACKEND",
+        environ_prefix=None,
+    )
+
+    # Cache of conversion results, set the timeout to 0 to disable
+    CONVERSION_CACHE_TIMEOUT = values.IntegerValue(
+        3600, environ_name="CONVERSION_CACHE_TIMEOUT", environ_prefix=None
+    )
+    CONVERSION_CACHE_MAX_ITEM_SIZE = values.IntegerValue(
+        1024 * 1024,
+        environ_name="CONVERSION_CACHE_MAX_ITEM_SIZE",
+        environ_prefix=None,
+    )
+    CONVERSION_LOCAL_CACHE_SIZE = values.IntegerValue(
+        16 * 1024 * 1024,
+        environ_name="CONVERSION_LOCAL_CACHE_SIZE",
+        environ_prefix=None,
+    )
+    # Formats, e.g. "text/markdown", to which documents are converted after each save
+    CONVERSION_CACHE_WARM_FORMATS = values.ListValue(
+        [], environ_name="CONVERSION_CACHE_WARM_FORMATS", environ_prefix=None
+    )
+
     # Conversion endpoint
     CONVERSION_API_ENDPOINT = values.Value(
         default="convert",
@@ -834,6 +953,22 @@ class Base(Configuration):
         """Environment in which the application is launched."""
         return self.__class__.__name__.lower()
 
+    # pylint: disable=invalid-name
+    @property
+    def CELERY_BEAT_SCHEDULE(self):
+        """Periodic tasks run by celery beat."""
+        return {
+            "thin-document-versions": {
+                "task": "core.tasks.documents.thin_document_versions",
+                "schedule": self.DOCUMENT_VERSIONS_RETENTION_INTERVAL,
+            },
+            # Retry notifications the collaboration server failed to receive
+            "send-collaboration-notifications": {
+                "task": "core.tasks.collaboration.send_collaboration_notifications",
+                "schedule": 60,
+            },
+        }
+
     # pylint: disable=invalid-name
     @property
     def RELEASE(self):
@@ -967,6 +1102,13 @@ class Test(Base):
 
     CELERY_TASK_ALWAYS_EAGER = values.BooleanValue(True)
 
+    # Keep the number of queries predictable, tests enable these caches explicitly
+    ANCESTORS_LINKS_CACHE_TIMEOUT = 0
+    COLLABORATION_CONNECTIONS_CACHE_TIMEOUT = 0
+    CONVERSION_CACHE_TIMEOUT = 0
+    DOCUMENT_CONTENT_CACHE_TIMEOUT = 0
+    MEDIA_AUTH_CACHE_TIMEOUT = 0
+
     def __init__(self):
         # pylint: disable=invalid-name
         self.INSTALLED_APPS += ["drf_spectacular_sidecar"]